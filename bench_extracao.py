@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark do motor de extração (extracao.extrair_dados) contra a
+cascata de regex antiga, usando páginas salvas (padrão: imovelweb_debug.html).
+
+Uso:
+    python bench_extracao.py
+    python bench_extracao.py imovelweb_debug.html imovelweb_undetected.html -n 50
+
+Também confere que os dois caminhos produzem o mesmo dicionário.
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from extracao import extrair_dados, price_re, area_re, rooms_re, baths_re, cep_re, phone_re
+
+BASE_DIR = Path(__file__).parent
+
+
+# ============================================================================
+# IMPLEMENTAÇÃO ANTIGA (referência)
+# ============================================================================
+
+def _extract_jsonld_legado(html):
+    """Parse JSON-LD blocks and return list of dicts."""
+    objs = []
+    for m in re.finditer(r"<script[^>]*type=\"application/ld\+json\"[^>]*>(.*?)</script>", html, re.I | re.S):
+        try:
+            txt = m.group(1).strip()
+            # Some pages include multiple JSON objects concatenated
+            if txt.startswith('['):
+                data = json.loads(txt)
+                if isinstance(data, list):
+                    objs.extend(data)
+            else:
+                data = json.loads(txt)
+                objs.append(data)
+        except Exception:
+            continue
+    return objs
+
+
+def extrair_dados_legado(html, url=None):
+    """Cascata de regex original (antes do motor de passada única)."""
+    if not html or len(html) < 100:
+        return None
+    
+    text = re.sub(r"\s+", " ", html)
+
+    # Try JSON-LD first
+    try:
+        jsonlds = _extract_jsonld_legado(html)
+        for obj in jsonlds:
+            # Look for real estate listing structures
+            if isinstance(obj, dict):
+                # common fields: name, description, offers, address, telephone
+                titulo = obj.get('name') or obj.get('headline')
+                descricao = obj.get('description')
+                price = None
+                metragem = None
+                quartos = None
+                banheiros = None
+                endereco = None
+                cidade = None
+                estado = None
+                cep = None
+                contato = None
+
+                # offers may contain price
+                offers = obj.get('offers')
+                if isinstance(offers, dict):
+                    price = offers.get('price') or offers.get('priceSpecification', {}).get('price')
+                # address
+                address = obj.get('address') or {}
+                if isinstance(address, dict):
+                    endereco = address.get('streetAddress')
+                    cidade = address.get('addressLocality')
+                    estado = address.get('addressRegion')
+                    cep = address.get('postalCode')
+                # contact
+                contato = obj.get('telephone') or (obj.get('contactPoint', {}) or {}).get('telephone')
+
+                if titulo or price or endereco:
+                    return {
+                        'titulo': titulo or (text[:150] if text else None),
+                        'preco': f"R$ {price}" if price and not isinstance(price, str) and price else (price if isinstance(price, str) else None),
+                        'metragem': metragem,
+                        'quartos': quartos,
+                        'banheiros': banheiros,
+                        'descricao': descricao,
+                        'endereco': endereco,
+                        'cidade': cidade,
+                        'estado': estado,
+                        'cep': cep,
+                        'contato': contato,
+                        'link': url,
+                    }
+    except Exception:
+        pass
+
+    # Try to find embedded JSON-like keys (addressLocality, postalCode) anywhere in the HTML
+    try:
+        m_city = re.search(r'"addressLocality"\s*:\s*"([^"]{2,100})"', html)
+        m_region = re.search(r'"addressRegion"\s*:\s*"([A-Z]{2})"', html)
+        m_postal = re.search(r'"postalCode"\s*:\s*"(\d{5}-\d{3})"', html)
+        if m_city and not cidade:
+            cidade = m_city.group(1)
+        if m_region and not estado:
+            estado = m_region.group(1)
+        if m_postal and not cep:
+            cep = m_postal.group(1)
+    except Exception:
+        pass
+
+    # Fallback heuristics from raw text
+    preco = None
+    m = price_re.search(text)
+    if m:
+        preco = m.group(0)
+
+    metragem = None
+    m = area_re.search(text)
+    if m:
+        metragem = f"{m.group(1)} m²"
+
+    quartos = None
+    m = rooms_re.search(text)
+    if m:
+        quartos = f"{m.group(1)} Q"
+
+    banheiros = None
+    m = baths_re.search(text)
+    if m:
+        banheiros = f"{m.group(1)} B"
+
+    descricao = None
+    # meta description
+    m = re.search(r"<meta\s+name=[\"']description[\"']\s+content=[\"']([^\"']+)[\"']", html, re.I)
+    if m:
+        descricao = m.group(1)
+    else:
+        # try og:description
+        m = re.search(r"<meta\s+property=[\"']og:description[\"']\s+content=[\"']([^\"']+)[\"']", html, re.I)
+        if m:
+            descricao = m.group(1)
+
+    endereco = None
+    cidade = None
+    estado = None
+    cep = None
+    contato = None
+
+    # cep
+    m = cep_re.search(text)
+    if m:
+        cep = m.group(0)
+
+    # phone
+    m = phone_re.search(text)
+    if m:
+        contato = m.group(0)
+
+    # try tel: links
+    if not contato:
+        m = re.search(r"href=['\"]tel:(\+?[0-9\-\(\)\s]+)['\"]", html, re.I)
+        if m:
+            contato = m.group(1)
+
+    # data attributes (some sites store phone in data-phone)
+    if not contato:
+        m = re.search(r"data-phone=['\"]([^'\"]+)['\"]", html, re.I)
+        if m:
+            contato = m.group(1)
+
+    # try to extract an address line
+    m = re.search(r'([A-Za-z0-9\s\.,\-]+\b)(?:,\s*)([A-Za-z\s]+)\s*-\s*([A-Z]{2})', text)
+    if m:
+        endereco = m.group(1).strip()
+        cidade = m.group(2).strip()
+        estado = m.group(3).strip()
+
+    # title from <title> tag or first heading
+    titulo = None
+    m = re.search(r'<title>(.*?)</title>', html, re.I)
+    if m:
+        titulo = m.group(1).strip()
+    else:
+        m = re.search(r'<h1[^>]*>(.*?)</h1>', html, re.I | re.S)
+        if m:
+            titulo = re.sub(r'<[^>]+>', '', m.group(1)).strip()
+
+    if not (titulo or preco or metragem):
+        return None
+
+    return {
+        'titulo': titulo,
+        'preco': preco,
+        'metragem': metragem,
+        'quartos': quartos,
+        'banheiros': banheiros,
+        'descricao': descricao,
+        'endereco': endereco,
+        'cidade': cidade,
+        'estado': estado,
+        'cep': cep,
+        'contato': contato,
+        'link': url,
+    }
+
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def medir(func, html, n):
+    """Tempo médio (s) de func(html) em n execuções."""
+    inicio = time.perf_counter()
+    for _ in range(n):
+        func(html, 'https://exemplo/')
+    return (time.perf_counter() - inicio) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do motor de extração')
+    parser.add_argument('arquivos', nargs='*', default=[str(BASE_DIR / 'imovelweb_debug.html')],
+                        help='Páginas HTML para medir (padrão: imovelweb_debug.html)')
+    parser.add_argument('-n', type=int, default=30, help='Repetições por página (padrão: 30)')
+    args = parser.parse_args()
+
+    for arquivo in args.arquivos:
+        html = Path(arquivo).read_text(encoding='utf-8', errors='replace')
+        antigo = extrair_dados_legado(html, 'https://exemplo/')
+        novo = extrair_dados(html, 'https://exemplo/')
+        t_antigo = medir(extrair_dados_legado, html, args.n)
+        t_novo = medir(extrair_dados, html, args.n)
+        mb = len(html.encode('utf-8')) / 1e6
+
+        print(f"\n📄 {Path(arquivo).name} ({len(html) / 1024:.0f} KB)")
+        print(f"   cascata antiga: {t_antigo * 1000:8.2f} ms/página  {mb / t_antigo:7.1f} MB/s")
+        print(f"   passada única:  {t_novo * 1000:8.2f} ms/página  {mb / t_novo:7.1f} MB/s")
+        print(f"   ganho: {t_antigo / t_novo:.1f}x")
+        if antigo == novo:
+            print("   ✓ saída idêntica")
+        else:
+            print("   ✗ saídas diferentes:")
+            print(f"     antiga: {json.dumps(antigo, ensure_ascii=False)}")
+            print(f"     nova:   {json.dumps(novo, ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
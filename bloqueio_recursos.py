@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Bloqueio de recursos nos navegadores via CDP (Network.setBlockedURLs).
+
+Por padrão o Chrome baixa imagens, fontes, vídeos, analytics e anúncios que
+nunca são lidos pela extração. BloqueioRecursos aplica, antes de cada
+driver.get(), a lista de padrões do domínio da URL:
+
+    BLOQUEIO_PADRAO (imagens, mídia, fontes, rastreadores conhecidos)
+    - 'permitir' do domínio (padrões que o site precisa)
+    + 'bloquear' do domínio (extras)
+
+Para medir o efeito, o driver precisa ser criado com
+configure_chrome_options(..., log_rede=True): o log de performance
+(net_utils.read_network_events) traz os eventos Network.* de cada página, de onde saem os bytes realmente baixados e
+os pedidos bloqueados. Como um pedido bloqueado nunca chega a ser baixado, a
+economia é estimada pelo tamanho típico de cada tipo de recurso
+(TAMANHO_TIPICO).
+"""
+
+import threading
+
+from cortesia import host_da_url
+from net_utils import enable_cdp_network
+
+# Imagens, mídia e fontes, com ou sem query string
+EXTENSOES_BLOQUEADAS = [
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp',
+    'mp4', 'webm', 'm3u8', 'mp3', 'ogg',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+]
+
+BLOQUEIO_PADRAO = [p for ext in EXTENSOES_BLOQUEADAS for p in (f'*.{ext}', f'*.{ext}?*')] + [
+    # Rastreadores e anúncios
+    '*google-analytics.com*', '*googletagmanager.com*', '*googlesyndication.com*',
+    '*doubleclick.net*', '*googleadservices.com*', '*adservice.google.*',
+    '*connect.facebook.net*', '*facebook.com/tr*', '*hotjar.com*', '*clarity.ms*',
+    '*criteo.*', '*taboola.com*', '*outbrain.com*', '*analytics.tiktok.com*',
+    '*nr-data.net*', '*js-agent.newrelic.com*', '*segment.io*', '*cdn.segment.com*',
+]
+
+# Ajustes por domínio: 'permitir' tira padrões do BLOQUEIO_PADRAO, 'bloquear' acrescenta
+BLOQUEIO_POR_DOMINIO = {
+    'olx.com.br': {'permitir': [], 'bloquear': ['*olx.com.br/ads/*']},
+    'mercadolivre.com.br': {'permitir': [], 'bloquear': ['*mlstatic.com/*.jpg*', '*mlstatic.com/*.webp*']},
+    'vivareal.com.br': {'permitir': [], 'bloquear': []},
+    'zapimoveis.com.br': {'permitir': [], 'bloquear': []},
+    'imovelweb.com.br': {'permitir': [], 'bloquear': []},
+}
+
+# Tamanho típico (bytes) de um recurso de cada tipo CDP, para estimar a economia
+TAMANHO_TIPICO = {
+    'Image': 40_000,
+    'Media': 500_000,
+    'Font': 35_000,
+    'Script': 60_000,
+    'Stylesheet': 20_000,
+    'XHR': 5_000,
+    'Fetch': 5_000,
+}
+TAMANHO_TIPICO_OUTROS = 10_000
+
+
+def padroes_bloqueados(url):
+    """Lista de padrões para Network.setBlockedURLs na página `url`."""
+    for dominio, politica in BLOQUEIO_POR_DOMINIO.items():
+        if dominio in url:
+            permitidos = set(politica.get('permitir', []))
+            return [p for p in BLOQUEIO_PADRAO if p not in permitidos] + list(politica.get('bloquear', []))
+    return list(BLOQUEIO_PADRAO)
+
+
+def medir_pagina(eventos):
+    """Retorna (bytes baixados, {tipo: pedidos bloqueados}) a partir dos eventos de uma página."""
+    tipos = {}
+    baixados = 0
+    bloqueados = {}
+    for metodo, params in eventos:
+        if metodo == 'Network.requestWillBeSent':
+            tipos[params.get('requestId')] = params.get('type', 'Other')
+        elif metodo == 'Network.loadingFinished':
+            baixados += params.get('encodedDataLength', 0) or 0
+        elif metodo == 'Network.loadingFailed' and params.get('blockedReason'):
+            tipo = params.get('type') or tipos.get(params.get('requestId'), 'Other')
+            bloqueados[tipo] = bloqueados.get(tipo, 0) + 1
+    return baixados, bloqueados
+
+
+class EstatisticasBloqueio:
+    """Bytes baixados e economia estimada por domínio."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.por_dominio = {}  # domínio -> [páginas, bytes baixados, pedidos bloqueados, bytes economizados]
+
+    def registrar(self, dominio, baixados, bloqueados):
+        economia = sum(TAMANHO_TIPICO.get(tipo, TAMANHO_TIPICO_OUTROS) * n for tipo, n in bloqueados.items())
+        with self.lock:
+            d = self.por_dominio.setdefault(dominio, [0, 0, 0, 0])
+            d[0] += 1
+            d[1] += baixados
+            d[2] += sum(bloqueados.values())
+            d[3] += economia
+        return economia
+
+    def resumo(self):
+        with self.lock:
+            linhas = []
+            for dominio, (paginas, baixados, bloqueados, economia) in sorted(self.por_dominio.items()):
+                linhas.append(f"{dominio}: {paginas} pág(s), {baixados / paginas / 1024:.0f} KB/pág baixados, "
+                              f"{bloqueados / paginas:.1f} pedidos bloqueados/pág "
+                              f"(~{economia / paginas / 1024:.0f} KB/pág economizados)")
+            return linhas
+
+
+class BloqueioRecursos:
+    def __init__(self, ativo=True):
+        self.ativo = ativo
+        self.stats = EstatisticasBloqueio()
+        self._aplicado = {}  # id(driver) -> tupla de padrões em vigor
+
+    def aplicar(self, driver, url):
+        """Configura no driver os padrões do domínio de `url` (só manda CDP se mudaram)."""
+        if not self.ativo:
+            return
+        padroes = tuple(padroes_bloqueados(url))
+        if self._aplicado.get(id(driver)) == padroes:
+            return
+        try:
+            enable_cdp_network(driver)
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(padroes)})
+            self._aplicado[id(driver)] = padroes
+        except Exception as e:
+            print(f"⚠️  Não foi possível bloquear recursos: {e}")
+
+    def esquecer(self, driver):
+        """Chamar ao fechar um driver (o id pode ser reutilizado por outro objeto)."""
+        self._aplicado.pop(id(driver), None)
+
+    def contabilizar(self, url, eventos):
+        """Registra bytes baixados/economizados a partir dos eventos de rede da página (read_network_events)."""
+        if not self.ativo or not eventos:
+            return
+        baixados, bloqueados = medir_pagina(eventos)
+        self.stats.registrar(host_da_url(url), baixados, bloqueados)
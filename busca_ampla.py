@@ -1,13 +1,17 @@
 import re
 import time
 import json
+import base64
 import requests
 import hashlib
 from urllib.parse import quote, urlparse, parse_qs, unquote
-from selenium.webdriver.common.by import By
 from pathlib import Path
 from datetime import datetime
 import undetected_chromedriver as uc
+from prontidao import Prontidao
+from net_utils import is_challenge_page
+from desafios import DesafioPendente
+import perfis
 
 BASE_DIR = Path(__file__).parent
 OUTPUT_DIR = BASE_DIR / "output"
@@ -35,6 +39,23 @@ area_re = re.compile(r"(\d{2,4})\s*m[²2]", re.IGNORECASE)
 rooms_re = re.compile(r"(\d+)\s*(?:quarto|quartos|q|qt)\b", re.IGNORECASE)
 
 
+# Resultados orgânicos primeiro (li.b_algo h2 a), depois todos os outros anchors da página
+JS_SERP_ANCHORS = """
+var out = [], vistos = new Set();
+var res = document.querySelectorAll('li.b_algo h2 a');
+for (var i = 0; i < res.length; i++) {
+    vistos.add(res[i]);
+    out.push({href: res[i].href, titulo: (res[i].textContent || '').trim(), posicao: i + 1, resultado: true});
+}
+var todos = document.querySelectorAll('a[href]');
+for (var j = 0; j < todos.length; j++) {
+    if (vistos.has(todos[j])) continue;
+    out.push({href: todos[j].href, titulo: (todos[j].textContent || '').trim().slice(0, 200), posicao: j + 1, resultado: false});
+}
+return out;
+"""
+
+
 def extract_real_url_from_bing_redirect(href):
     """
     Tenta extrair a URL real de um redirecionamento do Bing.
@@ -52,6 +73,15 @@ def extract_real_url_from_bing_redirect(href):
         # Tentar parâmetro 'u' (ck/a) - pode estar codificado
         if 'u' in params:
             real_url = params['u'][0]
+            # Formato atual: 'a1' + URL em base64 url-safe (sem padding)
+            if real_url.startswith('a1'):
+                try:
+                    b64 = real_url[2:]
+                    decoded = base64.urlsafe_b64decode(b64 + '=' * (-len(b64) % 4)).decode('utf-8')
+                    if decoded.startswith('http'):
+                        return decoded
+                except Exception:
+                    pass
             # Remover prefixo 'a1' ou 'a2' (encoding indicator)
             if real_url.startswith('a'):
                 real_url = real_url[2:]
@@ -146,12 +176,18 @@ def extract_from_text(text, url=None):
 
 
 class BroadSearcher:
-    def __init__(self, headless=True, slow_wait=2):
+    def __init__(self, headless=True, slow_wait=2, desafios=None, usar_perfis=True):
         self.headless = headless
         self.slow_wait = slow_wait
+        # FilaDesafios: com ela, um CAPTCHA vira DesafioPendente em vez de input()
+        self.desafios = desafios
         self.driver = None
+        self.prontidao = Prontidao()
+        # Perfil persistente: o Bing reconhece o navegador e pede menos verificação
+        self.perfis = perfis.gerenciador('busca') if usar_perfis else None
 
     def start_driver(self):
+        perfil = self.perfis.adquirir() if self.perfis else None
         try:
             options = uc.ChromeOptions()
             # explicit headless control
@@ -160,24 +196,46 @@ class BroadSearcher:
             options.add_argument('--no-sandbox')
             options.add_argument('--disable-dev-shm-usage')
             options.add_argument("--disable-blink-features=AutomationControlled")
+            if perfil:
+                options.add_argument(f'--user-data-dir={perfil.pasta}')
+                if perfil.user_agent:
+                    options.add_argument(f'--user-agent={perfil.user_agent}')
+                if perfil.proxy:
+                    options.add_argument(f'--proxy-server={perfil.proxy}')
             self.driver = uc.Chrome(options=options, version_main=None)
+            if self.perfis:
+                self.perfis.vincular(self.driver, perfil)
             time.sleep(1)
             return True
         except Exception as e:
             print(f"✗ Falha ao iniciar driver undetected: {e}")
+            if self.perfis:
+                self.perfis.devolver(perfil)
             return False
 
+    def close_driver(self):
+        if self.driver is None:
+            return
+        if self.perfis:
+            # Guarda os cookies de sessão no perfil (ou o aposenta, se o Bing desafiou demais)
+            self.perfis.liberar(self.driver)
+        try:
+            self.driver.quit()
+        except:
+            pass
+        self.driver = None
+
     def visit_and_extract(self, url):
         try:
             self.driver.get(url)
-            time.sleep(self.slow_wait)
+            self.prontidao.aguardar(self.driver, url, espera_fixa=self.slow_wait)
             # scroll a bit
             for _ in range(2):
                 try:
                     self.driver.execute_script("window.scrollBy(0, window.innerHeight);")
                 except:
                     pass
-                time.sleep(1)
+                self.prontidao.aguardar_rede(self.driver, url, espera_fixa=1)
             text = self.driver.page_source
             # Normalize text
             text_clean = re.sub(r"\s+", " ", text)
@@ -187,119 +245,98 @@ class BroadSearcher:
             print(f"  ✗ Erro ao visitar {url}: {e}")
             return None
 
+    def _seguir_redirecionamento(self, href):
+        """Abre o link numa aba nova para descobrir a URL final; fecha a aba e volta para a SERP."""
+        principal = self.driver.current_window_handle
+        try:
+            self.driver.switch_to.new_window('tab')
+            self.driver.get(href)
+            self.prontidao.aguardar_rede(self.driver, href, espera_fixa=self.slow_wait)
+            return self.driver.current_url
+        except Exception:
+            return None
+        finally:
+            try:
+                if self.driver.current_window_handle != principal:
+                    self.driver.close()
+                self.driver.switch_to.window(principal)
+            except Exception:
+                pass
+
     def bing_site_search_browser(self, query, domain, limit=5):
         """
         Use the browser to perform a Bing site:domain search and extract result links.
         
         FIXED: Agora extrai URLs reais dos domínios alvo, não URLs de redirecionamento do Bing.
+        Os anchors vêm todos de um único execute_script; os redirecionamentos ck/a são
+        decodificados offline e só os que falharem são abertos numa aba.
         """
         q = f"site:{domain} {query}"
         url = f"https://www.bing.com/search?q={quote(q)}"
         links = []
         
         try:
+            if self.desafios:
+                self.desafios.aplicar_cookies(self.driver, url)
             self.driver.get(url)
-            time.sleep(self.slow_wait + 1)
+            self.prontidao.aguardar(self.driver, url, espera_fixa=self.slow_wait + 1)
             
             # scroll a bit to ensure JS loads
             try:
                 self.driver.execute_script("window.scrollBy(0, window.innerHeight);")
             except:
                 pass
-            time.sleep(1)
-
-            # Method 1: Bing results via CSS selector 'li.b_algo h2 a'
-            try:
-                # Detect if Bing is showing a challenge page and pause for manual solve
-                pg = self.driver.page_source
-                if 'One last step' in pg or 'Please solve the challenge' in pg or 'Verifying' in pg:
-                    print('\n⚠️ Bing is presenting a challenge (CAPTCHA/verification).')
-                    print('   Please solve it in the opened browser window.')
-                    input('   Press Enter here after you complete the challenge to continue...')
-
-                elems = self.driver.find_elements(By.CSS_SELECTOR, 'li.b_algo h2 a')
-                # We'll click anchors instead of trusting hrefs to follow the redirect chain
-                for a in elems:
-                    try:
-                        # If element is not interactable, try to extract href fallback
-                        href = a.get_attribute('href')
-                        # Try clicking to land on the real page (handles redirects)
-                        try:
-                            a.click()
-                            time.sleep(self.slow_wait)
-                        except Exception:
-                            # clicking may fail in headless or stale elements; fallback to href
-                            pass
-
-                        # If a new tab was opened, switch to it
-                        try:
-                            handles = self.driver.window_handles
-                            if len(handles) > 1:
-                                self.driver.switch_to.window(handles[-1])
-                                real_url = self.driver.current_url
-                            else:
-                                real_url = self.driver.current_url
-                        except Exception:
-                            real_url = href
-
-                        # If the URL is a Bing redirect URL, attempt to extract the real url
-                        if real_url and ('bing.com' in real_url or 'microsoft' in real_url):
-                            decoded = extract_real_url_from_bing_redirect(real_url)
-                            if decoded:
-                                real_url = decoded
-
-                        if real_url and domain in real_url and real_url not in links:
-                            links.append(real_url)
-
-                        # If we opened a new tab, close it and switch back
-                        try:
-                            handles = self.driver.window_handles
-                            if len(handles) > 1:
-                                self.driver.close()
-                                self.driver.switch_to.window(handles[0])
-                        except Exception:
-                            pass
-
-                        if len(links) >= limit:
-                            break
-                    except Exception:
+            self.prontidao.aguardar_rede(self.driver, url, espera_fixa=1)
+
+            # Detect if Bing is showing a challenge page
+            pg = self.driver.page_source
+            desafio = is_challenge_page(pg)
+            if self.perfis:
+                self.perfis.registrar(self.driver, desafio)
+            if desafio:
+                if self.desafios:
+                    # Quem chamou encaminha para a fila de desafios e segue com outra busca
+                    raise DesafioPendente(url)
+                # Uso interativo (sem fila de desafios): pause for manual solve
+                print('\n⚠️ Bing is presenting a challenge (CAPTCHA/verification).')
+                print('   Please solve it in the opened browser window.')
+                input('   Press Enter here after you complete the challenge to continue...')
+
+            # Uma única chamada traz todos os anchors da SERP (antes: 1 round trip por anchor + clique em cada resultado)
+            anchors = self.driver.execute_script(JS_SERP_ANCHORS) or []
+            nao_decodificados = []
+            for a in anchors:
+                href = (a.get('href') or '').strip()
+                if not href:
+                    continue
+                if 'bing.com' in href or 'microsoft' in href:
+                    real = extract_real_url_from_bing_redirect(href)
+                    if not real:
+                        # Só vale abrir em aba os resultados orgânicos, não a navegação do Bing
+                        if a.get('resultado'):
+                            nao_decodificados.append(href)
                         continue
-            except Exception as e:
-                print(f"  ⚠ CSS selector/click flow falhou: {e}")
+                elif href.startswith('http'):
+                    # Direct link - remove tracking params
+                    real = href.split('?')[0]
+                else:
+                    continue
+                if domain in real and real not in links:
+                    links.append(real)
+                if len(links) >= limit:
+                    break
 
-            # Method 2: Robust anchor scan - sempre tentar coletar anchors com o domínio alvo
-            try:
-                anchors = self.driver.find_elements(By.CSS_SELECTOR, 'a')
-                for a in anchors:
-                    try:
-                        href = a.get_attribute('href')
-                        if not href:
-                            continue
-                        # normalize
-                        href = href.strip()
-                        # If href is a Bing redirect, try to extract real URL
-                        if 'bing.com' in href or 'microsoft' in href:
-                            real = extract_real_url_from_bing_redirect(href)
-                            if real and domain in real and real not in links:
-                                links.append(real)
-                        else:
-                            # Direct link - check domain
-                            if domain in href and href.startswith('http'):
-                                # remove tracking params
-                                if '?' in href:
-                                    href_clean = href.split('?')[0]
-                                else:
-                                    href_clean = href
-                                if href_clean not in links:
-                                    links.append(href_clean)
-                        if len(links) >= limit:
-                            break
-                    except:
-                        continue
-            except Exception as e:
-                print(f"  ⚠ Anchor scan falhou: {e}")
+            # Fallback: redirecionamentos que não deu para decodificar são seguidos numa aba
+            for href in nao_decodificados:
+                if len(links) >= limit:
+                    break
+                real = self._seguir_redirecionamento(href)
+                if real and domain in real and real not in links:
+                    links.append(real)
 
             return links[:limit]
+        except DesafioPendente:
+            raise
         except Exception as e:
             print(f"  ✗ Erro no Bing (browser) para {domain}: {e}")
             return []
@@ -322,7 +359,11 @@ class BroadSearcher:
             for domain in domains:
                 print(f"\n🔎 Buscando em: {domain}")
                 # Use browser-based SERP extraction to handle JS-rendered pages
-                links = self.bing_site_search_browser(query, domain, limit=links_per_domain)
+                try:
+                    links = self.bing_site_search_browser(query, domain, limit=links_per_domain)
+                except DesafioPendente as e:
+                    self.desafios.encaminhar(str(e))
+                    links = []
                 # Fallback to requests-based search if browser returned none
                 if not links:
                     links = bing_site_search(query, domain, limit=links_per_domain)
@@ -340,10 +381,13 @@ class BroadSearcher:
                 if len(results) >= MAX_PAGES_TO_VISIT:
                     break
         finally:
-            try:
-                self.driver.quit()
-            except:
-                pass
+            self.close_driver()
+
+        for linha in self.prontidao.stats.resumo():
+            print(f"  ⏱️  {linha}")
+        if self.perfis:
+            for linha in self.perfis.resumo():
+                print(f"  🗂️  {linha}")
 
         # deduplicate by id
         unique = {r['id']: r for r in results}
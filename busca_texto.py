@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca de texto (FTS5) em titulo, descricao e endereco de `imoveis`.
+
+A tabela virtual `imoveis_fts` do imoveis.db usa o tokenizador unicode61 com
+remove_diacritics: "piscina", "PISCINA" e "píscina" são o mesmo termo, e
+"churrasqueira" acha "Churrasqueira" no título. Os triggers de `imoveis`
+mantêm o índice em dia para qualquer caminho de escrita (ImovelDB, scripts
+com INSERT OR REPLACE, migrar): o BEFORE INSERT tira a linha que o REPLACE
+vai apagar, já que o trigger de DELETE não dispara no REPLACE.
+
+O índice liga pelo rowid de `imoveis`. Um VACUUM pode renumerar esses
+rowids (a chave de `imoveis` é texto); depois dele, rodar `reindexar`.
+
+A busca em si fica em consultar_imoveis.py (--texto), ordenada por BM25
+com trecho destacado:
+    python consultar_imoveis.py --texto "piscina churrasqueira" --cidade Curitiba
+
+Uso:
+    python busca_texto.py reindexar   # reconstrói o índice inteiro
+    python busca_texto.py otimizar    # junta os segmentos (após cargas grandes)
+"""
+
+import argparse
+import re
+import sqlite3
+
+FTS_TABLE = 'imoveis_fts'
+FTS_COLUNAS = ('titulo', 'descricao', 'endereco')
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+BM25_PESOS = (5.0, 1.0, 2.0)  # na ordem de FTS_COLUNAS: termo no título vale mais
+SNIPPET_TOKENS = 12  # palavras no trecho
+SNIPPET_MARCAS = ('[', ']', '…')  # início/fim do destaque, reticências
+
+_COLS = ', '.join(FTS_COLUNAS)
+_NEW = ', '.join(f'NEW.{c}' for c in FTS_COLUNAS)
+
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({_COLS}, tokenize='{FTS_TOKENIZER}')",
+    # REPLACE não dispara o trigger de DELETE: tira a versão antiga antes de inserir
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_imoveis_fts_substitui BEFORE INSERT ON imoveis
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT rowid FROM imoveis WHERE id = NEW.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_imoveis_fts_insere AFTER INSERT ON imoveis
+    BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, {_COLS}) VALUES (NEW.rowid, {_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_imoveis_fts_atualiza AFTER UPDATE OF {_COLS} ON imoveis
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.rowid;
+        INSERT INTO {FTS_TABLE} (rowid, {_COLS}) VALUES (NEW.rowid, {_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_imoveis_fts_apaga AFTER DELETE ON imoveis
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.rowid;
+    END
+    """,
+)
+
+
+def criar_indice(conn):
+    """
+    Cria imoveis_fts e os triggers (idempotente). Na primeira vez indexa as
+    linhas que já existem. Retorna False se o SQLite não tem FTS5.
+    """
+    existia = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)).fetchone()
+    try:
+        for sql in FTS_SCHEMA:
+            conn.execute(sql)
+    except sqlite3.OperationalError as e:
+        if 'fts5' not in str(e):
+            raise
+        print(f"⚠️  SQLite sem FTS5, busca de texto desativada: {e}")
+        return False
+    if not existia:
+        reindexar(conn)
+    return True
+
+
+def reindexar(conn):
+    """Reconstrói imoveis_fts a partir de imoveis. Retorna quantas linhas."""
+    conn.execute(f"DELETE FROM {FTS_TABLE}")
+    return conn.execute(f"INSERT INTO {FTS_TABLE} (rowid, {_COLS}) SELECT rowid, {_COLS} FROM imoveis").rowcount
+
+
+def consulta_fts(texto):
+    """
+    Termos digitados -> expressão MATCH. Cada palavra vira um termo entre
+    aspas (hífen, aspas e dois-pontos não quebram a sintaxe), todos
+    obrigatórios; OR entre palavras e prefixo com * continuam valendo:
+    'piscina churrasqueira' -> '"piscina" "churrasqueira"', 'mobil*' -> '"mobil"*'.
+    """
+    termos = []
+    for palavra in re.findall(r'"[^"]*"|\S+', texto):
+        if palavra == 'OR':
+            termos.append(palavra)
+            continue
+        prefixo = palavra.endswith('*')
+        palavra = palavra.strip('"*')
+        if palavra:
+            termos.append('"' + palavra.replace('"', '""') + '"' + ('*' if prefixo else ''))
+    # OR solto no começo/fim é erro de sintaxe no FTS5
+    while termos and termos[0] == 'OR':
+        termos.pop(0)
+    while termos and termos[-1] == 'OR':
+        termos.pop()
+    return ' '.join(termos)
+
+
+def expressao_bm25():
+    """Relevância para ORDER BY (menor = mais relevante, como o bm25 do FTS5)."""
+    return f"bm25({FTS_TABLE}, {', '.join(str(p) for p in BM25_PESOS)})"
+
+
+def expressao_snippet():
+    """Trecho da coluna que casou, com os termos entre SNIPPET_MARCAS."""
+    inicio, fim, reticencias = SNIPPET_MARCAS
+    return f"snippet({FTS_TABLE}, -1, '{inicio}', '{fim}', '{reticencias}', {SNIPPET_TOKENS})"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Índice de texto (FTS5) de imoveis')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('reindexar', help='Reconstruir imoveis_fts a partir de imoveis')
+    sub.add_parser('otimizar', help='Juntar os segmentos do índice (mais rápido para buscar)')
+    args = parser.parse_args()
+
+    # Import tardio: ImovelDB cria o índice com FTS_SCHEMA deste módulo
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB()
+    db.flush()
+    with sqlite3.connect(db.db_path, timeout=30) as conn:
+        if args.comando == 'reindexar':
+            n = reindexar(conn)
+            print(f"🔎 {n} imóvel(is) indexado(s) para busca de texto")
+        else:
+            conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            print("🔎 Índice de texto otimizado")
+    db.close()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache HTTP em disco para GET condicional nos recrawls.
+
+Para cada URL (na forma canônica: host minúsculo, sem fragmento, sem
+parâmetros de rastreamento, query ordenada) o `cache_http.db` guarda o
+ETag e o Last-Modified da última resposta aproveitada. No recrawl o GET sai
+com If-None-Match / If-Modified-Since; um 304 quer dizer "nada mudou" e quem
+chamou pula a extração e a escrita no imoveis.db.
+
+Convenção dos fetchers: o validador só é guardado (guardar) depois que o
+que a resposta rendeu está gravado no banco (ImovelDB.guardar_validador);
+se a extração falhar, esquecer(url) apaga o validador para o próximo GET
+baixar a página inteira de novo.
+
+    cache = CacheHTTP()
+    r = session.get(url, headers=cache.cabecalhos(url))
+    if cache.resposta(url, r.status_code, r.headers):
+        ...  # 304: inalterada
+    else:
+        ...  # extrai, grava e cache.guardar(url, r.headers, r.content)
+
+Uso:
+    python cache_http.py stats
+    python cache_http.py limpar --dominio imovelweb.com.br
+"""
+
+import argparse
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from cortesia import host_da_url
+from page_store import comprimir, descomprimir, zstandard
+
+CACHE_DB_PATH = Path(__file__).parent / "cache_http.db"
+CACHE_COMMIT_EVERY = 50  # respostas por transação
+# Parâmetros de query que não mudam o conteúdo (prefixos)
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', '_ga')
+
+NAO_MODIFICADO = 304
+# Retorno dos fetchers que devolvem HTML quando a página não mudou desde a última coleta
+INALTERADO = object()
+
+
+def url_canonica(url):
+    """Chave do cache: mesma página com outra ordem de query ou utm_* vira a mesma URL."""
+    partes = urlsplit(url.strip())
+    esquema = partes.scheme.lower()
+    host = (partes.hostname or '').lower()
+    if partes.port and (esquema, partes.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{partes.port}"
+    query = sorted((k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True)
+                   if not k.lower().startswith(TRACKING_PARAMS))
+    return urlunsplit((esquema, host, partes.path or '/', urlencode(query), ''))
+
+
+class EstatisticasCache:
+    """Pedidos, respostas 304 e bytes poupados por host."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.por_host = {}  # host -> [pedidos, com validador, 304, bytes poupados]
+
+    def pedido(self, host, condicional):
+        with self.lock:
+            h = self.por_host.setdefault(host, [0, 0, 0, 0])
+            h[0] += 1
+            h[1] += 1 if condicional else 0
+
+    def nao_modificado(self, host, tamanho):
+        with self.lock:
+            h = self.por_host.setdefault(host, [0, 0, 0, 0])
+            h[2] += 1
+            h[3] += tamanho or 0
+
+    def taxa_acerto(self):
+        with self.lock:
+            pedidos = sum(h[0] for h in self.por_host.values())
+            acertos = sum(h[2] for h in self.por_host.values())
+        return acertos / pedidos if pedidos else None
+
+    def resumo(self):
+        with self.lock:
+            itens = sorted(self.por_host.items())
+        linhas = []
+        for host, (pedidos, condicionais, acertos, poupados) in itens:
+            linhas.append(f"{host}: {acertos}/{pedidos} inalterada(s) ({acertos / pedidos:.0%}), "
+                          f"{condicionais} com validador, {poupados / 1024 / 1024:.1f} MB poupados")
+        taxa = self.taxa_acerto()
+        if len(itens) > 1 and taxa is not None:
+            linhas.append(f"total: taxa de acerto {taxa:.0%}")
+        return linhas
+
+
+class CacheHTTP:
+    """Validadores (ETag / Last-Modified) por URL canônica. Thread-safe."""
+
+    def __init__(self, db_path=CACHE_DB_PATH, compressao=None):
+        self.db_path = db_path
+        self.compressao = compressao or ('zstd' if zstandard is not None else 'zlib')
+        self.lock = threading.Lock()
+        self._conn = None
+        self._pendentes = 0
+        self.stats = EstatisticasCache()
+        self._init_schema()
+        atexit.register(self.close)
+
+    def _init_schema(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    tamanho INTEGER,
+                    compressao TEXT,
+                    corpo BLOB,
+                    baixado_em TEXT NOT NULL,
+                    validado_em TEXT
+                )
+            """)
+            conn.commit()
+
+    def _conexao(self):
+        # Conexão única compartilhada entre threads; o acesso é serializado por self.lock
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def _escrever(self, sql, params):
+        with self.lock:
+            conn = self._conexao()
+            conn.execute(sql, params)
+            self._pendentes += 1
+            if self._pendentes >= CACHE_COMMIT_EVERY:
+                conn.commit()
+                self._pendentes = 0
+
+    def _ler(self, chave, colunas):
+        with self.lock:
+            return self._conexao().execute(f"SELECT {colunas} FROM respostas WHERE url = ?", (chave,)).fetchone()
+
+    def cabecalhos(self, url):
+        """If-None-Match / If-Modified-Since para um GET de `url` ({} se a URL não tem validador)."""
+        row = self._ler(url_canonica(url), "etag, last_modified")
+        cabecalhos = {}
+        if row:
+            if row[0]:
+                cabecalhos['If-None-Match'] = row[0]
+            if row[1]:
+                cabecalhos['If-Modified-Since'] = row[1]
+        self.stats.pedido(host_da_url(url), bool(cabecalhos))
+        return cabecalhos
+
+    def resposta(self, url, status, headers=None):
+        """
+        Registra a resposta de um GET feito com cabecalhos(url). Retorna True
+        se foi 304, isto é, a página não mudou desde o último guardar().
+        """
+        if status != NAO_MODIFICADO:
+            return False
+        chave = url_canonica(url)
+        row = self._ler(chave, "tamanho")
+        self.stats.nao_modificado(host_da_url(url), row[0] if row else 0)
+        # Um 304 pode trazer validador novo
+        headers = headers or {}
+        self._escrever("""
+            UPDATE respostas SET validado_em = ?,
+                etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+            WHERE url = ?
+        """, (datetime.now().isoformat(), headers.get('ETag'), headers.get('Last-Modified'), chave))
+        return True
+
+    def guardar(self, url, headers, conteudo=None, corpo=False):
+        """
+        Guarda o ETag / Last-Modified de uma resposta 200 já aproveitada.
+        Com `corpo=True` guarda também o conteúdo (comprimido), para quem
+        precisa dele mesmo quando a resposta é 304 (ex.: paginação de API).
+        """
+        etag, modificado = headers.get('ETag'), headers.get('Last-Modified')
+        if not etag and not modificado:
+            # Resposta sem validador: um validador antigo não vale mais
+            self.esquecer(url)
+            return
+        dados = conteudo.encode('utf-8') if isinstance(conteudo, str) else conteudo
+        blob = comprimir(dados, self.compressao) if corpo and dados is not None else None
+        agora = datetime.now().isoformat()
+        self._escrever("""
+            INSERT OR REPLACE INTO respostas
+            (url, etag, last_modified, tamanho, compressao, corpo, baixado_em, validado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (url_canonica(url), etag, modificado, len(dados or b''),
+              self.compressao if blob is not None else None, blob, agora, agora))
+
+    def corpo(self, url):
+        """Conteúdo guardado com guardar(..., corpo=True), em texto; None se não há."""
+        row = self._ler(url_canonica(url), "corpo, compressao")
+        if not row or row[0] is None:
+            return None
+        return descomprimir(row[0], row[1]).decode('utf-8', errors='replace')
+
+    def esquecer(self, url):
+        """Apaga o validador de `url` (a próxima coleta baixa a página inteira)."""
+        self._escrever("DELETE FROM respostas WHERE url = ?", (url_canonica(url),))
+
+    def flush(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._pendentes = 0
+
+    def close(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+def cmd_stats(args):
+    cache = CacheHTTP()
+    cache.flush()
+    with sqlite3.connect(cache.db_path) as conn:
+        total, etags, datas, corpos, validadas = conn.execute("""
+            SELECT COUNT(*), COUNT(etag), COUNT(last_modified), COUNT(corpo),
+                   SUM(validado_em > baixado_em)
+            FROM respostas
+        """).fetchone()
+        por_host = {}
+        for (url,) in conn.execute("SELECT url FROM respostas"):
+            host = host_da_url(url)
+            por_host[host] = por_host.get(host, 0) + 1
+    print(f"🗃️  {total} URL(s) com validador ({etags} ETag, {datas} Last-Modified, {corpos} com corpo)")
+    print(f"   {validadas or 0} confirmada(s) inalterada(s) por 304 desde o último download")
+    for host, n in sorted(por_host.items(), key=lambda x: -x[1])[:20]:
+        print(f"   {host:30} {n}")
+
+
+def cmd_limpar(args):
+    cache = CacheHTTP()
+    cache.flush()
+    with sqlite3.connect(cache.db_path) as conn:
+        if args.dominio:
+            n = conn.execute("DELETE FROM respostas WHERE url LIKE ?", (f"%{args.dominio}%",)).rowcount
+        else:
+            n = conn.execute("DELETE FROM respostas").rowcount
+        conn.commit()
+    print(f"🧹 {n} validador(es) apagado(s): a próxima coleta baixa essas páginas inteiras")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cache HTTP (ETag / Last-Modified) dos recrawls')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('stats', help='Resumo do cache_http.db').set_defaults(func=cmd_stats)
+    p = sub.add_parser('limpar', help='Apaga validadores (força download completo)')
+    p.add_argument('--dominio', type=str, default=None, help='Só URLs deste domínio')
+    p.set_defaults(func=cmd_limpar)
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Captura das APIs JSON que as páginas de listagem chamam.
+
+Sites como OLX, VivaReal/ZAP e ImovelWeb montam a listagem a partir de uma
+chamada XHR/fetch que devolve dezenas de anúncios já estruturados. Em vez de
+adivinhar campos no HTML renderizado, CapturaAPI lê os eventos CDP Network.*
+do log de performance (net_utils.read_network_events), separa
+as respostas cujo URL casa com os padrões do domínio (PADROES_API) e baixa o
+corpo inteiro com Network.getResponseBody — sem o corte de 20.000 caracteres
+do network_inspector.py.
+
+Cada anúncio do JSON passa por normalizar(), no mesmo espírito do
+normalize() do base.py, e sai no formato de extracao.extrair_dados.
+"""
+
+import base64
+import json
+import re
+import threading
+from urllib.parse import urljoin
+
+from cortesia import host_da_url
+from net_utils import enable_cdp_network
+
+# Respostas de API capturadas por domínio da página (regex sobre o URL da resposta)
+PADROES_API = {
+    'olx.com.br': [r'olx\.com\.br/.*(?:items\?|adsearch|/ads\?|/search)', r'apigw\.olx\.com\.br'],
+    'vivareal.com.br': [r'glue-api\.vivareal\.com(?:\.br)?/v\d+/listings'],
+    'zapimoveis.com.br': [r'glue-api\.zapimoveis\.com(?:\.br)?/v\d+/listings'],
+    'imovelweb.com.br': [r'imovelweb\.com\.br/rplis-api/postings'],
+    'mercadolivre.com.br': [r'api\.mercadolibre\.com/sites/MLB/search'],
+}
+_PADROES_COMPILADOS = {d: [re.compile(p, re.I) for p in ps] for d, ps in PADROES_API.items()}
+
+# Nomes de campos vistos nas APIs (caminhos com "." descem em dicts; números indexam listas)
+CAMPOS = {
+    'titulo': ['title', 'subject', 'name', 'titulo'],
+    'preco': ['price', 'priceValue', 'pricingInfos.0.price', 'priceOperationTypes.0.prices.0.amount', 'preco'],
+    'metragem': ['size', 'usableAreas.0', 'area', 'totalAreas.0', 'propiedad.area'],
+    'quartos': ['rooms', 'bedrooms.0', 'bedrooms'],
+    'banheiros': ['bathrooms.0', 'bathrooms'],
+    'descricao': ['description', 'body', 'descricao'],
+    'endereco': ['address.street', 'location.address', 'location.neighbourhood', 'location.neighborhood',
+                 'address.neighborhood', 'postingLocation.address.name'],
+    'cidade': ['location.municipality', 'address.city', 'municipality', 'city', 'postingLocation.location.parent.name'],
+    'estado': ['location.uf', 'location.state_uf', 'state_uf', 'address.stateAcronym', 'uf'],
+    'cep': ['zip', 'zipCode', 'address.zipCode', 'location.zipcode'],
+    'contato': ['phone', 'telephone', 'account.phone', 'publisher.phone'],
+    'link': ['ad_url', 'url', 'friendlyUrl', 'link.href', 'permalink', 'href'],
+}
+# OLX manda atributos como properties: [{"name": "size", "value": "70m²"}, ...]
+PROPRIEDADES = {'metragem': 'size', 'quartos': 'rooms', 'banheiros': 'bathrooms'}
+
+
+def _caminho(obj, caminho):
+    for parte in caminho.split('.'):
+        if isinstance(obj, dict):
+            obj = obj.get(parte)
+        elif isinstance(obj, list) and parte.isdigit() and int(parte) < len(obj):
+            obj = obj[int(parte)]
+        else:
+            return None
+        if obj is None:
+            return None
+    return obj
+
+
+def _primeiro(item, caminhos):
+    for caminho in caminhos:
+        valor = _caminho(item, caminho)
+        if valor not in (None, '', [], {}) and not isinstance(valor, (dict, list)):
+            return valor
+    return None
+
+
+def _propriedade(item, nome):
+    for prop in item.get('properties') or []:
+        if isinstance(prop, dict) and prop.get('name') == nome:
+            return prop.get('value')
+    return None
+
+
+def _parece_anuncio(obj):
+    return isinstance(obj, dict) and _primeiro(obj, CAMPOS['titulo']) is not None and (
+        _primeiro(obj, CAMPOS['preco']) is not None or _primeiro(obj, CAMPOS['link']) is not None)
+
+
+def iter_anuncios(payload, profundidade=0):
+    """Percorre o JSON e devolve os dicts que parecem anúncios (título + preço ou link)."""
+    if profundidade > 12:
+        return
+    if isinstance(payload, dict):
+        # VivaReal/ZAP: {"listing": {...}, "link": {"href": ...}}
+        if isinstance(payload.get('listing'), dict):
+            item = dict(payload['listing'])
+            item.setdefault('link', payload.get('link'))
+            if _parece_anuncio(item):
+                yield item
+                return
+        if _parece_anuncio(payload):
+            yield payload
+            return
+        for valor in payload.values():
+            yield from iter_anuncios(valor, profundidade + 1)
+    elif isinstance(payload, list):
+        for valor in payload:
+            yield from iter_anuncios(valor, profundidade + 1)
+
+
+def normalizar(item, url_pagina):
+    """Converte um anúncio da API no dicionário de extrair_dados (None se não tiver link)."""
+    v = {campo: _primeiro(item, caminhos) for campo, caminhos in CAMPOS.items()}
+    for campo, nome in PROPRIEDADES.items():
+        if v[campo] is None:
+            v[campo] = _propriedade(item, nome)
+
+    link = v['link']
+    if not link and item.get('list_id') and 'olx.com.br' in url_pagina:
+        link = f"https://www.olx.com.br/vi/{item['list_id']}"
+    if not link:
+        return None
+    link = urljoin(url_pagina, str(link))
+
+    preco = v['preco']
+    if preco is not None and not str(preco).strip().startswith('R$'):
+        preco = f"R$ {preco}"
+    metragem = v['metragem']
+    if metragem is not None and 'm' not in str(metragem):
+        metragem = f"{metragem} m²"
+
+    return {
+        'titulo': str(v['titulo']).strip(),
+        'preco': preco,
+        'metragem': metragem,
+        'quartos': f"{v['quartos']} Q" if v['quartos'] is not None else None,
+        'banheiros': f"{v['banheiros']} B" if v['banheiros'] is not None else None,
+        'descricao': v['descricao'],
+        'endereco': v['endereco'],
+        'cidade': v['cidade'],
+        'estado': v['estado'],
+        'cep': v['cep'],
+        'contato': v['contato'],
+        'link': link,
+    }
+
+
+def padroes_para(url):
+    for dominio, padroes in _PADROES_COMPILADOS.items():
+        if dominio in url:
+            return padroes
+    return []
+
+
+class CapturaAPI:
+    """Extrai anúncios das respostas JSON capturadas durante o carregamento de uma página."""
+
+    def __init__(self, ativo=True):
+        self.ativo = ativo
+        self.lock = threading.Lock()
+        self.por_dominio = {}  # domínio -> [páginas com captura, respostas, anúncios]
+        self._preparados = set()
+
+    def preparar(self, driver):
+        """Liga o domínio Network com buffer suficiente para corpos grandes (uma vez por driver)."""
+        if not self.ativo or id(driver) in self._preparados:
+            return
+        try:
+            enable_cdp_network(driver)
+            self._preparados.add(id(driver))
+        except Exception as e:
+            print(f"⚠️  Não foi possível preparar a captura de API: {e}")
+
+    def esquecer(self, driver):
+        self._preparados.discard(id(driver))
+
+    def respostas(self, driver, url, eventos):
+        """Baixa os corpos das respostas de API da página: lista de (url da resposta, texto)."""
+        padroes = padroes_para(url)
+        if not self.ativo or not padroes:
+            return []
+        candidatas = {}
+        terminadas = set()
+        for metodo, params in eventos:
+            if metodo == 'Network.responseReceived':
+                resposta = params.get('response', {})
+                url_resposta = resposta.get('url', '')
+                if 'json' in resposta.get('mimeType', '') and any(p.search(url_resposta) for p in padroes):
+                    candidatas[params.get('requestId')] = url_resposta
+            elif metodo == 'Network.loadingFinished':
+                terminadas.add(params.get('requestId'))
+
+        corpos = []
+        for request_id, url_resposta in candidatas.items():
+            if request_id not in terminadas:
+                continue
+            try:
+                r = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception:
+                # Corpo já descartado pelo navegador (navegação seguinte, buffer cheio)
+                continue
+            corpo = r.get('body', '')
+            if r.get('base64Encoded'):
+                corpo = base64.b64decode(corpo).decode('utf-8', errors='replace')
+            corpos.append((url_resposta, corpo))
+        return corpos
+
+    def anuncios(self, url, corpos):
+        """Normaliza os anúncios encontrados nos corpos JSON (deduplicados por link)."""
+        registros = {}
+        for _, corpo in corpos:
+            try:
+                payload = json.loads(corpo)
+            except ValueError:
+                continue
+            for item in iter_anuncios(payload):
+                dados = normalizar(item, url)
+                if dados:
+                    registros.setdefault(dados['link'], dados)
+        if corpos:
+            with self.lock:
+                d = self.por_dominio.setdefault(host_da_url(url), [0, 0, 0])
+                d[0] += 1
+                d[1] += len(corpos)
+                d[2] += len(registros)
+        return list(registros.values())
+
+    def resumo(self):
+        with self.lock:
+            return [f"{dominio}: {anuncios} anúncio(s) de {respostas} resposta(s) em {paginas} página(s)"
+                    for dominio, (paginas, respostas, anuncios) in sorted(self.por_dominio.items())]
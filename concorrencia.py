@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Concorrência adaptativa por domínio (AIMD).
+
+MAX_WORKERS define o tamanho do pool compartilhado; quantos desses workers
+cada domínio ocupa ao mesmo tempo é decidido aqui, domínio a domínio:
+
+- aumento aditivo: a cada janela de `limite` resultados saudáveis (taxa de
+  sucesso >= AIMD_MIN_SUCCESS, nenhum bloqueio e latência até
+  AIMD_LATENCY_FACTOR x a latência base do domínio), o limite sobe 1;
+- corte multiplicativo: um bloqueio (HTTP 429/403, página de desafio,
+  timeout) multiplica o limite por AIMD_DECREASE. Os pedidos que já estavam
+  em voo no momento do corte não cortam de novo (chegam todos juntos).
+
+Assim a OLX sobe até AIMD_MAX enquanto responde bem, e o imovelweb, que
+devolve recaptcha (imovelweb_debug.html), desce para AIMD_MIN sozinho.
+
+O alimentador do pool chama tentar(dominio) antes de despachar um link; o
+worker chama registrar() com o resultado e liberar() ao terminar o link.
+"""
+
+import threading
+
+AIMD_INITIAL = 2  # workers por domínio no início
+AIMD_MIN = 1
+AIMD_MAX = 10
+AIMD_DECREASE = 0.5  # fator do corte multiplicativo
+AIMD_MIN_SUCCESS = 0.7  # taxa de sucesso mínima numa janela para subir o limite
+AIMD_LATENCY_FACTOR = 2.0  # latência acima de N x a base segura o aumento
+LATENCY_EWMA_ALPHA = 0.2
+
+# Limites (mín, máx) por domínio, ex.: {'olx.com.br': (2, 16)}; os demais usam (AIMD_MIN, AIMD_MAX)
+LIMITES_POR_DOMINIO = {}
+
+# Resultados aceitos por registrar()
+OK, FALHA, BLOQUEIO = 'ok', 'falha', 'bloqueio'
+
+
+def eh_timeout(exc):
+    """Timeout do navegador (selenium TimeoutException) ou de rede, sem importar selenium."""
+    return isinstance(exc, TimeoutError) or 'Timeout' in type(exc).__name__
+
+
+def _limites(dominio):
+    for d, limites in LIMITES_POR_DOMINIO.items():
+        if d in (dominio or ''):
+            return limites
+    return AIMD_MIN, AIMD_MAX
+
+
+class ControleDominio:
+    """Estado AIMD de um domínio. Os métodos são chamados com o lock do ControleConcorrencia."""
+
+    def __init__(self, dominio, inicial=AIMD_INITIAL):
+        self.minimo, self.maximo = _limites(dominio)
+        self.limite = float(min(max(inicial, self.minimo), self.maximo))
+        self.em_voo = 0
+        self.pico = self.limite
+        self.cortes = 0
+        self.contagem = {OK: 0, FALHA: 0, BLOQUEIO: 0}
+        # Janela desde a última mudança de limite
+        self._janela_ok = 0
+        self._janela_total = 0
+        # Resultados de pedidos que já estavam em voo no último corte
+        self._ignorar = 0
+        self.latencia = {}  # nível -> média móvel (s)
+        self.base = {}  # nível -> latência base (piso que sobe devagar)
+
+    def vagas(self):
+        return int(self.limite) - self.em_voo
+
+    def _latencia_saudavel(self):
+        return all(self.latencia[n] <= AIMD_LATENCY_FACTOR * self.base[n] for n in self.latencia)
+
+    def registrar(self, resultado, latencia=None, nivel=None):
+        self.contagem[resultado] += 1
+        if latencia is not None and nivel:
+            media = self.latencia.get(nivel, latencia)
+            self.latencia[nivel] = media + LATENCY_EWMA_ALPHA * (latencia - media)
+            base = self.base.get(nivel, latencia)
+            self.base[nivel] = min(latencia, base + 0.01 * (latencia - base))
+
+        if self._ignorar > 0:
+            self._ignorar -= 1
+            if resultado == BLOQUEIO:
+                return
+        if resultado == BLOQUEIO:
+            self.limite = max(self.minimo, self.limite * AIMD_DECREASE)
+            self.cortes += 1
+            self._ignorar = self.em_voo
+            self._janela_ok = self._janela_total = 0
+            return
+
+        self._janela_total += 1
+        if resultado == OK:
+            self._janela_ok += 1
+        if self._janela_total >= max(1, int(self.limite)):
+            if self._janela_ok / self._janela_total >= AIMD_MIN_SUCCESS and self._latencia_saudavel():
+                self.limite = min(self.maximo, self.limite + 1)
+                self.pico = max(self.pico, self.limite)
+            self._janela_ok = self._janela_total = 0
+
+
+class ControleConcorrencia:
+    """Limites AIMD de todos os domínios, compartilhados entre o alimentador e os workers."""
+
+    def __init__(self, inicial=AIMD_INITIAL):
+        self.inicial = inicial
+        self.cond = threading.Condition()
+        self.dominios = {}
+        self._versao = 0  # muda a cada vaga liberada ou limite alterado
+
+    def _dominio(self, dominio):
+        c = self.dominios.get(dominio)
+        if c is None:
+            c = self.dominios[dominio] = ControleDominio(dominio, self.inicial)
+        return c
+
+    def tentar(self, dominio):
+        """Reserva uma vaga do domínio se houver. Não bloqueia."""
+        with self.cond:
+            c = self._dominio(dominio)
+            if c.vagas() <= 0:
+                return False
+            c.em_voo += 1
+            return True
+
+    def liberar(self, dominio):
+        with self.cond:
+            c = self._dominio(dominio)
+            c.em_voo = max(0, c.em_voo - 1)
+            self._versao += 1
+            self.cond.notify_all()
+
+    def registrar(self, dominio, resultado, latencia=None, nivel=None):
+        """Resultado de um pedido ao domínio: OK, FALHA (sem dados) ou BLOQUEIO (429/403/desafio/timeout)."""
+        with self.cond:
+            self._dominio(dominio).registrar(resultado, latencia, nivel)
+            # Um aumento de limite abre vaga para o alimentador
+            self._versao += 1
+            self.cond.notify_all()
+
+    def versao(self):
+        with self.cond:
+            return self._versao
+
+    def aguardar(self, desde, timeout):
+        """Espera alguma vaga liberar depois de versao() == `desde` (ou o timeout)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self._versao != desde, timeout)
+
+    def limite(self, dominio):
+        with self.cond:
+            return int(self._dominio(dominio).limite)
+
+    def resumo(self):
+        with self.cond:
+            linhas = []
+            for dominio, c in sorted(self.dominios.items()):
+                lat = ", ".join(f"{n} {s:.1f}s" for n, s in sorted(c.latencia.items()))
+                linhas.append(f"{dominio}: limite {int(c.limite)} (pico {int(c.pico)}, {c.cortes} corte(s)), "
+                              f"{c.contagem[OK]} ok / {c.contagem[FALHA]} falha / {c.contagem[BLOQUEIO]} bloqueio"
+                              + (f", latência {lat}" if lat else ""))
+            return linhas
@@ -2,72 +2,242 @@
 # -*- coding: utf-8 -*-
 """
 Consulta dados salvos no banco de dados imoveis.db
+
+Filtros combináveis (estado, cidade, fonte, faixa de preço e de área,
+quartos, coletados desde) sobre as colunas tipadas de normalizacao.py,
+com paginação por cursor (keyset): cada página continua de onde a anterior
+parou, sem OFFSET, então a página 1000 custa o mesmo que a primeira.
+
+Os índices de ImovelDB atendem as combinações usadas aqui; por exemplo
+"2 quartos até R$ 400 mil em Curitiba" percorre só o trecho certo de
+idx_imoveis_cidade_quartos_preco, já na ordem de preço, e --fonte usa
+idx_imoveis_fonte_preco (por preço) ou idx_imoveis_fonte_data (recente).
+Sem --ordem, --desde sem outro filtro além de --fonte ordena por 'recente',
+que o índice de data já entrega na ordem. --texto busca palavras na
+descrição pelo índice FTS5 (busca_texto.py), por relevância.
+
+Combinações que ainda custam mais: --desde com --ordem preco ou area (o
+índice de preço é percorrido e a data filtrada linha a linha), --ordem
+area com filtro de cidade/uf/fonte (ordenação em B-tree temporária sobre
+as linhas filtradas) e --ordem recente com cidade/uf (idem).
+
+Uso:
+    python consultar_imoveis.py                     # resumo do banco
+    python consultar_imoveis.py --cidade Curitiba --quartos 2 --preco-max 400000
+    python consultar_imoveis.py --uf PR --ordem recente --formato json --todas > pr.json
+    python consultar_imoveis.py --cidade Curitiba --depois 35000000:1234   # próxima página
+    python consultar_imoveis.py --texto "piscina churrasqueira" --uf PR
 """
 
+import argparse
 import sqlite3
+import sys
 from pathlib import Path
-import json
+
+import exportacao
+from busca_texto import FTS_TABLE, consulta_fts, expressao_bm25, expressao_snippet
+from normalizacao import preco_centavos, uf
 
 # Banco sempre na raiz do projeto
 DB_PATH = Path(__file__).resolve().parent / "imoveis.db"
+PAGE_SIZE = 50
+
+# Filtro -> (condição SQL, conversão do valor). Qualquer combinação vira AND.
+FILTROS = {
+    'uf': ("uf = ?", lambda estado: uf(estado) or estado.upper()),
+    'cidade': ("cidade = ? COLLATE NOCASE", str),
+    'fonte': ("fonte = ? COLLATE NOCASE", str),
+    'preco_min': ("preco_centavos >= ?", lambda reais: preco_centavos(float(reais))),
+    'preco_max': ("preco_centavos <= ?", lambda reais: preco_centavos(float(reais))),
+    'area_min': ("area_m2 >= ?", int),
+    'area_max': ("area_m2 <= ?", int),
+    'quartos': ("n_quartos = ?", int),
+    'quartos_min': ("n_quartos >= ?", int),
+    'desde': ("data_coleta >= ?", str),
+}
+
+# Ordem -> (expressão, tipo do valor no cursor); o desempate é o rowid, que todo índice já carrega.
+# 'relevancia' (BM25) só com --texto.
+ORDENS = {
+    'preco': ('imoveis.preco_centavos', int),
+    'area': ('imoveis.area_m2', int),
+    'recente': ('imoveis.data_coleta', str),
+    'relevancia': (expressao_bm25(), float),
+}
+
+COLUNAS = ('id', 'titulo', 'preco', 'preco_centavos', 'metragem', 'area_m2', 'n_quartos', 'n_banheiros',
+           'endereco', 'cidade', 'uf', 'cep8', 'fonte', 'link', 'data_coleta')
+
+
+def montar_consulta(filtros, ordem='preco', depois=None, limite=PAGE_SIZE, texto=None):
+    """
+    SQL + parâmetros de uma página. `depois` é o cursor devolvido pela página
+    anterior; `texto` restringe pela busca FTS5 (busca_texto.py) e acrescenta
+    o trecho destacado.
+    """
+    if ordem == 'relevancia' and not texto:
+        raise ValueError("ordem 'relevancia' precisa de texto para buscar")
+    expressao, tipo = ORDENS[ordem]
+    decrescente = ordem == 'recente'
+    colunas = [f"imoveis.{c}" for c in COLUNAS]
+    origem = "imoveis"
+    condicoes, params = [], []
+    if texto:
+        match = consulta_fts(texto)
+        if not match:
+            raise ValueError(f"nenhum termo para buscar em {texto!r}")
+        origem += f" JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = imoveis.rowid"
+        condicoes.append(f"{FTS_TABLE} MATCH ?")
+        params.append(match)
+        colunas.append(f"{expressao_snippet()} AS trecho")
+    if ordem != 'relevancia':
+        condicoes.append(f"{expressao} IS NOT NULL")
+    for nome, valor in filtros.items():
+        if valor is None:
+            continue
+        condicao, converter = FILTROS[nome]
+        condicoes.append(condicao)
+        params.append(converter(valor))
+    if depois:
+        valor, _, rowid = depois.rpartition(':')
+        condicoes.append(f"({expressao}, imoveis.rowid) {'<' if decrescente else '>'} (?, ?)")
+        params += [tipo(valor), int(rowid)]
+    direcao = 'DESC' if decrescente else 'ASC'
+    sql = f"""
+        SELECT imoveis.rowid, {expressao}, {', '.join(colunas)} FROM {origem}
+        WHERE {' AND '.join(condicoes)}
+        ORDER BY {expressao} {direcao}, imoveis.rowid {direcao}
+        LIMIT ?
+    """
+    return sql, params + [limite]
+
+
+def consultar(conn, ordem='preco', depois=None, limite=PAGE_SIZE, texto=None, **filtros):
+    """Uma página: (lista de dicts, cursor da próxima página ou None)."""
+    sql, params = montar_consulta(filtros, ordem, depois, limite, texto)
+    nomes = COLUNAS + (('trecho',) if texto else ())
+    linhas = []
+    cursor = None
+    for row in conn.execute(sql, params):
+        linhas.append(dict(zip(nomes, row[2:])))
+        cursor = f"{row[1]}:{row[0]}"
+    return linhas, (cursor if len(linhas) == limite else None)
+
+
+def iterar(conn, ordem='preco', depois=None, limite=PAGE_SIZE, texto=None, **filtros):
+    """Todas as páginas, uma de cada vez (memória constante)."""
+    while True:
+        linhas, depois = consultar(conn, ordem, depois, limite, texto, **filtros)
+        yield from linhas
+        if not depois:
+            return
+
+
+def escrever(imoveis, formato, saida=sys.stdout, colunas=COLUNAS):
+    """Escreve conforme chega: texto, ou csv/ndjson/json via exportacao.py. Retorna quantos."""
+    if formato != 'texto':
+        return exportacao.escrever(imoveis, formato, saida, colunas)
+    n = 0
+    for n, im in enumerate(imoveis, 1):
+        area = f"{im['area_m2']} m²" if im['area_m2'] else '-'
+        quartos = f"{im['n_quartos']}Q" if im['n_quartos'] is not None else '-'
+        saida.write(f"{n:4}. {im['preco'] or '-':>18}  {area:>8}  {quartos:>3}  "
+                    f"{im['cidade'] or '-'}/{im['uf'] or '-'}  {(im['titulo'] or '')[:50]}\n"
+                    + (f"      “{im['trecho']}”\n" if im.get('trecho') else "")
+                    + f"      🔗 {im['link']}\n")
+    return n
+
 
 def query_all_imoveis():
-    """Consulta todos os imóveis do banco"""
+    """Resumo do banco: totais e distribuições tirados dos índices, sem listar as linhas."""
     if not DB_PATH.exists():
         print("❌ Banco de dados não encontrado")
         return
-    
+
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    
+
     # Contar total
     c.execute('SELECT COUNT(*) FROM imoveis')
     total = c.fetchone()[0]
-    
+
     print(f"\n{'='*80}")
     print(f"📊 IMÓVEIS SALVOS NO BANCO DE DADOS")
     print(f"{'='*80}")
     print(f"Total de imóveis: {total}\n")
-    
+
     if total == 0:
         print("❌ Nenhum imóvel no banco")
         conn.close()
         return
-    
-    # Buscar todos
-    c.execute('SELECT id, titulo, preco, cidade, estado, link FROM imoveis ORDER BY id')
-    
-    for i, row in enumerate(c.fetchall(), 1):
-        id_prop, titulo, preco, cidade, estado, link = row
-        print(f"{i}. [{id_prop}]")
-        print(f"   📍 {titulo}")
-        print(f"   💰 {preco}")
-        print(f"   🏙️  {cidade}, {estado}")
-        print(f"   🔗 {link}")
-        print()
-    
-    # Estatísticas
-    print(f"{'='*80}")
-    c.execute('SELECT estado, COUNT(*) as qtd FROM imoveis GROUP BY estado ORDER BY qtd DESC')
+
+    # Agregações sobre índices (idx_imoveis_uf_preco, idx_imoveis_cidade_quartos_preco)
+    c.execute('SELECT uf, COUNT(*) as qtd FROM imoveis GROUP BY uf ORDER BY qtd DESC')
     print("📈 Distribuição por Estado:")
     for estado, qtd in c.fetchall():
-        print(f"   {estado}: {qtd} imóvei(s)")
-    
-    c.execute('SELECT cidade, COUNT(*) as qtd FROM imoveis GROUP BY cidade ORDER BY qtd DESC')
+        print(f"   {estado or '?'}: {qtd} imóvei(s)")
+
+    c.execute('SELECT cidade, COUNT(*) as qtd FROM imoveis GROUP BY cidade COLLATE NOCASE ORDER BY qtd DESC LIMIT 5')
     print("\n📈 Top Cidades:")
-    for cidade, qtd in c.fetchall()[:5]:
+    for cidade, qtd in c.fetchall():
         print(f"   {cidade}: {qtd} imóvei(s)")
-    
-    c.execute('SELECT MIN(CAST(REPLACE(preco, "R$ ", "") as REAL)), MAX(CAST(REPLACE(preco, "R$ ", "") as REAL)) FROM imoveis')
+
+    # preco_centavos é preenchido na escrita (normalizacao.py): MIN/MAX saem do índice idx_imoveis_preco
+    c.execute('SELECT MIN(preco_centavos), MAX(preco_centavos) FROM imoveis WHERE preco_centavos > 0')
     min_preco, max_preco = c.fetchone()
     if min_preco and max_preco:
         print(f"\n💵 Faixa de Preços:")
-        print(f"   Mínimo: R$ {min_preco:,.0f}")
-        print(f"   Máximo: R$ {max_preco:,.0f}")
-    
-    print(f"{'='*80}\n")
-    
+        print(f"   Mínimo: R$ {min_preco / 100:,.0f}")
+        print(f"   Máximo: R$ {max_preco / 100:,.0f}")
+
+    print(f"{'='*80}")
+    print("Filtros: python consultar_imoveis.py --help\n")
+
     conn.close()
 
+
 if __name__ == '__main__':
-    query_all_imoveis()
+    parser = argparse.ArgumentParser(description='Consulta imoveis.db com filtros e paginação por cursor')
+    parser.add_argument('--uf', type=str, help='Estado, ex.: PR ou Paraná')
+    parser.add_argument('--cidade', type=str, help='Cidade (sem diferenciar maiúsculas)')
+    parser.add_argument('--fonte', type=str, help='Ex.: OLX, IMOVELWEB')
+    parser.add_argument('--preco-min', type=float, help='Preço mínimo em reais')
+    parser.add_argument('--preco-max', type=float, help='Preço máximo em reais')
+    parser.add_argument('--area-min', type=int, help='Área mínima (m²)')
+    parser.add_argument('--area-max', type=int, help='Área máxima (m²)')
+    parser.add_argument('--quartos', type=int, help='Número exato de quartos')
+    parser.add_argument('--quartos-min', type=int, help='Mínimo de quartos')
+    parser.add_argument('--desde', type=str, help='Coletados a partir desta data (ISO)')
+    parser.add_argument('--texto', type=str, help='Busca em título/descrição/endereço, ex.: "piscina churrasqueira"')
+    parser.add_argument('--ordem', choices=sorted(ORDENS), default=None,
+                        help='Ordenação (padrão: relevancia com --texto, recente com só --desde/--fonte, senão preco)')
+    parser.add_argument('--limite', type=int, default=PAGE_SIZE, help=f'Imóveis por página (padrão: {PAGE_SIZE})')
+    parser.add_argument('--depois', type=str, help='Cursor da página anterior')
+    parser.add_argument('--todas', action='store_true', help='Todas as páginas (streaming)')
+    parser.add_argument('--formato', choices=('texto',) + exportacao.FORMATOS, default='texto')
+    args = parser.parse_args()
+
+    filtros = {nome: getattr(args, nome) for nome in FILTROS}
+    if not any(v is not None for v in filtros.values()) and not (args.texto or args.depois or args.todas):
+        query_all_imoveis()
+        sys.exit(0)
+    # Só data (e fonte): idx_imoveis_data / idx_imoveis_fonte_data entregam na ordem de coleta
+    so_data = args.desde is not None and all(v is None for n, v in filtros.items() if n not in ('desde', 'fonte'))
+    ordem = args.ordem or ('relevancia' if args.texto else 'recente' if so_data else 'preco')
+    if ordem == 'relevancia' and not args.texto:
+        parser.error("--ordem relevancia precisa de --texto")
+    if args.texto and not consulta_fts(args.texto):
+        parser.error(f"--texto sem termos para buscar: {args.texto!r}")
+    colunas = COLUNAS + (('trecho',) if args.texto else ())
+
+    conn = sqlite3.connect(DB_PATH)
+    if args.todas:
+        n = escrever(iterar(conn, ordem, args.depois, args.limite, args.texto, **filtros), args.formato,
+                     colunas=colunas)
+        cursor = None
+    else:
+        imoveis, cursor = consultar(conn, ordem, args.depois, args.limite, args.texto, **filtros)
+        n = escrever(imoveis, args.formato, colunas=colunas)
+    conn.close()
+    # Vai para stderr para não misturar com CSV/JSON redirecionado
+    print(f"{n} imóvel(is)" + (f"; próxima página: --depois {cursor}" if cursor else ""), file=sys.stderr)
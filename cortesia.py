@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Agendador de cortesia: baldes de tokens por host + fila de atraso para retries.
+
+Antes o ritmo por site saía de time.sleep dentro dos workers
+(scraper_olx_requests.process_worker dormia 2s depois de cada URL e
+retry_exponential dormia dentro da thread do navegador). Enquanto dormia, o
+worker não fazia nada por nenhum outro site.
+
+Aqui o ritmo é central: cada host tem um balde de tokens (taxa por segundo +
+rajada, TAXAS_POR_HOST) e uma fila de itens. retirar() só entrega um item de
+um host que tenha token, então um worker que esbarraria no limite de um site
+pega trabalho de outro. Retries entram por adiar(item, host, atraso) e só
+voltam a ser entregues quando o atraso vence, sem prender thread nenhuma.
+
+    agenda = AgendadorCortesia()
+    agenda.adicionar(url, host)
+    host, url = agenda.proximo()  # bloqueia até haver item com token
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+HOST_RATE = 2.0  # pedidos por segundo por host (padrão)
+HOST_BURST = 4  # pedidos seguidos permitidos depois de um tempo parado
+
+# (taxa, rajada) por host; a chave casa com qualquer host que a contenha
+TAXAS_POR_HOST = {
+    'olx.com.br': (1.5, 3),
+    'imovelweb.com.br': (0.5, 2),
+    'vivareal.com.br': (1.0, 3),
+    'zapimoveis.com.br': (1.0, 3),
+    'mercadolivre.com.br': (2.0, 4),
+}
+
+
+def taxa_para(host, taxas=None):
+    for chave, taxa in (taxas or TAXAS_POR_HOST).items():
+        if chave in (host or ''):
+            return taxa
+    return HOST_RATE, HOST_BURST
+
+
+def ler_taxas(especificacoes):
+    """Converte ['olx.com.br=1.5:3', 'imovelweb.com.br=0.2'] em {host: (taxa, rajada)} sobre TAXAS_POR_HOST."""
+    taxas = dict(TAXAS_POR_HOST)
+    for esp in especificacoes or []:
+        host, _, valor = esp.partition('=')
+        taxa, _, rajada = valor.partition(':')
+        taxas[host.strip()] = (float(taxa), int(rajada) if rajada else HOST_BURST)
+    return taxas
+
+
+def host_da_url(url):
+    host = urlparse(url).netloc
+    return host[4:] if host.startswith('www.') else host
+
+
+class BaldeTokens:
+    """Token bucket: `taxa` tokens por segundo, no máximo `rajada` acumulados."""
+
+    def __init__(self, taxa, rajada):
+        self.taxa = taxa
+        self.rajada = max(1, rajada)
+        self.tokens = float(self.rajada)
+        self.atualizado = time.monotonic()
+
+    def _repor(self, agora):
+        self.tokens = min(self.rajada, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    def espera(self, agora):
+        """Segundos até haver um token (0 se já há)."""
+        self._repor(agora)
+        if self.tokens >= 1 or self.taxa <= 0:
+            return 0.0 if self.tokens >= 1 else float('inf')
+        return (1 - self.tokens) / self.taxa
+
+    def consumir(self):
+        self.tokens -= 1
+
+
+class AgendadorCortesia:
+    """Itens por host, entregues no ritmo do balde de cada host. Thread-safe."""
+
+    def __init__(self, taxas=None):
+        self.taxas = taxas
+        self.cond = threading.Condition()
+        self.filas = {}  # host -> deque de itens prontos
+        self.baldes = {}
+        self.atrasados = []  # heap de (pronto_em, seq, host, item)
+        self._seq = itertools.count()
+        self._fechado = False
+        self.despachados = {}  # host -> itens entregues
+        self.reagendados = {}  # host -> itens que passaram pela fila de atraso
+        self.tempo_esperando = 0.0  # soma das esperas em proximo()
+
+    def _balde(self, host):
+        b = self.baldes.get(host)
+        if b is None:
+            b = self.baldes[host] = BaldeTokens(*taxa_para(host, self.taxas))
+        return b
+
+    def adicionar(self, item, host):
+        with self.cond:
+            self.filas.setdefault(host, deque()).append(item)
+            self.cond.notify()
+
+    def adiar(self, item, host, atraso):
+        """Devolve o item daqui a `atraso` segundos (ex.: retry com backoff)."""
+        with self.cond:
+            heapq.heappush(self.atrasados, (time.monotonic() + atraso, next(self._seq), host, item))
+            self.reagendados[host] = self.reagendados.get(host, 0) + 1
+            self.cond.notify()
+
+    def pendentes(self):
+        """Itens na mão do agendador (prontos + atrasados)."""
+        with self.cond:
+            return sum(len(f) for f in self.filas.values()) + len(self.atrasados)
+
+    def por_host(self):
+        """Itens na mão do agendador por host: {host: prontos + atrasados}."""
+        with self.cond:
+            contagem = {host: len(f) for host, f in self.filas.items() if f}
+            for _, _, host, _ in self.atrasados:
+                contagem[host] = contagem.get(host, 0) + 1
+            return contagem
+
+    def _mover_vencidos(self, agora):
+        while self.atrasados and self.atrasados[0][0] <= agora:
+            _, _, host, item = heapq.heappop(self.atrasados)
+            self.filas.setdefault(host, deque()).append(item)
+
+    def _retirar(self, pode):
+        # Chamar com self.cond. Retorna ((host, item) ou None, segundos até a próxima chance)
+        agora = time.monotonic()
+        self._mover_vencidos(agora)
+        espera = self.atrasados[0][0] - agora if self.atrasados else float('inf')
+        # Começa pelo host menos servido, para nenhum ficar para trás
+        for host in sorted((h for h, f in self.filas.items() if f), key=lambda h: self.despachados.get(h, 0)):
+            balde = self._balde(host)
+            falta = balde.espera(agora)
+            if falta > 0:
+                espera = min(espera, falta)
+                continue
+            if pode is not None and not pode(host):
+                continue
+            balde.consumir()
+            self.despachados[host] = self.despachados.get(host, 0) + 1
+            item = self.filas[host].popleft()
+            if not self.filas[host]:
+                del self.filas[host]
+            return (host, item), 0.0
+        return None, espera
+
+    def retirar(self, pode=None):
+        """
+        Entrega (host, item) de um host com token, ou None. Não bloqueia.
+        `pode(host)` (opcional) é consultado antes de gastar o token; se
+        retornar True o item é entregue (ex.: ControleConcorrencia.tentar).
+        """
+        with self.cond:
+            return self._retirar(pode)[0]
+
+    def espera(self):
+        """Segundos até algum item poder sair (None se não há itens)."""
+        with self.cond:
+            if not self.filas and not self.atrasados:
+                return None
+            agora = time.monotonic()
+            self._mover_vencidos(agora)
+            espera = self.atrasados[0][0] - agora if self.atrasados else float('inf')
+            for host, fila in self.filas.items():
+                if fila:
+                    espera = min(espera, self._balde(host).espera(agora))
+            return max(0.0, espera)
+
+    def proximo(self, timeout=None):
+        """Bloqueia até entregar (host, item); None se fechado e vazio (ou timeout)."""
+        inicio = time.monotonic()
+        limite = None if timeout is None else inicio + timeout
+        with self.cond:
+            try:
+                while True:
+                    pronto, espera = self._retirar(None)
+                    if pronto is not None:
+                        return pronto
+                    if self._fechado and not self.filas and not self.atrasados:
+                        return None
+                    if limite is not None:
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            return None
+                        espera = min(espera, restante)
+                    self.cond.wait(None if espera == float('inf') else espera)
+            finally:
+                self.tempo_esperando += time.monotonic() - inicio
+
+    def fechar(self):
+        """Sem itens novos: proximo() retorna None quando a agenda esvaziar."""
+        with self.cond:
+            self._fechado = True
+            self.cond.notify_all()
+
+    def resumo(self):
+        with self.cond:
+            linhas = []
+            for host in sorted(self.despachados):
+                b = self._balde(host)
+                linhas.append(f"{host}: {self.despachados[host]} pedido(s) a até {b.taxa:g}/s "
+                              f"(rajada {b.rajada}), {self.reagendados.get(host, 0)} retry(s)")
+            return linhas
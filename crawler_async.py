@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crawler HTTP assíncrono para fontes que não precisam de JavaScript.
+
+scraper_olx_requests.py, scrap_imovelweb.py, buscador_imoveis.py e o
+"Web Scraper Genérico" usam requests síncrono, quase sempre uma URL depois
+da outra. Aqui um único cliente aiohttp (pool de conexões keep-alive,
+limite de conexões por host, gzip/deflate e br quando o pacote Brotli está
+instalado) mantém milhares de pedidos em voo num só processo.
+
+- Timeouts e retry com backoff para timeout, erro de conexão, 429 e 5xx.
+- Ritmo opcional por host (cortesia.TAXAS_POR_HOST via --cortesia);
+  sem ele só o limite de conexões por host segura o ritmo (APIs).
+- Os links saem da tabela `links` do imoveis.db (ImovelDB.claim_links) e
+  os resultados entram pelo mesmo caminho de escrita do scraper:
+  HTML passa por extracao.extrair_dados (em processos, EstagioExtracao),
+  JSON de API por captura_api, e tudo vira gravar_imovel.
+- GET condicional (cache_http.py): no recrawl, página que responde 304
+  é marcada como feita sem extração nem escrita no banco.
+- Cada anúncio visitado entra na agenda de revisita (revisita.py); 404/410
+  contam como anúncio removido.
+- Páginas que o HTTP não resolve (erro, desafio, conteúdo montado por JS)
+  voltam para 'pending' na hora, sem gastar tentativa e marcadas com
+  REJEITADO_HTTP: o crawler não as pega de novo e o scraper_escalavel
+  tenta com navegador.
+
+Uso:
+    python crawler_async.py --dominio olx.com.br -c 500 --por-host 64
+    python crawler_async.py --cortesia   # respeita cortesia.TAXAS_POR_HOST
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from cache_http import CacheHTTP, NAO_MODIFICADO
+from revisita import ATIVO, REMOVIDO, STATUS_REMOVIDO, impressao_digital
+from captura_api import CapturaAPI
+from cortesia import BaldeTokens, TAXAS_POR_HOST, host_da_url, taxa_para
+from extracao_paralela import EstagioExtracao
+from http_fetcher import pagina_utilizavel
+from page_store import PageStore
+from scraper_escalavel import ImovelDB, gravar_imovel, BATCH_SIZE, EXTRACTION_JOBS
+
+ASYNC_CONCURRENCY = 1000  # pedidos em voo no processo
+ASYNC_LIMIT_PER_HOST = 32  # conexões abertas por host
+ASYNC_TIMEOUT = 20  # segundos por pedido (total)
+ASYNC_CONNECT_TIMEOUT = 10
+ASYNC_RETRIES = 3  # tentativas por URL
+ASYNC_BACKOFF = 0.5  # 0.5s, 1s, 2s...
+STATUS_RETRY = (429, 500, 502, 503, 504)
+REJEITADO_HTTP = 'async:rejeitado'  # marca dos links devolvidos para o navegador (ImovelDB.release_link)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9",
+}
+
+
+class EstatisticasCrawler:
+    """Pedidos, sucesso, bytes e latência por host."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.por_host = {}  # host -> [pedidos, ok, retries, bytes, segundos]
+        self.inicio = time.monotonic()
+
+    def registrar(self, host, ok, tamanho, latencia, retries):
+        with self.lock:
+            h = self.por_host.setdefault(host, [0, 0, 0, 0, 0.0])
+            h[0] += 1
+            h[1] += 1 if ok else 0
+            h[2] += retries
+            h[3] += tamanho
+            h[4] += latencia
+
+    def resumo(self):
+        with self.lock:
+            duracao = max(time.monotonic() - self.inicio, 1e-9)
+            total = sum(h[0] for h in self.por_host.values())
+            linhas = [f"{total} pedido(s) em {duracao:.1f}s ({total / duracao:.0f}/s)"]
+            for host, (n, ok, retries, tamanho, segundos) in sorted(self.por_host.items()):
+                linhas.append(f"{host}: {ok}/{n} ok, {retries} retry(s), {tamanho / n / 1024:.0f} KB/pedido, "
+                              f"latência média {segundos / n:.2f}s")
+            return linhas
+
+
+class CrawlerAsync:
+    """Cliente aiohttp compartilhado: usar com `async with CrawlerAsync() as c`."""
+
+    def __init__(self, concorrencia=ASYNC_CONCURRENCY, por_host=ASYNC_LIMIT_PER_HOST, timeout=ASYNC_TIMEOUT,
+                 tentativas=ASYNC_RETRIES, headers=None, proxy=None, taxas=None, cache=None):
+        if aiohttp is None:
+            raise RuntimeError("crawler_async precisa do pacote aiohttp (pip install aiohttp; Brotli para br)")
+        self.concorrencia = concorrencia
+        self.por_host = por_host
+        self.timeout = timeout
+        self.tentativas = max(1, tentativas)
+        self.headers = dict(HEADERS, **(headers or {}))
+        self.proxy = proxy if not proxy or '://' in proxy else f'http://{proxy}'
+        self.taxas = taxas  # None = sem ritmo por host
+        self.baldes = {}
+        self.cache = cache  # CacheHTTP: If-None-Match / If-Modified-Since
+        self.stats = EstatisticasCrawler()
+        self.session = None
+
+    async def __aenter__(self):
+        conector = aiohttp.TCPConnector(limit=self.concorrencia, limit_per_host=self.por_host,
+                                        ttl_dns_cache=300, enable_cleanup_closed=True)
+        self.session = aiohttp.ClientSession(
+            connector=conector, headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=ASYNC_CONNECT_TIMEOUT),
+            auto_decompress=True,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _aguardar_token(self, host):
+        balde = self.baldes.get(host)
+        if balde is None:
+            balde = self.baldes[host] = BaldeTokens(*taxa_para(host, self.taxas))
+        # Loop único: sem corrida entre o cálculo da espera e o consumo
+        while True:
+            espera = balde.espera(time.monotonic())
+            if espera <= 0:
+                balde.consumir()
+                return
+            await asyncio.sleep(espera)
+
+    async def buscar(self, url):
+        """
+        GET com retry. Retorna (status, content-type, texto, validador);
+        status é o código HTTP ou 'timeout'/'erro' quando todas as tentativas
+        falharam. Com cache, 304 (NAO_MODIFICADO) vem sem texto; o validador
+        de um 200, (headers, texto), não é guardado aqui: quem chamou faz
+        cache.guardar depois de gravar o imóvel (ImovelDB.guardar_validador)
+        e cache.esquecer se não aproveitar a página.
+        """
+        host = host_da_url(url)
+        inicio = time.monotonic()
+        status, tipo, texto = 'erro', '', None
+        condicionais = await asyncio.to_thread(self.cache.cabecalhos, url) if self.cache else None
+        validadores = None
+        tentativa = 0
+        while tentativa < self.tentativas:
+            if tentativa:
+                await asyncio.sleep(ASYNC_BACKOFF * 2 ** (tentativa - 1))
+            tentativa += 1
+            if self.taxas is not None:
+                await self._aguardar_token(host)
+            try:
+                async with self.session.get(url, proxy=self.proxy, headers=condicionais) as resposta:
+                    status = resposta.status
+                    tipo = resposta.headers.get('Content-Type', '')
+                    if status in STATUS_RETRY:
+                        continue
+                    validadores = resposta.headers
+                    if status != NAO_MODIFICADO:
+                        texto = await resposta.text(errors='replace')
+                    break
+            except asyncio.TimeoutError:
+                status = 'timeout'
+            except aiohttp.ClientError:
+                status = 'erro'
+        if self.cache and validadores is not None and status != 200:
+            await asyncio.to_thread(self.cache.resposta, url, status, validadores)
+        ok = (status == 200 and texto is not None) or status == NAO_MODIFICADO
+        self.stats.registrar(host, ok, len(texto or ''), time.monotonic() - inicio, tentativa - 1)
+        validador = (validadores, texto) if status == 200 and validadores is not None else None
+        return status, tipo, texto, validador
+
+    async def mapear(self, urls, tratar):
+        """
+        Busca `urls` (iterável ou iterável assíncrono, pode ser longo) com no
+        máximo `concorrencia` pedidos em voo e chama
+        `await tratar(url, status, tipo, texto, validador)` para cada uma.
+        """
+        fila = asyncio.Queue(maxsize=self.concorrencia * 2)
+
+        async def worker():
+            while True:
+                url = await fila.get()
+                try:
+                    if url is None:
+                        return
+                    await tratar(url, *await self.buscar(url))
+                except Exception as e:
+                    print(f"Erro ao tratar {url}: {e}")
+                finally:
+                    fila.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concorrencia)]
+        if hasattr(urls, '__aiter__'):
+            async for url in urls:
+                await fila.put(url)
+        else:
+            for url in urls:
+                await fila.put(url)
+        for _ in workers:
+            await fila.put(None)
+        await asyncio.gather(*workers)
+
+
+async def coletar(db=None, dominio=None, concorrencia=ASYNC_CONCURRENCY, por_host=ASYNC_LIMIT_PER_HOST,
+                  jobs=EXTRACTION_JOBS, cortesia=False, proxy=None, usar_cache=True):
+    """
+    Processa os links pendentes do imoveis.db só com HTTP. Links que
+    precisam de navegador voltam para 'pending' assim que falham.
+    Retorna (links resolvidos, imóveis gravados); links inalterados (304)
+    contam como resolvidos.
+    """
+    db = db or ImovelDB()
+    paginas = PageStore()
+    extracao = EstagioExtracao(jobs=jobs)
+    captura = CapturaAPI()
+    cache = CacheHTTP() if usar_cache else None
+    owner = f"{socket.gethostname()}:{os.getpid()}:async:{uuid.uuid4().hex[:6]}"
+    feitos = gravados = 0
+
+    def processar(url, tipo, texto, validador):
+        # Compressão, SQLite e extração fora do event loop. Retorna quantos imóveis gravou.
+        if 'json' in tipo:
+            paginas.salvar(url, texto, tipo='json')
+            anuncios = captura.anuncios(url, [(url, texto)])
+            for dados in anuncios:
+                gravar_imovel(db, dados['link'], dados)
+            if anuncios:
+                # A resposta da API vale quando o último anúncio dela já está no banco
+                db.guardar_validador(cache, url, validador, link=anuncios[-1]['link'])
+            return len(anuncios)
+        if not pagina_utilizavel(texto):
+            return 0
+        paginas.salvar(url, texto)
+        dados = extracao.extrair(url, texto)
+        if not dados:
+            return 0
+        gravar_imovel(db, url, dados, raw_text=texto[:500])
+        db.registrar_visita(url, impressao_digital(dados))
+        db.guardar_validador(cache, url, validador)
+        return 1
+
+    async def tratar(url, status, tipo, texto, validador):
+        nonlocal feitos, gravados
+        if status == NAO_MODIFICADO or status in STATUS_REMOVIDO:
+            # Inalterado (304) ou fora do ar (404/410): só a visita e o status do link
+            db.registrar_visita(url, situacao=REMOVIDO if status in STATUS_REMOVIDO else ATIVO)
+            db.mark_link_processed(url, 'done')
+            feitos += 1
+            return
+        n = 0
+        if status == 200 and texto:
+            n = await asyncio.to_thread(processar, url, tipo, texto, validador)
+            if not n and cache:
+                # Validador de página não aproveitada: o próximo GET precisa do corpo inteiro
+                await asyncio.to_thread(cache.esquecer, url)
+        if n:
+            db.mark_link_processed(url, 'done')
+            feitos += 1
+            gravados += n
+        else:
+            # Já, e sem tentativa a mais: esperar o lease vencer gastaria as tentativas do navegador
+            db.release_link(url, marca=REJEITADO_HTTP)
+
+    async def links():
+        while True:
+            lote = await asyncio.to_thread(db.claim_links, owner, domain=dominio, limit=BATCH_SIZE,
+                                           ignorar=REJEITADO_HTTP)
+            if not lote:
+                return
+            for url in lote:
+                yield url
+
+    try:
+        async with CrawlerAsync(concorrencia=concorrencia, por_host=por_host, proxy=proxy,
+                                taxas=TAXAS_POR_HOST if cortesia else None, cache=cache) as crawler:
+            await crawler.mapear(links(), tratar)
+            for linha in crawler.stats.resumo():
+                print(f"   {linha}")
+            for linha in (cache.stats.resumo() if cache else []):
+                print(f"   ♻️  {linha}")
+    finally:
+        # Links que ficaram no meio (erro em tratar, interrupção) voltam para a fila
+        db.release_links(owner)
+        extracao.close()
+        paginas.flush()
+        if cache:
+            cache.flush()
+    return feitos, gravados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Crawler HTTP assíncrono sobre a tabela links do imoveis.db')
+    parser.add_argument('--dominio', type=str, default=None, help='Só links deste domínio')
+    parser.add_argument('-c', '--concorrencia', type=int, default=ASYNC_CONCURRENCY,
+                        help=f'Pedidos em voo (padrão: {ASYNC_CONCURRENCY})')
+    parser.add_argument('--por-host', type=int, default=ASYNC_LIMIT_PER_HOST,
+                        help=f'Conexões por host (padrão: {ASYNC_LIMIT_PER_HOST})')
+    parser.add_argument('-j', '--jobs', type=int, default=EXTRACTION_JOBS,
+                        help='Processos de extração (0 = no próprio processo)')
+    parser.add_argument('--cortesia', action='store_true', help='Respeitar o ritmo de cortesia.TAXAS_POR_HOST')
+    parser.add_argument('--proxy', type=str, default=None, help='Proxy HTTP (host:porta ou URL)')
+    parser.add_argument('--sem-cache', action='store_true',
+                        help='Baixar tudo de novo, sem GET condicional (cache_http.py)')
+    args = parser.parse_args()
+
+    inicio = time.monotonic()
+    feitos, gravados = asyncio.run(coletar(dominio=args.dominio, concorrencia=args.concorrencia,
+                                           por_host=args.por_host, jobs=args.jobs, cortesia=args.cortesia,
+                                           proxy=args.proxy, usar_cache=not args.sem_cache))
+    print(f"✅ {feitos} link(s) resolvidos só com HTTP ({gravados} imóvel(is)) em {time.monotonic() - inicio:.1f}s")
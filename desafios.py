@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Fila "precisa de humano" para páginas de desafio (CAPTCHA / anti-bot).
+
+Antes, um desafio no Bing chamava input() e parava a execução inteira até
+alguém apertar Enter. Agora o worker que encontra o desafio (detectado por
+net_utils.is_challenge_page) encaminha a URL para FilaDesafios e segue com a
+próxima tarefa. Um único navegador visível, dedicado, abre as URLs
+encaminhadas uma a uma e espera alguém resolver o desafio.
+
+Resolvido o desafio, os cookies da sessão ficam guardados por host e voltam
+para o pool: aplicar_cookies() os injeta (CDP Network.setCookies) nos
+navegadores dos workers antes da próxima visita ao mesmo host. O cookie de
+liberação vale só para o IP e o User-Agent de quem resolveu: o navegador de
+resolução usa o `proxy`/`user_agent` recebido, e navegadores com outro par
+não recebem os cookies. Quem
+encaminhou recebe o HTML já liberado (ou None se ninguém resolveu a tempo)
+pelo callback `concluir(url, html, cookies)`.
+
+Se o tempo de um desafio se esgota (execução sem ninguém olhando), as outras
+URLs do mesmo host na fila falham junto, para não gastar CAPTCHA_TIMEOUT em
+cada uma.
+"""
+
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+import undetected_chromedriver as uc
+
+from net_utils import configure_chrome_options, is_challenge_page
+
+CAPTCHA_TIMEOUT = 600  # segundos esperando alguém resolver um desafio
+CAPTCHA_POLL = 2.0
+
+
+class DesafioPendente(Exception):
+    """A página pediu verificação humana e foi encaminhada para FilaDesafios."""
+
+
+class FilaDesafios:
+    def __init__(self, proxy=None, user_agent=None, timeout=CAPTCHA_TIMEOUT):
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.fila = queue.Queue()
+        self.lock = threading.Lock()
+        self.cookies = {}  # host -> (versão, lista de cookies)
+        self._aplicados = {}  # (id(driver), host) -> versão já injetada
+        self._pendentes = set()  # URLs encaminhadas e ainda não concluídas
+        self._thread = None
+        self.resolvidos = 0
+        self.falhas = 0
+
+    # ------------------------------------------------------------------
+    # Lado dos workers
+    # ------------------------------------------------------------------
+
+    def encaminhar(self, url, concluir=None):
+        """Põe a URL na fila do navegador visível. Não bloqueia."""
+        with self.lock:
+            if url in self._pendentes:
+                return
+            self._pendentes.add(url)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._resolvedor, daemon=True)
+                self._thread.start()
+        print(f"🧩 Desafio em {urlparse(url).netloc}: encaminhado ao navegador de resolução ({url})")
+        self.fila.put((url, concluir))
+
+    def pendentes(self):
+        with self.lock:
+            return len(self._pendentes)
+
+    def aplicar_cookies(self, driver, url, par=None):
+        """
+        Injeta no driver os cookies de desafio resolvido para o host de `url`
+        (se houver novos). `par` é o (proxy, user_agent) do driver; se não for
+        o do navegador de resolução, os cookies não valeriam e não são aplicados.
+        """
+        if par is not None and par != (self.proxy, self.user_agent):
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            versao, cookies = self.cookies.get(host, (0, None))
+            if not cookies or self._aplicados.get((id(driver), host)) == versao:
+                return
+            self._aplicados[(id(driver), host)] = versao
+        try:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': [_cookie_cdp(c, host) for c in cookies]})
+        except Exception as e:
+            print(f"⚠️  Não foi possível aplicar cookies de {host}: {e}")
+
+    def esquecer(self, driver):
+        with self.lock:
+            for chave in [k for k in self._aplicados if k[0] == id(driver)]:
+                del self._aplicados[chave]
+
+    # ------------------------------------------------------------------
+    # Navegador de resolução
+    # ------------------------------------------------------------------
+
+    def _novo_driver(self):
+        options = uc.ChromeOptions()
+        configure_chrome_options(options, proxy=self.proxy, user_agent=self.user_agent, headless=False)
+        return uc.Chrome(options=options)
+
+    def _resolvedor(self):
+        driver = None
+        hosts_esgotados = set()
+        try:
+            while True:
+                try:
+                    url, concluir = self.fila.get(timeout=CAPTCHA_POLL)
+                except queue.Empty:
+                    # Decide sair sob o lock: encaminhar() vê _thread None e sobe outra
+                    with self.lock:
+                        if not self._pendentes:
+                            self._thread = None
+                            break
+                    continue
+                host = urlparse(url).netloc
+                html = cookies = None
+                if host not in hosts_esgotados:
+                    try:
+                        if driver is None:
+                            driver = self._novo_driver()
+                        html, cookies = self._resolver(driver, url)
+                    except Exception as e:
+                        print(f"⚠️  Navegador de resolução falhou em {url}: {e}")
+                        try:
+                            driver.quit()
+                        except Exception:
+                            pass
+                        driver = None
+                    if html is None:
+                        hosts_esgotados.add(host)
+                    else:
+                        hosts_esgotados.discard(host)
+                self._concluir(url, html, cookies, concluir)
+                if self.fila.empty():
+                    # Fila drenada: um host esgotado pode ser tentado de novo no próximo encaminhamento
+                    hosts_esgotados.clear()
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+    def _resolver(self, driver, url):
+        """Abre a URL e espera o desafio sumir. Retorna (html, cookies) ou (None, None)."""
+        driver.get(url)
+        html = driver.page_source
+        if is_challenge_page(html):
+            print(f"\n⚠️  Resolva o desafio na janela do navegador de resolução: {url}")
+            limite = time.monotonic() + self.timeout
+            while is_challenge_page(html):
+                if time.monotonic() >= limite:
+                    print(f"⌛ Desafio não resolvido em {self.timeout}s: {url}")
+                    return None, None
+                time.sleep(CAPTCHA_POLL)
+                html = driver.page_source
+            print(f"✅ Desafio resolvido: {urlparse(url).netloc}")
+        cookies = driver.get_cookies()
+        host = urlparse(url).netloc
+        with self.lock:
+            versao = self.cookies.get(host, (0, None))[0] + 1
+            self.cookies[host] = (versao, cookies)
+        return html, cookies
+
+    def _concluir(self, url, html, cookies, concluir):
+        # O callback roda antes de sair de _pendentes: quem espera por pendentes() == 0
+        # (ex.: processar_tudo) já encontra o resultado gravado
+        if concluir:
+            try:
+                concluir(url, html, cookies)
+            except Exception as e:
+                print(f"Erro ao concluir desafio de {url}: {e}")
+        with self.lock:
+            self._pendentes.discard(url)
+            if html is None:
+                self.falhas += 1
+            else:
+                self.resolvidos += 1
+
+
+def _cookie_cdp(cookie, host):
+    """Converte um cookie de driver.get_cookies() para o formato de Network.setCookies."""
+    c = {
+        'name': cookie['name'],
+        'value': cookie['value'],
+        'domain': cookie.get('domain') or host,
+        'path': cookie.get('path', '/'),
+        'secure': cookie.get('secure', False),
+        'httpOnly': cookie.get('httpOnly', False),
+    }
+    if cookie.get('expiry'):
+        c['expires'] = cookie['expiry']
+    if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+        c['sameSite'] = cookie['sameSite']
+    return c
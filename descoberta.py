@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Descoberta de links em paralelo com a extração.
+
+AgendadorDescoberta espalha a matriz keyword × domínio por N navegadores de
+busca (cada um com seu BroadSearcher) e grava os links na tabela `links`
+assim que cada SERP termina. Enquanto isso, ScraperEscalavel.processar_tudo
+(com enquanto=agendador.ativo) já vai consumindo esses links, então o tempo
+total fica perto de max(descoberta, extração) em vez da soma.
+
+- Limite por buscador: no máximo uma consulta a cada ENGINE_MIN_INTERVAL
+  segundos somando todos os navegadores (evita CAPTCHA no Bing).
+- Contrapressão: se houver mais de MAX_PENDING_LINKS links pendentes, os
+  navegadores de busca esperam a extração alcançar.
+- Desafios: uma SERP com CAPTCHA vai para FilaDesafios (navegador visível
+  dedicado) e a consulta volta para a fila quando alguém resolver; os demais
+  navegadores continuam buscando.
+"""
+
+import queue
+import threading
+import time
+
+from busca_ampla import BroadSearcher
+from desafios import DesafioPendente, FilaDesafios, CAPTCHA_POLL
+
+SEARCH_BROWSERS = 2  # navegadores de busca em paralelo
+ENGINE_MIN_INTERVAL = {'bing': 2.0}  # segundos entre consultas ao mesmo buscador
+MAX_PENDING_LINKS = 2000  # acima disso a descoberta espera a extração
+BACKPRESSURE_POLL = 5.0  # segundos entre checagens da fila de pendentes
+
+
+class LimiteBuscador:
+    """Intervalo mínimo entre consultas a um buscador, compartilhado entre threads."""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.lock = threading.Lock()
+        self.proxima = 0.0
+
+    def aguardar(self):
+        with self.lock:
+            agora = time.monotonic()
+            vez = max(agora, self.proxima)
+            self.proxima = vez + self.intervalo
+        if vez > agora:
+            time.sleep(vez - agora)
+
+
+class AgendadorDescoberta:
+    def __init__(self, db, keywords, domains, navegadores=SEARCH_BROWSERS, headless=False,
+                 links_per_domain=20, max_pendentes=MAX_PENDING_LINKS, desafios=None):
+        self.db = db
+        self.desafios = desafios or FilaDesafios()
+        self.navegadores = max(1, navegadores)
+        self.headless = headless
+        self.links_per_domain = links_per_domain
+        self.max_pendentes = max_pendentes
+        self.limites = {motor: LimiteBuscador(i) for motor, i in ENGINE_MIN_INTERVAL.items()}
+        self.tarefas = queue.Queue()
+        for kw in keywords:
+            for domain in domains:
+                self.tarefas.put((kw, domain))
+        self.total = self.tarefas.qsize()
+        self.lock = threading.Lock()
+        self.feitas = 0
+        self.links = 0
+        self.desafiadas = 0
+        self._threads = []
+
+    def iniciar(self):
+        for i in range(min(self.navegadores, self.total)):
+            t = threading.Thread(target=self._worker, args=(i,), daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def ativo(self):
+        """True enquanto algum navegador de busca ainda pode gravar links novos."""
+        return any(t.is_alive() for t in self._threads)
+
+    def aguardar(self):
+        for t in self._threads:
+            t.join()
+
+    def _esperar_extracao(self):
+        # Contrapressão: não adianta descobrir mais rápido do que a extração consome
+        while self.db.count_pending() > self.max_pendentes:
+            time.sleep(BACKPRESSURE_POLL)
+
+    def _reenfileirar(self, kw, domain):
+        def concluir(url, html, cookies):
+            if html is not None:
+                self.tarefas.put((kw, domain))
+            else:
+                print(f"  ✗ Busca '{kw}' em {domain} descartada: desafio não resolvido")
+        return concluir
+
+    def _worker(self, n):
+        buscador = BroadSearcher(headless=self.headless, slow_wait=1, desafios=self.desafios)
+        if not buscador.start_driver():
+            print(f"❌ Navegador de busca {n} não iniciou; as consultas ficam com os demais")
+            return
+        try:
+            while True:
+                try:
+                    kw, domain = self.tarefas.get_nowait()
+                except queue.Empty:
+                    # Consultas presas em desafio podem voltar para a fila
+                    if self.desafios.pendentes():
+                        time.sleep(CAPTCHA_POLL)
+                        continue
+                    break
+                self._esperar_extracao()
+                self.limites['bing'].aguardar()
+                try:
+                    links = buscador.bing_site_search_browser(kw, domain, limit=self.links_per_domain)
+                except DesafioPendente as e:
+                    with self.lock:
+                        self.desafiadas += 1
+                    self.desafios.encaminhar(str(e), concluir=self._reenfileirar(kw, domain))
+                    continue
+                for link in links:
+                    self.db.add_link(link, domain, kw)
+                with self.lock:
+                    self.feitas += 1
+                    self.links += len(links)
+                    feitas = self.feitas
+                print(f"  ✓ [{feitas}/{self.total}] {len(links)} links de {domain} para '{kw}'")
+        finally:
+            buscador.close_driver()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportação de `imoveis` em streaming, com memória constante.
+
+As linhas saem do cursor do SQLite em blocos de EXPORT_CHUNK e vão direto
+para o arquivo; nada de montar a tabela inteira numa lista. Formatos:
+
+    csv     cabeçalho + uma linha por imóvel
+    ndjson  um objeto JSON por linha (o melhor para carga em outro sistema)
+    json    array JSON, escrito objeto a objeto
+
+Compressão opcional: gzip (biblioteca padrão) ou zstd (pacote `zstandard`,
+o mesmo do page_store.py). A extensão do arquivo acompanha: .csv.gz,
+.ndjson.zst...
+
+Exportação incremental (--incremental ALVO): cada destino (um job de BI,
+um bucket...) tem sua marca d'água, o maior atualizado_em já exportado para
+ele, guardada na tabela `exportacoes` do imoveis.db. Cada execução escreve
+em output/<alvo>/ só as linhas novas ou alteradas desde a marca e atualiza
+output/<alvo>/manifesto.json com a lista de arquivos delta. A primeira
+execução é a carga completa. atualizado_em muda em qualquer escrita da
+linha, inclusive as que não mexem em data_coleta (backfill de
+normalizacao.py, historico.migrar): os triggers de ImovelDB cuidam disso.
+Quem consome lê os deltas do manifesto em ordem e faz upsert por `id`.
+
+O corte fica EXPORT_MARGEM_S no passado: escritas mais novas podem ainda
+estar na fila do escritor (write-behind) e entram no próximo delta.
+
+Uso:
+    python exportacao.py                                   # CSV com as colunas de sempre
+    python exportacao.py --formato ndjson --compressao zstd
+    python exportacao.py --formato json --colunas id,preco_centavos,cidade,uf --limite 1000
+    python exportacao.py --incremental bi --formato ndjson --compressao gzip
+    python exportacao.py --incremental bi --reiniciar      # próxima execução volta a ser completa
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from page_store import zstandard
+
+OUTPUT_DIR = Path(__file__).parent / "output"
+EXPORT_CHUNK = 1000  # linhas por fetchmany
+GZIP_LEVEL = 6
+EXPORT_MARGEM_S = 60  # incremental: só linhas gravadas há mais que isso (fila do escritor)
+MANIFESTO = 'manifesto.json'
+EXPORT_ZSTD_LEVEL = 3  # exportação é sequencial e grande: nível rápido
+
+FORMATOS = ('csv', 'ndjson', 'json')
+EXTENSOES = {'gzip': '.gz', 'zstd': '.zst', None: ''}
+
+# Colunas das exportações antigas (export_json/exportar_csv), na mesma ordem
+COLUNAS_EXPORT = ('id', 'titulo', 'preco', 'metragem', 'quartos', 'banheiros', 'descricao', 'endereco',
+                  'cidade', 'estado', 'cep', 'contato', 'link', 'fonte', 'data_coleta')
+
+
+def colunas_validas(conn, colunas):
+    """Confere `colunas` contra a tabela; ValueError com as desconhecidas."""
+    existentes = {row[1] for row in conn.execute("PRAGMA table_info(imoveis)")}
+    desconhecidas = [c for c in colunas if c not in existentes]
+    if desconhecidas:
+        raise ValueError(f"coluna(s) inexistente(s) em imoveis: {', '.join(desconhecidas)}")
+    return tuple(colunas)
+
+
+def iterar_imoveis(conn, colunas=COLUNAS_EXPORT, limite=None, onde=None, params=()):
+    """Dicts de `imoveis` (em ordem de rowid), lidos do cursor em blocos."""
+    colunas = colunas_validas(conn, colunas)
+    query = f"SELECT {', '.join(colunas)} FROM imoveis"
+    if onde:
+        query += f" WHERE {onde}"
+    query += " ORDER BY rowid"
+    if limite:
+        query += " LIMIT ?"
+        params = (*params, limite)
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(colunas, row))
+
+
+def abrir_saida(arquivo, compressao=None):
+    """Arquivo de texto para escrita, comprimido conforme `compressao`."""
+    if compressao == 'gzip':
+        return gzip.open(arquivo, 'wt', encoding='utf-8', newline='', compresslevel=GZIP_LEVEL)
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("compressão zstd: instale o pacote zstandard")
+        bruto = zstandard.ZstdCompressor(level=EXPORT_ZSTD_LEVEL).stream_writer(open(arquivo, 'wb'))
+        return io.TextIOWrapper(bruto, encoding='utf-8', newline='')
+    if compressao:
+        raise ValueError(f"compressão desconhecida: {compressao}")
+    return open(arquivo, 'w', encoding='utf-8', newline='')
+
+
+def escrever(linhas, formato, saida, colunas):
+    """Escreve os dicts de `linhas` em `saida` conforme chegam. Retorna quantos."""
+    n = 0
+    if formato == 'csv':
+        writer = csv.DictWriter(saida, fieldnames=colunas, extrasaction='ignore')
+        writer.writeheader()
+        for n, linha in enumerate(linhas, 1):
+            writer.writerow(linha)
+    elif formato == 'ndjson':
+        for n, linha in enumerate(linhas, 1):
+            saida.write(json.dumps(linha, ensure_ascii=False) + '\n')
+    elif formato == 'json':
+        saida.write('[')
+        for n, linha in enumerate(linhas, 1):
+            saida.write((',\n' if n > 1 else '\n') + json.dumps(linha, ensure_ascii=False))
+        saida.write('\n]\n' if n else ']\n')
+    else:
+        raise ValueError(f"formato desconhecido: {formato}")
+    return n
+
+
+def nome_arquivo(prefixo, formato, compressao=None):
+    """output/<prefixo>_<timestamp>.<formato>[.gz|.zst]"""
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return OUTPUT_DIR / f"{prefixo}_{timestamp}.{formato}{EXTENSOES[compressao]}"
+
+
+def exportar(db_path, arquivo, formato='csv', compressao=None, colunas=COLUNAS_EXPORT, limite=None,
+             onde=None, params=()):
+    """Exporta imoveis para `arquivo` em streaming. Retorna quantos imóveis."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        colunas = colunas_validas(conn, colunas)
+        with abrir_saida(arquivo, compressao) as saida:
+            return escrever(iterar_imoveis(conn, colunas, limite, onde, params), formato, saida, colunas)
+    finally:
+        conn.close()
+
+
+def marca_dagua(conn, alvo):
+    """Maior atualizado_em já exportado para `alvo` (None: nunca exportado)."""
+    return conn.execute("SELECT MAX(ate) FROM exportacoes WHERE alvo = ?", (alvo,)).fetchone()[0]
+
+
+def escrever_manifesto(conn, alvo, pasta):
+    """Reescreve <pasta>/manifesto.json a partir da tabela exportacoes."""
+    campos = ('arquivo', 'desde', 'ate', 'linhas', 'formato', 'compressao', 'colunas', 'criado_em')
+    deltas = []
+    for row in conn.execute(f"SELECT {', '.join(campos)} FROM exportacoes WHERE alvo = ? ORDER BY id", (alvo,)):
+        delta = dict(zip(campos, row))
+        delta['colunas'] = delta['colunas'].split(',')
+        deltas.append(delta)
+    manifesto = {'alvo': alvo, 'marca_dagua': deltas[-1]['ate'] if deltas else None, 'deltas': deltas}
+    # Escreve ao lado e renomeia: quem lê nunca vê o manifesto pela metade
+    temporario = pasta / f"{MANIFESTO}.parcial"
+    temporario.write_text(json.dumps(manifesto, ensure_ascii=False, indent=2), encoding='utf-8')
+    temporario.replace(pasta / MANIFESTO)
+
+
+def exportar_incremental(db_path, alvo, formato='ndjson', compressao=None, colunas=COLUNAS_EXPORT, agora=None):
+    """
+    Exporta para output/<alvo>/ as linhas gravadas desde a marca d'água de
+    `alvo` e avança a marca. Retorna (arquivo, linhas); (None, 0) se não há
+    nada novo.
+    """
+    if not re.fullmatch(r'[\w.-]+', alvo):
+        raise ValueError(f"nome de alvo inválido (use letras, números, '.', '-', '_'): {alvo}")
+    corte = ((agora or datetime.now()) - timedelta(seconds=EXPORT_MARGEM_S)).isoformat()
+    pasta = OUTPUT_DIR / alvo
+    pasta.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        colunas = colunas_validas(conn, colunas)
+        desde = marca_dagua(conn, alvo)
+        if desde is None:
+            onde, params = "atualizado_em IS NULL OR atualizado_em <= ?", (corte,)
+        else:
+            onde, params = "atualizado_em > ? AND atualizado_em <= ?", (desde, corte)
+        seq = conn.execute("SELECT COUNT(*) FROM exportacoes WHERE alvo = ?", (alvo,)).fetchone()[0] + 1
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        arquivo = pasta / f"imoveis_delta_{seq:06d}_{timestamp}.{formato}{EXTENSOES[compressao]}"
+        temporario = arquivo.with_name(f"{arquivo.name}.parcial")
+        with abrir_saida(temporario, compressao) as saida:
+            n = escrever(iterar_imoveis(conn, colunas, onde=onde, params=params), formato, saida, colunas)
+        if not n:
+            temporario.unlink()
+            return None, 0
+        temporario.replace(arquivo)
+        with conn:
+            conn.execute("""
+                INSERT INTO exportacoes (alvo, arquivo, desde, ate, linhas, formato, compressao, colunas, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (alvo, arquivo.name, desde, corte, n, formato, compressao, ','.join(colunas),
+                  datetime.now().isoformat()))
+        escrever_manifesto(conn, alvo, pasta)
+        return arquivo, n
+    finally:
+        conn.close()
+
+
+def reiniciar(db_path, alvo):
+    """Apaga a marca d'água de `alvo`: a próxima exportação incremental é completa."""
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        n = conn.execute("DELETE FROM exportacoes WHERE alvo = ?", (alvo,)).rowcount
+        pasta = OUTPUT_DIR / alvo
+        if pasta.exists():
+            escrever_manifesto(conn, alvo, pasta)
+    return n
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta imoveis.db em streaming (csv, ndjson, json)')
+    parser.add_argument('--formato', choices=FORMATOS, default='csv')
+    parser.add_argument('--compressao', choices=['gzip', 'zstd'], default=None)
+    parser.add_argument('--colunas', type=str, default=None,
+                        help='Separadas por vírgula (padrão: as da exportação antiga)')
+    parser.add_argument('--limite', type=int, default=None)
+    parser.add_argument('--saida', type=str, default=None, help='Arquivo (padrão: output/imoveis_export_<data>...)')
+    parser.add_argument('--incremental', type=str, default=None, metavar='ALVO',
+                        help="Só o que mudou desde a última exportação para ALVO (output/ALVO/ + manifesto)")
+    parser.add_argument('--reiniciar', action='store_true', help="Com --incremental: apagar a marca d'água do alvo")
+    args = parser.parse_args()
+    if args.incremental and (args.saida or args.limite):
+        parser.error("--incremental escreve em output/ALVO/ e exporta tudo o que mudou (sem --saida/--limite)")
+    if args.reiniciar and not args.incremental:
+        parser.error("--reiniciar precisa de --incremental ALVO")
+
+    # Import tardio: ImovelDB usa este módulo nas exportações
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB()
+    db.flush()
+    colunas = tuple(c.strip() for c in args.colunas.split(',')) if args.colunas else COLUNAS_EXPORT
+    try:
+        if args.reiniciar:
+            n = reiniciar(db.db_path, args.incremental)
+            print(f"🧹 Marca d'água de '{args.incremental}' apagada ({n} delta(s) esquecido(s)): "
+                  "a próxima exportação é completa")
+        elif args.incremental:
+            arquivo, n = exportar_incremental(db.db_path, args.incremental, args.formato, args.compressao, colunas)
+            if arquivo:
+                print(f"✅ {n} imóvel(is) novo(s)/alterado(s) em: {arquivo}")
+            else:
+                print(f"Nada novo para '{args.incremental}' desde a última exportação")
+        else:
+            arquivo = Path(args.saida) if args.saida else nome_arquivo('imoveis_export', args.formato, args.compressao)
+            n = exportar(db.db_path, arquivo, args.formato, args.compressao, colunas, args.limite)
+            print(f"✅ {n} imóvel(is) exportado(s) para: {arquivo}")
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    db.close()
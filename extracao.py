@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de extração em passada única para páginas de imóveis.
+
+Em vez de colapsar espaços do documento inteiro (re.sub em ~370 KB) e rodar
+mais de 15 re.search sobre o HTML, uma única varredura (_TOKEN_RE.finditer)
+encontra os pontos de interesse em ordem de documento:
+
+- blocos JSON-LD, <meta> description/og:description, <title>, <h1>,
+  href="tel:" e data-phone (o conteúdo é capturado por lookahead);
+- candidatos de campos de texto: "R$", sequências de dígitos e o "-" de
+  "Cidade - UF".
+
+Cada token é validado com um padrão ancorado na própria posição, reproduzindo
+exatamente o primeiro match que a cascata antiga encontrava no texto
+colapsado. O resultado de extrair_dados é o mesmo dicionário de antes.
+"""
+
+import json
+import re
+
+price_re = re.compile(r"R\$\s*[\d\.\,]+")
+area_re = re.compile(r"(\d{2,4})\s*m[²2]", re.IGNORECASE)
+rooms_re = re.compile(r"(\d+)\s*(?:quarto|quartos|q|qt)\b", re.IGNORECASE)
+baths_re = re.compile(r"(\d+)\s*(?:banheiro|banheiros|b\.)\b", re.IGNORECASE)
+cep_re = re.compile(r"\b\d{5}-\d{3}\b")
+phone_re = re.compile(r"\(?\d{2,3}\)?\s*\d{4,5}-\d{4}")
+endereco_re = re.compile(r'([A-Za-z0-9\s\.,\-]+\b)(?:,\s*)([A-Za-z\s]+)\s*-\s*([A-Z]{2})')
+jsonld_re = re.compile(r"<script[^>]*type=\"application/ld\+json\"[^>]*>(.*?)</script>", re.I | re.S)
+
+_ESPACOS_RE = re.compile(r"\s+")
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Sufixos validados logo após uma sequência de dígitos
+_AREA_SUFIXO = re.compile(r"\s*m[²2]", re.IGNORECASE)
+_ROOMS_SUFIXO = re.compile(r"\s*(?:quarto|quartos|q|qt)\b", re.IGNORECASE)
+_BATHS_SUFIXO = re.compile(r"\s*(?:banheiro|banheiros|b\.)\b", re.IGNORECASE)
+
+# Caracteres que endereco_re aceita antes da vírgula (além de espaços)
+_ENDERECO_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,-")
+
+# Cada alternativa começa por um caractere de [\dR<hHdD-], o que deixa o re
+# pular direto as posições irrelevantes. Sequências de dígitos só viram token
+# quando o que vem depois permite área/quartos/banheiros (m, q, b), CEP ou
+# telefone ("-", ")", dígito após espaço). Os tokens estruturais consomem um
+# único caractere e capturam o conteúdo via lookahead, então nada que esteja
+# dentro deles deixa de ser visto pelos demais tokens.
+_TOKEN_RE = re.compile(r"""
+  (?=[\dR<hHdD-])
+  (?:
+    (?P<num>(?<!\d)\d+(?!\d)(?=(?i:\s*[mqb])|-|\)?\s*\d))
+  | (?P<preco>R\$)
+  | (?P<traco>-)(?=\s*[A-Z]{2})
+  | <(?=(?is:script[^>]*type="application/ld\+json"[^>]*>(?P<ld>.*?)</script>)
+       |(?i:meta\s+name=["']description["']\s+content=["'](?P<desc>[^"']+)["'])
+       |(?i:meta\s+property=["']og:description["']\s+content=["'](?P<og>[^"']+)["'])
+       |(?i:title>(?P<titulo>.*?)</title>)
+       |(?is:h1[^>]*>(?P<h1>.*?)</h1>))
+  | [hH](?=(?i:ref=['"]tel:(?P<tel>\+?[0-9\-\(\)\s]+)['"]))
+  | [dD](?=(?i:ata-phone=['"](?P<dataphone>[^'"]+)['"]))
+  )
+""", re.VERBOSE)
+
+_CAMPOS_TEXTO = ('preco', 'metragem', 'quartos', 'banheiros', 'cep', 'telefone', 'endereco', 'descricao', 'titulo')
+
+
+def _colapsar(s):
+    return _ESPACOS_RE.sub(" ", s)
+
+
+def _prefixo_colapsado(html, n=150):
+    """Primeiros n caracteres de re.sub(r"\\s+", " ", html) sem colapsar a página toda."""
+    k = 1024
+    while True:
+        parte = _colapsar(html[:k])
+        if len(parte) > n or k >= len(html):
+            return parte[:n]
+        k *= 4
+
+
+def _parse_jsonld(txt):
+    """Converte o corpo de um bloco JSON-LD em lista de objetos (vazia se inválido)."""
+    try:
+        txt = txt.strip()
+        # Some pages include multiple JSON objects concatenated
+        data = json.loads(txt)
+        if txt.startswith('['):
+            return data if isinstance(data, list) else []
+        return [data]
+    except Exception:
+        return []
+
+
+def _extract_jsonld(html):
+    """Parse JSON-LD blocks and return list of dicts."""
+    objs = []
+    for m in jsonld_re.finditer(html):
+        objs.extend(_parse_jsonld(m.group(1)))
+    return objs
+
+
+def _dados_jsonld(obj, html, url):
+    """Monta o resultado a partir de um objeto JSON-LD (None se não for um anúncio)."""
+    # common fields: name, description, offers, address, telephone
+    titulo = obj.get('name') or obj.get('headline')
+    descricao = obj.get('description')
+    price = None
+    endereco = None
+    cidade = None
+    estado = None
+    cep = None
+
+    # offers may contain price
+    offers = obj.get('offers')
+    if isinstance(offers, dict):
+        price = offers.get('price') or offers.get('priceSpecification', {}).get('price')
+    # address
+    address = obj.get('address') or {}
+    if isinstance(address, dict):
+        endereco = address.get('streetAddress')
+        cidade = address.get('addressLocality')
+        estado = address.get('addressRegion')
+        cep = address.get('postalCode')
+    # contact
+    contato = obj.get('telephone') or (obj.get('contactPoint', {}) or {}).get('telephone')
+
+    if not (titulo or price or endereco):
+        return None
+    return {
+        'titulo': titulo or _prefixo_colapsado(html),
+        'preco': f"R$ {price}" if price and not isinstance(price, str) and price else (price if isinstance(price, str) else None),
+        'metragem': None,
+        'quartos': None,
+        'banheiros': None,
+        'descricao': descricao,
+        'endereco': endereco,
+        'cidade': cidade,
+        'estado': estado,
+        'cep': cep,
+        'contato': contato,
+        'link': url,
+    }
+
+
+class _Campos:
+    """Primeiro candidato encontrado para cada campo de fallback."""
+
+    def __init__(self):
+        self.valores = {}
+        self.og = None
+        self.h1 = None
+        self.tel = None
+        self.dataphone = None
+        self.endereco_run = -1  # início da última sequência já testada para endereço
+
+    def falta(self, campo):
+        return campo not in self.valores
+
+    def completo(self):
+        return all(c in self.valores for c in _CAMPOS_TEXTO)
+
+
+def _tratar_numero(html, a, b, campos):
+    """Valida os campos numéricos para a sequência de dígitos html[a:b]."""
+    n = b - a
+    if campos.falta('metragem') and n >= 2 and _AREA_SUFIXO.match(html, b):
+        campos.valores['metragem'] = f"{html[max(a, b - 4):b]} m²"
+    if campos.falta('quartos') and _ROOMS_SUFIXO.match(html, b):
+        campos.valores['quartos'] = f"{html[a:b]} Q"
+    if campos.falta('banheiros') and _BATHS_SUFIXO.match(html, b):
+        campos.valores['banheiros'] = f"{html[a:b]} B"
+    if campos.falta('cep') and n == 5:
+        m = cep_re.match(html, a)
+        if m:
+            campos.valores['cep'] = m.group(0)
+    if campos.falta('telefone'):
+        # Um telefone só pode começar no "(" anterior ou nos últimos 8 dígitos da sequência
+        inicios = [a - 1] if a > 0 and html[a - 1] == '(' else []
+        inicios.extend(range(max(a, b - 8), b - 1))
+        for p in inicios:
+            m = phone_re.match(html, p)
+            if m:
+                campos.valores['telefone'] = _colapsar(m.group(0))
+                break
+
+
+def _tratar_traco(html, t, campos):
+    """Testa endereco_re a partir do início da sequência de caracteres que contém o "-"."""
+    r = t
+    while r > 0:
+        ch = html[r - 1]
+        if ch in _ENDERECO_CHARS or ch.isspace():
+            r -= 1
+        else:
+            break
+    # Se houver match dentro da sequência, há um começando no início dela;
+    # e se não houve da primeira vez, não haverá para outro "-" da mesma sequência.
+    if r == campos.endereco_run:
+        return
+    campos.endereco_run = r
+    m = endereco_re.match(html, r)
+    if m:
+        campos.valores['endereco'] = tuple(_colapsar(g).strip() for g in m.groups())
+
+
+def extrair_dados(html, url=None):
+    """Extrai dados de imóvel da página HTML."""
+    if not html or len(html) < 100:
+        return None
+
+    campos = _Campos()
+    jsonld_ativo = True
+    fim_ultimo_ld = 0
+    pos = 0
+
+    for m in _TOKEN_RE.finditer(html):
+        tipo = m.lastgroup
+        inicio = m.start()
+        if tipo == 'num':
+            _tratar_numero(html, inicio, m.end(), campos)
+        elif tipo == 'preco':
+            if campos.falta('preco'):
+                mp = price_re.match(html, inicio)
+                if mp:
+                    campos.valores['preco'] = _colapsar(mp.group(0))
+        elif tipo == 'traco':
+            if campos.falta('endereco'):
+                _tratar_traco(html, inicio, campos)
+        elif tipo == 'ld':
+            if jsonld_ativo and inicio >= fim_ultimo_ld:
+                fim_ultimo_ld = m.end('ld')
+                try:
+                    for obj in _parse_jsonld(m.group('ld')):
+                        if isinstance(obj, dict):
+                            dados = _dados_jsonld(obj, html, url)
+                            if dados:
+                                return dados
+                except Exception:
+                    # Comportamento original: um objeto malformado encerra a leitura de JSON-LD
+                    jsonld_ativo = False
+        elif tipo == 'desc':
+            campos.valores.setdefault('descricao', m.group('desc'))
+        elif tipo == 'og':
+            if campos.og is None:
+                campos.og = m.group('og')
+        elif tipo == 'titulo':
+            campos.valores.setdefault('titulo', m.group('titulo').strip())
+        elif tipo == 'h1':
+            if campos.h1 is None:
+                campos.h1 = _TAG_RE.sub('', m.group('h1')).strip()
+        elif tipo == 'tel':
+            if campos.tel is None:
+                campos.tel = m.group('tel')
+        elif tipo == 'dataphone':
+            if campos.dataphone is None:
+                campos.dataphone = m.group('dataphone')
+
+        if campos.completo():
+            pos = m.end()
+            break
+    else:
+        pos = len(html)
+
+    # Todos os campos de texto já achados: só falta conferir JSON-LD no resto da página
+    if jsonld_ativo and pos < len(html):
+        for m in jsonld_re.finditer(html, max(pos, fim_ultimo_ld)):
+            try:
+                for obj in _parse_jsonld(m.group(1)):
+                    if isinstance(obj, dict):
+                        dados = _dados_jsonld(obj, html, url)
+                        if dados:
+                            return dados
+            except Exception:
+                break
+
+    v = campos.valores
+    titulo = v.get('titulo')
+    if titulo is None:
+        titulo = campos.h1
+    preco = v.get('preco')
+    metragem = v.get('metragem')
+    if not (titulo or preco or metragem):
+        return None
+
+    endereco = cidade = estado = None
+    if 'endereco' in v:
+        endereco, cidade, estado = v['endereco']
+
+    contato = v.get('telefone')
+    if not contato:
+        contato = campos.tel
+    if not contato:
+        contato = campos.dataphone
+
+    return {
+        'titulo': titulo,
+        'preco': preco,
+        'metragem': metragem,
+        'quartos': v.get('quartos'),
+        'banheiros': v.get('banheiros'),
+        'descricao': v.get('descricao') or campos.og,
+        'endereco': endereco,
+        'cidade': cidade,
+        'estado': estado,
+        'cep': v.get('cep'),
+        'contato': contato,
+        'link': url,
+    }
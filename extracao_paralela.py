@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Estágio de extração em processos separados.
+
+A extração (regex em extracao.py, BeautifulSoup em olx_deep_scraper) é CPU
+pura e, rodando dentro das threads dos navegadores, fica serializada pelo GIL.
+EstagioExtracao manda os documentos para um ProcessPoolExecutor:
+
+- extrair(url, html): usado pelas threads do scraper; a thread espera o
+  resultado sem segurar o GIL, então N navegadores extraem em N núcleos;
+- mapear(documentos): usado no reprocessamento em massa; envia lotes de
+  EXTRACTION_CHUNK documentos, com poucos lotes em voo por processo.
+
+Os extratores são referenciados por nome (EXTRATORES) e importados só dentro
+dos processos filhos.
+"""
+
+import importlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from page_store import descomprimir
+
+EXTRACTION_CHUNK = 32  # documentos por tarefa enviada a um processo
+LOTES_EM_VOO_POR_JOB = 2
+
+EXTRATORES = {
+    'padrao': ('extracao', 'extrair_dados'),
+    'olx': ('olx_deep_scraper', 'parse_ad_page'),
+}
+
+_cache_extratores = {}
+
+
+def _resolver(extrator):
+    funcao = _cache_extratores.get(extrator)
+    if funcao is None:
+        modulo, nome = EXTRATORES[extrator]
+        funcao = getattr(importlib.import_module(modulo), nome)
+        _cache_extratores[extrator] = funcao
+    return funcao
+
+
+def _extrair_documento(extrator, url, html):
+    return _resolver(extrator)(html, url)
+
+
+def _extrair_lote(extrator, lote):
+    """
+    Roda em processo filho. Cada item é (url, compressao, conteudo): com
+    compressao None o conteúdo já é o HTML; senão é um blob do page_store.
+    Retorna [(url, dados, raw_text)] só das páginas com imóvel extraído.
+    """
+    funcao = _resolver(extrator)
+    resultados = []
+    for url, compressao, conteudo in lote:
+        try:
+            if compressao is not None:
+                conteudo = descomprimir(conteudo, compressao).decode('utf-8', errors='replace')
+            dados = funcao(conteudo, url)
+        except Exception as e:
+            print(f"Erro ao extrair {url}: {e}")
+            continue
+        if dados:
+            resultados.append((url, dados, conteudo[:500]))
+    return resultados
+
+
+def _lotes(iteravel, tamanho):
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class EstagioExtracao:
+    """Pool de processos para extrair_dados/parse_ad_page (jobs=0 extrai na própria thread)."""
+
+    def __init__(self, jobs=None, extrator='padrao'):
+        if extrator not in EXTRATORES:
+            raise ValueError(f"Extrator desconhecido: {extrator} (opções: {', '.join(EXTRATORES)})")
+        self.jobs = (os.cpu_count() or 1) if jobs is None else jobs
+        self.extrator = extrator
+        self._executor = None
+        # Várias threads de navegador chamam extrair(): criação e troca do pool sob o lock
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Criado no primeiro uso: quem nunca extrai não sobe processos. None se o pool já caiu.
+        with self._lock:
+            if self._executor is None and self.jobs > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+            return self._executor
+
+    def _descartar(self, executor):
+        """Pool quebrado: desliga (sem esperar) e passa a extrair na própria thread."""
+        with self._lock:
+            self.jobs = 0
+            if self._executor is executor:
+                self._executor = None
+            else:
+                # Outra thread já trocou o pool
+                return
+        print("⚠️  Pool de extração caiu; extraindo na própria thread")
+        executor.shutdown(wait=False)
+
+    def extrair(self, url, html):
+        """Extrai um documento. Bloqueia a thread chamadora até o resultado."""
+        executor = self._pool() if self.jobs > 0 else None
+        if executor is not None:
+            try:
+                return executor.submit(_extrair_documento, self.extrator, url, html).result()
+            except BrokenProcessPool:
+                self._descartar(executor)
+        return _extrair_documento(self.extrator, url, html)
+
+    def mapear(self, documentos, chunk=EXTRACTION_CHUNK):
+        """
+        Extrai (url, compressao, conteudo) em lotes. Gera (qtd_documentos, resultados)
+        por lote concluído, na ordem de envio.
+        """
+        if self.jobs <= 0:
+            for lote in _lotes(documentos, chunk):
+                yield len(lote), _extrair_lote(self.extrator, lote)
+            return
+
+        executor = self._pool()
+        limite = self.jobs * LOTES_EM_VOO_POR_JOB
+        em_voo = []
+        for lote in _lotes(documentos, chunk):
+            em_voo.append((len(lote), executor.submit(_extrair_lote, self.extrator, lote)))
+            # Mantém poucos lotes em voo para não carregar tudo na memória
+            while len(em_voo) >= limite:
+                n, futuro = em_voo.pop(0)
+                yield n, futuro.result()
+        for n, futuro in em_voo:
+            yield n, futuro.result()
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
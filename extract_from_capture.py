@@ -5,9 +5,7 @@ Extrai dados completos dos imóveis direto do capture network
 """
 
 import json
-import sqlite3
 from pathlib import Path
-from datetime import datetime
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -68,51 +66,32 @@ def extract_data_from_capture():
     return unique_imoveis
 
 def save_to_db(imoveis):
-    """Salva no banco de dados"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Cria tabela se não existir
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS imoveis (
-            id TEXT PRIMARY KEY,
-            link TEXT,
-            titulo TEXT,
-            preco TEXT,
-            cidade TEXT,
-            estado TEXT,
-            endereco TEXT,
-            descricao TEXT,
-            fonte TEXT,
-            data_coleta TEXT
-        )
-    """)
-    
+    """
+    Salva no banco de dados pelo ImovelDB: mesmo id estável do anúncio
+    (olx:<list_id>) dos outros coletores, colunas tipadas e histórico de preço.
+    """
+    # Import tardio: scraper_escalavel carrega o Selenium, que este script não usa
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB(DB_PATH)
     logger.info(f"💾 Salvando {len(imoveis)} imóveis no banco...")
     
     for im in imoveis:
         try:
-            c.execute("""
-                INSERT OR REPLACE INTO imoveis 
-                (id, link, titulo, preco, cidade, estado, endereco, descricao, fonte, data_coleta)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(im['list_id']),
-                im['ad_url'],
+            db.add_imovel(
                 im['titulo'],
                 im['preco'],
-                im['cidade'],
-                im['estado'].upper() if im['estado'] else None,
-                im['bairro'],
-                f"Categoria: {im['categoria']}",
-                'OLX',
-                datetime.now().isoformat(),
-            ))
+                descricao=f"Categoria: {im['categoria']}",
+                endereco=im['bairro'],
+                cidade=im['cidade'],
+                estado=im['estado'].upper() if im['estado'] else None,
+                link=im['ad_url'].replace('\\/', '/'),  # JSON capturado vem com \/
+                fonte='OLX',
+            )
         except Exception as e:
             logger.warning(f"Erro ao salvar {im['list_id']}: {e}")
     
-    conn.commit()
-    conn.close()
+    db.close()
     logger.info("✅ Salvamento concluído")
 
 def main():
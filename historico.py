@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histórico de preços por anúncio.
+
+Antes o id em `imoveis` era md5(titulo + preco + link): uma mudança de preço
+criava outra linha e a antiga ficava órfã. Agora cada anúncio tem identidade
+estável (id_anuncio): o id do próprio site quando a URL traz um (OLX
+list_id, imovelweb, VivaReal/ZAP, Mercado Livre) ou a URL canônica. A linha
+em `imoveis` passa a ser o estado atual do anúncio e o passado fica em duas
+tabelas do imoveis.db:
+
+- `observacoes` (só acrescenta): (anuncio_id, observado_em, preco_centavos,
+  situacao). Uma linha por mudança de preço/situação, escrita por trigger
+  no UPSERT de `anuncios`; visitas sem mudança só atualizam
+  `anuncios.ultima_observacao`, então o histórico continua completo sem
+  uma linha por dia de cada anúncio.
+- `anuncios`: último estado, com o preço anterior e quando mudou. O índice
+  parcial idx_anuncios_quedas cobre só as quedas de preço, então "o que
+  baixou desde ontem" não varre a tabela nem faz self-join em preço texto.
+
+Uso:
+    python historico.py anuncio https://www.olx.com.br/vi/1234567890
+    python historico.py quedas --desde 2026-10-01 --min-pct 5
+    python historico.py migrar   # reescreve ids antigos de imoveis.db
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+from datetime import datetime
+
+from cache_http import url_canonica
+from normalizacao import preco_centavos
+from revisita import ATIVO
+
+# Id do anúncio no próprio site, por domínio (primeiro grupo de cada regex)
+ID_ANUNCIO_PATTERNS = {
+    'olx.com.br': (r'/vi/(\d+)', r'-(\d{8,})(?:[/?#]|$)'),
+    'imovelweb.com.br': (r'-(\d{6,})\.html',),
+    'vivareal.com.br': (r'id-(\d+)', r'/(\d{6,})/?(?:[?#]|$)'),
+    'zapimoveis.com.br': (r'id-(\d+)',),
+    'mercadolivre.com.br': (r'(MLB)-?(\d+)',),
+}
+QUEDAS_LIMIT = 100
+
+# UPSERT do último estado: (anuncio_id, url, fonte, preco_centavos, situacao, observado_em).
+# Preço ausente (anúncio removido, extração sem preço) mantém o último preço conhecido.
+UPSERT_ANUNCIO = """
+    INSERT INTO anuncios (anuncio_id, url, fonte, preco_centavos, situacao, primeira_observacao, ultima_observacao)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?6)
+    ON CONFLICT(anuncio_id) DO UPDATE SET
+        preco_anterior_centavos = CASE WHEN excluded.preco_centavos IS NOT NULL
+                                        AND excluded.preco_centavos IS NOT preco_centavos
+                                       THEN preco_centavos ELSE preco_anterior_centavos END,
+        preco_mudou_em = CASE WHEN excluded.preco_centavos IS NOT NULL
+                               AND excluded.preco_centavos IS NOT preco_centavos
+                              THEN excluded.ultima_observacao ELSE preco_mudou_em END,
+        preco_centavos = COALESCE(excluded.preco_centavos, preco_centavos),
+        situacao = excluded.situacao,
+        url = COALESCE(excluded.url, url),
+        fonte = COALESCE(excluded.fonte, fonte),
+        ultima_observacao = excluded.ultima_observacao
+"""
+
+def id_anuncio(url):
+    """Identidade estável do anúncio: 'olx:1234567890', ou 'url:<hash da URL canônica>'."""
+    for dominio, padroes in ID_ANUNCIO_PATTERNS.items():
+        if dominio in url:
+            for padrao in padroes:
+                m = re.search(padrao, url)
+                if m:
+                    return f"{dominio.split('.')[0]}:{''.join(m.groups())}"
+    return "url:" + hashlib.md5(url_canonica(url).encode()).hexdigest()
+
+
+def _reais(centavos):
+    if centavos is None:
+        return '-'
+    return f"R$ {centavos / 100:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def estado_atual(conn, anuncio_id):
+    """Último estado do anúncio (dict) ou None."""
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM anuncios WHERE anuncio_id = ?", (anuncio_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def historico(conn, anuncio_id, desde=None):
+    """Observações do anúncio em ordem cronológica: [(observado_em, preco_centavos, situacao)]."""
+    query = "SELECT observado_em, preco_centavos, situacao FROM observacoes WHERE anuncio_id = ?"
+    params = [anuncio_id]
+    if desde:
+        query += " AND observado_em >= ?"
+        params.append(desde)
+    return conn.execute(query + " ORDER BY observado_em", params).fetchall()
+
+
+def quedas_de_preco(conn, desde=None, min_pct=0.0, fonte=None, limite=QUEDAS_LIMIT):
+    """
+    Anúncios cujo preço atual é menor que o anterior, mudado a partir de
+    `desde` (ISO). Usa o índice parcial idx_anuncios_quedas.
+    Retorna [(anuncio_id, url, preco_anterior, preco_atual, queda_pct, mudou_em)].
+    """
+    query = """
+        SELECT anuncio_id, url, preco_anterior_centavos, preco_centavos,
+               100.0 * (preco_anterior_centavos - preco_centavos) / preco_anterior_centavos AS queda,
+               preco_mudou_em
+        FROM anuncios INDEXED BY idx_anuncios_quedas
+        WHERE preco_centavos < preco_anterior_centavos AND preco_mudou_em >= ?
+    """
+    params = [desde or '']
+    if fonte:
+        query += " AND fonte = ?"
+        params.append(fonte)
+    if min_pct:
+        query += " AND preco_centavos <= preco_anterior_centavos * (1 - ? / 100.0)"
+        params.append(min_pct)
+    query += " ORDER BY preco_mudou_em DESC LIMIT ?"
+    params.append(limite)
+    return conn.execute(query, params).fetchall()
+
+
+def migrar(db_path):
+    """
+    Reescreve as linhas antigas de `imoveis` para o id estável: id md5 de
+    título+preço+link e o list_id puro que scraper_olx_requests.py e
+    extract_from_capture.py gravavam ('1234567890' em vez de
+    'olx:1234567890'). Cada linha antiga vira uma observação (só se for mais
+    nova que o último estado conhecido do anúncio) e só a mais recente de
+    cada anúncio fica em `imoveis`. Pode rodar de novo: linhas já no id
+    estável não geram observação. Retorna (linhas lidas, anúncios resultantes).
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("""
+            SELECT id, link, preco, fonte, data_coleta FROM imoveis
+            WHERE link IS NOT NULL AND link != '' ORDER BY data_coleta
+        """).fetchall()
+        ultimo = {}  # anuncio_id -> id antigo da linha mais recente
+        for antigo, link, preco, fonte, data in rows:
+            novo = id_anuncio(link)
+            if antigo != novo:
+                data = data or datetime.now().isoformat()
+                visto = conn.execute("SELECT ultima_observacao FROM anuncios WHERE anuncio_id = ?",
+                                     (novo,)).fetchone()
+                # Observação fora de ordem bagunçaria o histórico: só entra se for mais nova
+                if not visto or visto[0] < data:
+                    conn.execute(UPSERT_ANUNCIO, (novo, link, fonte, preco_centavos(preco), ATIVO, data))
+            ultimo[novo] = antigo
+        for novo, antigo in ultimo.items():
+            if antigo != novo:
+                conn.execute("DELETE FROM imoveis WHERE id = ?", (novo,))
+                conn.execute("UPDATE imoveis SET id = ? WHERE id = ?", (novo, antigo))
+        # Linhas de preço antigo do mesmo anúncio (já estão em observacoes)
+        conn.execute("""
+            DELETE FROM imoveis WHERE link IS NOT NULL AND link != ''
+            AND id NOT IN (SELECT anuncio_id FROM anuncios)
+        """)
+        conn.execute("COMMIT")
+        return len(rows), conn.execute("SELECT COUNT(*) FROM anuncios").fetchone()[0]
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Histórico de preços por anúncio (imoveis.db)')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    an = sub.add_parser('anuncio', help='Estado atual e histórico de um anúncio')
+    an.add_argument('anuncio', help='URL do anúncio ou id (ex.: olx:1234567890)')
+    qd = sub.add_parser('quedas', help='Anúncios que baixaram de preço')
+    qd.add_argument('--desde', type=str, default=None, help='Mudanças a partir desta data (ISO)')
+    qd.add_argument('--min-pct', type=float, default=0.0, help='Queda mínima em %%')
+    qd.add_argument('--fonte', type=str, default=None, help='Ex.: OLX, IMOVELWEB')
+    qd.add_argument('--limite', type=int, default=QUEDAS_LIMIT)
+    sub.add_parser('migrar', help='Reescrever ids antigos (md5 de título+preço+link) para o id estável')
+    args = parser.parse_args()
+
+    # Import tardio: ImovelDB usa id_anuncio/preco_centavos deste módulo
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB()
+    db.flush()
+    if args.comando == 'migrar':
+        lidas, anuncios = migrar(db.db_path)
+        print(f"✅ {lidas} linha(s) de imoveis viraram {anuncios} anúncio(s) com histórico")
+    else:
+        with sqlite3.connect(db.db_path) as conn:
+            if args.comando == 'anuncio':
+                anuncio_id = args.anuncio if '://' not in args.anuncio else id_anuncio(args.anuncio)
+                estado = estado_atual(conn, anuncio_id)
+                if not estado:
+                    print(f"Anúncio sem observações: {anuncio_id}")
+                else:
+                    print(f"{anuncio_id} ({estado['situacao']}): {_reais(estado['preco_centavos'])}, "
+                          f"visto de {estado['primeira_observacao'][:10]} a {estado['ultima_observacao'][:10]}")
+                    for observado_em, centavos, situacao in historico(conn, anuncio_id):
+                        print(f"   {observado_em[:16]}  {_reais(centavos):>18}  {situacao}")
+            else:
+                quedas = quedas_de_preco(conn, desde=args.desde, min_pct=args.min_pct, fonte=args.fonte,
+                                         limite=args.limite)
+                for anuncio_id, url, antes, agora, pct, quando in quedas:
+                    print(f"{quando[:10]}  -{pct:4.1f}%  {_reais(antes)} → {_reais(agora)}  {url}")
+                print(f"📉 {len(quedas)} queda(s) de preço")
+    db.close()
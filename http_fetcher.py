@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Fetch em níveis: tenta primeiro um GET simples (sessão requests com pool de
+conexões) e só manda a URL para o navegador quando a resposta não serve.
+
+Uma resposta serve quando não é página de desafio e tem JSON-LD ou marcador
+de preço. A taxa de sucesso de cada nível é acompanhada por domínio: um
+domínio que sempre falha no HTTP passa a ir direto para o navegador (com uma
+sondagem HTTP de vez em quando, caso o site mude).
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache_http import NAO_MODIFICADO
+from net_utils import is_challenge_page, requests_proxies
+
+HTTP_TIMEOUT = 15
+HTTP_POOL_SIZE = 32
+HTTP_MIN_AMOSTRAS = 20  # tentativas antes de julgar um domínio
+HTTP_TAXA_MINIMA = 0.2  # abaixo disso o domínio vai direto para o navegador
+HTTP_SONDAGEM = 50  # a cada N links de um domínio "só navegador", tenta HTTP de novo
+
+PRICE_MARKERS = ('R$', '"price"')
+
+
+def pagina_utilizavel(html):
+    """Retorna True se o HTML tem dados estruturados e não é uma página de desafio."""
+    if not html or len(html) < 100:
+        return False
+    if is_challenge_page(html):
+        return False
+    if 'application/ld+json' in html:
+        return True
+    return any(m in html for m in PRICE_MARKERS)
+
+
+class EstatisticasTier:
+    """Contadores de sucesso/falha por domínio e nível ('http' ou 'browser')."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contagem = {}
+        self._pulados = {}
+
+    def registrar(self, domain, tier, ok):
+        with self._lock:
+            c = self._contagem.setdefault((domain, tier), [0, 0])
+            c[0 if ok else 1] += 1
+
+    def taxa(self, domain, tier):
+        with self._lock:
+            ok, falha = self._contagem.get((domain, tier), (0, 0))
+        total = ok + falha
+        return (ok / total if total else None), total
+
+    def usar_http(self, domain):
+        """Decide se vale tentar o nível HTTP para este domínio."""
+        taxa, total = self.taxa(domain, 'http')
+        if total < HTTP_MIN_AMOSTRAS or taxa >= HTTP_TAXA_MINIMA:
+            return True
+        with self._lock:
+            pulados = self._pulados.get(domain, 0) + 1
+            self._pulados[domain] = pulados
+        return pulados % HTTP_SONDAGEM == 0
+
+    def resumo(self):
+        """Linhas de texto com a taxa de sucesso de cada nível por domínio."""
+        with self._lock:
+            itens = sorted(self._contagem.items())
+        linhas = []
+        for (domain, tier), (ok, falha) in itens:
+            total = ok + falha
+            linhas.append(f"{domain:25} {tier:8} {ok}/{total} ({ok / total * 100:.0f}%)")
+        return linhas
+
+
+class HttpFetcher:
+    """GET com sessão compartilhada entre threads e pool de conexões keep-alive."""
+
+    def __init__(self, user_agent=None, proxy=None, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, cache=None):
+        self.timeout = timeout
+        # CacheHTTP opcional: GET condicional (If-None-Match / If-Modified-Since)
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "pt-BR,pt;q=0.9",
+        })
+        proxies = requests_proxies(proxy)
+        if proxies:
+            self.session.proxies.update(proxies)
+        self.stats = EstatisticasTier()
+
+    def buscar(self, url):
+        """Retorna o HTML se a resposta HTTP for utilizável, senão None."""
+        return self.obter(url)[1]
+
+    def obter(self, url):
+        """
+        Como buscar(), mas diz também como foi: (status, html, validador).
+        `status` é o código HTTP, 'timeout' ou 'erro'; 'desafio' quando veio
+        200 com página de desafio. `html` só vem se a página for utilizável.
+
+        Com cache, o GET é condicional: 304 (NAO_MODIFICADO) quer dizer que a
+        página não mudou desde a última coleta. O validador de uma página
+        utilizável, (headers, conteudo), não é guardado aqui: quem chamou faz
+        cache.guardar depois que o imóvel estiver gravado no banco
+        (ImovelDB.guardar_validador); se a extração falhar, cache.esquecer(url).
+        """
+        headers = self.cache.cabecalhos(url) if self.cache else None
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+        except requests.exceptions.Timeout:
+            return 'timeout', None, None
+        except Exception:
+            return 'erro', None, None
+        if self.cache and self.cache.resposta(url, response.status_code, response.headers):
+            return NAO_MODIFICADO, None, None
+        if response.status_code != 200:
+            return response.status_code, None, None
+        html = response.text
+        if is_challenge_page(html):
+            return 'desafio', None, None
+        if not pagina_utilizavel(html):
+            return 200, None, None
+        return 200, html, (response.headers, response.content)
+
+    def close(self):
+        self.session.close()
+
+
+# Respostas que indicam que o site está limitando a taxa (e não só "página sem dados")
+STATUS_BLOQUEIO = (403, 429, 'timeout', 'desafio')
@@ -73,6 +73,9 @@ def integrar_busca_ampla_para_db():
         links_adicionados += 1
         dominios[domain] = dominios.get(domain, 0) + 1
     
+    # Grava o lote pendente antes de o scraper começar a ler a fila
+    db.close()
+    
     print(f"\n✅ {links_adicionados} links adicionados ao banco:")
     for dom, count in dominios.items():
         print(f"   {dom}: {count}")
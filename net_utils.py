@@ -2,6 +2,7 @@
 """
 Network utilities: load proxy list and user-agent list, and helper to configure Chrome options.
 """
+import json
 import random
 from pathlib import Path
 
@@ -36,8 +37,11 @@ def pick_random(seq):
     return random.choice(seq)
 
 
-def configure_chrome_options(options, proxy=None, user_agent=None, headless=False):
+def configure_chrome_options(options, proxy=None, user_agent=None, headless=False, log_rede=False,
+                             user_data_dir=None):
     # options is undetected_chromedriver.ChromeOptions
+    # log_rede=True liga o log de performance (eventos CDP Network.*), lido por bloqueio_recursos
+    # user_data_dir: pasta de perfil persistente (perfis.GerenciadorPerfis); sem ela o Chrome usa um perfil temporário
     if headless:
         try:
             options.add_argument('--headless=new')
@@ -51,4 +55,65 @@ def configure_chrome_options(options, proxy=None, user_agent=None, headless=Fals
         options.add_argument(f'--user-agent={user_agent}')
     if proxy:
         options.add_argument(f'--proxy-server={proxy}')
+    if user_data_dir:
+        options.add_argument(f'--user-data-dir={user_data_dir}')
+    if log_rede:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
     return options
+
+
+# Strings que indicam página de desafio (CAPTCHA / anti-bot) em vez do conteúdo
+CHALLENGE_MARKERS = (
+    'One last step',
+    'Please solve the challenge',
+    'Verifying',
+    'Just a moment...',
+    # Só o interstitial; o script jsd (/cdn-cgi/challenge-platform/scripts/) vem em páginas normais
+    '/cdn-cgi/challenge-platform/h/',
+    'captcha-delivery.com',
+)
+
+
+def is_challenge_page(html):
+    if not html:
+        return False
+    return any(m in html for m in CHALLENGE_MARKERS)
+
+
+def requests_proxies(proxy):
+    # Converte uma linha do arquivo de proxies para o formato do requests
+    if not proxy:
+        return None
+    if '://' not in proxy:
+        proxy = f'http://{proxy}'
+    return {'http': proxy, 'https': proxy}
+
+
+# Buffer do domínio Network do CDP: corpos de resposta ficam disponíveis para Network.getResponseBody
+CDP_MAX_RESOURCE_BUFFER = 20 * 1024 * 1024
+CDP_MAX_TOTAL_BUFFER = 100 * 1024 * 1024
+
+
+def enable_cdp_network(driver):
+    driver.execute_cdp_cmd('Network.enable', {
+        'maxTotalBufferSize': CDP_MAX_TOTAL_BUFFER,
+        'maxResourceBufferSize': CDP_MAX_RESOURCE_BUFFER,
+    })
+
+
+def read_network_events(driver):
+    """Esvazia o log de performance do driver e devolve os eventos Network.* como (método, params).
+    Driver criado sem configure_chrome_options(..., log_rede=True) devolve lista vazia."""
+    try:
+        entradas = driver.get_log('performance')
+    except Exception:
+        return []
+    eventos = []
+    for entrada in entradas:
+        try:
+            msg = json.loads(entrada['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        if msg.get('method', '').startswith('Network.'):
+            eventos.append((msg['method'], msg.get('params', {})))
+    return eventos
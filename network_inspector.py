@@ -14,6 +14,8 @@ import json
 from pathlib import Path
 from urllib.parse import urlparse
 import undetected_chromedriver as uc
+import perfis
+from net_utils import is_challenge_page
 
 OUTPUT = Path(__file__).parent / 'output'
 OUTPUT.mkdir(exist_ok=True)
@@ -67,13 +69,25 @@ def scroll_and_wait(driver, scrolls=6, pause=1.0):
         time.sleep(pause)
 
 
-def run_inspector(url, scrolls=6, wait=3, headful=True):
+def run_inspector(url, scrolls=6, wait=3, headful=True, usar_perfil=True):
+    # Perfil persistente: cookies de desafio já resolvido e cache quente entre inspeções
+    gerenciador = perfis.gerenciador('inspector') if usar_perfil else None
+    perfil = gerenciador.adquirir() if gerenciador else None
     options = uc.ChromeOptions()
     if not headful:
         options.add_argument('--headless=new')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
-    driver = uc.Chrome(options=options)
+    if perfil:
+        options.add_argument(f'--user-data-dir={perfil.pasta}')
+    try:
+        driver = uc.Chrome(options=options)
+    except Exception:
+        if gerenciador:
+            gerenciador.devolver(perfil)
+        raise
+    if gerenciador:
+        gerenciador.vincular(driver, perfil)
 
     # Add script to run on new document
     try:
@@ -99,6 +113,12 @@ def run_inspector(url, scrolls=6, wait=3, headful=True):
     except Exception:
         captured = []
 
+    if gerenciador:
+        try:
+            gerenciador.registrar(driver, is_challenge_page(driver.page_source))
+        except Exception:
+            pass
+        gerenciador.liberar(driver)
     driver.quit()
 
     # Save
@@ -118,6 +138,7 @@ if __name__ == '__main__':
     parser.add_argument('--scrolls', type=int, default=6, help='Number of scrolls to trigger XHRs')
     parser.add_argument('--wait', type=int, default=3, help='Seconds to wait after scrolls')
     parser.add_argument('--headful', action='store_true', help='Run with visible browser')
+    parser.add_argument('--sem-perfil', action='store_true', help='Use a throwaway Chrome profile (perfis.py)')
     args = parser.parse_args()
 
-    run_inspector(args.url, scrolls=args.scrolls, wait=args.wait, headful=args.headful)
+    run_inspector(args.url, scrolls=args.scrolls, wait=args.wait, headful=args.headful, usar_perfil=not args.sem_perfil)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Colunas numéricas tipadas em `imoveis`, preenchidas na escrita.
+
+preco, metragem, quartos e banheiros ficam como texto de exibição
+("R$ 350.000,00", "85 m²", "2 Q"). Para filtro por faixa e agregação sem
+CAST/REPLACE linha a linha, ImovelDB.add_imovel grava também:
+
+    preco_centavos INTEGER   'R$ 350.000,00' -> 35000000
+    area_m2        INTEGER   '85,5 m²' -> 86
+    n_quartos      INTEGER   '2 Q' -> 2
+    n_banheiros    INTEGER   '1 B' -> 1
+    uf             TEXT      'São Paulo' / 'sp' -> 'SP'
+    cep8           TEXT      '01310-100' -> '01310100'
+
+Linhas antigas (ou gravadas por outro caminho) são preenchidas pelo
+backfill, em lotes por rowid. NORMALIZACAO_VERSAO marca com que versão dos
+parsers cada linha foi normalizada: mudou um parser, sobe a versão e o
+backfill refaz só o que ficou para trás.
+
+Uso:
+    python normalizacao.py backfill
+    python normalizacao.py backfill --lote 20000 --todas
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+import unicodedata
+
+NORMALIZACAO_VERSAO = 1
+BACKFILL_CHUNK = 5000  # linhas por transação no backfill
+AREA_MAX_M2 = 1_000_000  # acima disso é erro de extração (ex.: preço lido como área)
+CONTAGEM_MAX = 50  # idem para quartos/banheiros
+
+# Colunas tipadas, na ordem do retorno de normalizar()
+COLUNAS = ('preco_centavos', 'area_m2', 'n_quartos', 'n_banheiros', 'uf', 'cep8')
+
+UFS = {
+    'acre': 'AC', 'alagoas': 'AL', 'amapa': 'AP', 'amazonas': 'AM', 'bahia': 'BA', 'ceara': 'CE',
+    'distrito federal': 'DF', 'espirito santo': 'ES', 'goias': 'GO', 'maranhao': 'MA',
+    'mato grosso': 'MT', 'mato grosso do sul': 'MS', 'minas gerais': 'MG', 'para': 'PA',
+    'paraiba': 'PB', 'parana': 'PR', 'pernambuco': 'PE', 'piaui': 'PI', 'rio de janeiro': 'RJ',
+    'rio grande do norte': 'RN', 'rio grande do sul': 'RS', 'rondonia': 'RO', 'roraima': 'RR',
+    'santa catarina': 'SC', 'sao paulo': 'SP', 'sergipe': 'SE', 'tocantins': 'TO',
+}
+SIGLAS = set(UFS.values())
+
+
+def _sem_acento(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower().strip()
+
+
+def preco_centavos(preco):
+    """'R$ 350.000' -> 35000000; '1.234,56' -> 123456; 350000.0 -> 35000000; sem número -> None."""
+    if preco is None:
+        return None
+    if isinstance(preco, (int, float)):
+        return int(round(preco * 100))
+    m = re.search(r'\d[\d.,]*', str(preco))
+    if not m:
+        return None
+    numero = m.group(0).rstrip('.,')
+    # Separador seguido de 1-2 dígitos no fim é decimal; o resto é milhar
+    decimal = re.fullmatch(r'(.*\d)[.,](\d{1,2})', numero)
+    inteiro, centavos = decimal.groups() if decimal else (numero, '')
+    return int(re.sub(r'\D', '', inteiro)) * 100 + int(centavos.ljust(2, '0') or 0)
+
+
+def area_m2(metragem):
+    """'85 m²' -> 85; '85,5 m²' -> 86; '1.200 m²' -> 1200."""
+    centavos = preco_centavos(metragem)
+    if centavos is None:
+        return None
+    area = int(round(centavos / 100))
+    return area if 0 < area <= AREA_MAX_M2 else None
+
+
+def contagem(valor):
+    """Primeiro inteiro do texto: '2 Q' -> 2, '3 quartos' -> 3."""
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        n = int(valor)
+    else:
+        m = re.search(r'\d+', str(valor))
+        if not m:
+            return None
+        n = int(m.group(0))
+    return n if 0 <= n <= CONTAGEM_MAX else None
+
+
+def uf(estado):
+    """'SP', 'sp', 'São Paulo', 'Sao Paulo - SP' -> 'SP'; desconhecido -> None."""
+    if not estado:
+        return None
+    texto = _sem_acento(str(estado))
+    if texto.upper() in SIGLAS:
+        return texto.upper()
+    if texto in UFS:
+        return UFS[texto]
+    # "Curitiba - PR", "Paraná (PR)": só sigla em maiúsculas ("se", "to", "pa" são palavras)
+    siglas = [s for s in re.findall(r'\b[A-Z]{2}\b', str(estado)) if s in SIGLAS]
+    return siglas[-1] if siglas else None
+
+
+def cep8(cep):
+    """'01310-100' -> '01310100'; 1310100 (zero à esquerda perdido) -> '01310100'."""
+    if cep is None:
+        return None
+    digitos = re.sub(r'\D', '', str(cep))
+    if len(digitos) == 7:
+        digitos = '0' + digitos
+    return digitos if len(digitos) == 8 else None
+
+
+def normalizar(preco=None, metragem=None, quartos=None, banheiros=None, estado=None, cep=None):
+    """Valores das COLUNAS tipadas a partir dos campos de texto."""
+    return (preco_centavos(preco), area_m2(metragem), contagem(quartos), contagem(banheiros),
+            uf(estado), cep8(cep))
+
+
+def backfill(db_path, lote=BACKFILL_CHUNK, todas=False):
+    """
+    Preenche as colunas tipadas das linhas com versão de normalização
+    antiga (ou de todas), em transações de `lote` linhas percorridas por
+    rowid. Pode ser interrompido e rodado de novo. Retorna quantas linhas.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    filtro = "" if todas else "AND (norm_versao IS NULL OR norm_versao < ?)"
+    params = () if todas else (NORMALIZACAO_VERSAO,)
+    atualizadas = 0
+    ultimo = 0
+    inicio = time.monotonic()
+    try:
+        while True:
+            rows = conn.execute(f"""
+                SELECT rowid, preco, metragem, quartos, banheiros, estado, cep FROM imoveis
+                WHERE rowid > ? {filtro} ORDER BY rowid LIMIT ?
+            """, (ultimo, *params, lote)).fetchall()
+            if not rows:
+                break
+            ultimo = rows[-1][0]
+            with conn:
+                conn.executemany(f"""
+                    UPDATE imoveis SET {', '.join(f'{c} = ?' for c in COLUNAS)}, norm_versao = ?
+                    WHERE rowid = ?
+                """, [(*normalizar(*row[1:]), NORMALIZACAO_VERSAO, row[0]) for row in rows])
+            atualizadas += len(rows)
+            print(f"   {atualizadas} linha(s) normalizada(s) ({atualizadas / (time.monotonic() - inicio):.0f}/s)")
+    finally:
+        conn.close()
+    return atualizadas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Colunas tipadas de imoveis (preco_centavos, area_m2, ...)')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    bf = sub.add_parser('backfill', help='Normalizar linhas existentes em lotes')
+    bf.add_argument('--lote', type=int, default=BACKFILL_CHUNK, help=f'Linhas por transação (padrão: {BACKFILL_CHUNK})')
+    bf.add_argument('--todas', action='store_true', help='Refazer também as linhas já na versão atual')
+    args = parser.parse_args()
+
+    # Import tardio: ImovelDB usa normalizar() deste módulo (e cria as colunas)
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB()
+    db.flush()
+    n = backfill(db.db_path, lote=args.lote, todas=args.todas)
+    print(f"✅ {n} linha(s) de imoveis com colunas tipadas (versão {NORMALIZACAO_VERSAO})")
+    db.close()
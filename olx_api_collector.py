@@ -13,6 +13,7 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent))
 from scraper_escalavel import ImovelDB
+from cache_http import CacheHTTP, NAO_MODIFICADO
 
 
 def load_capture(capture_path):
@@ -139,13 +140,24 @@ def extract_ad_urls_from_obj(obj, depth=0, max_depth=10):
     return list(set(urls))  # Remove duplicates
 
 
-def fetch_json_from_url(url, headers=None, timeout=10):
-    """Fetch and parse JSON from URL. Returns (json_obj, response_obj) or (None, None)."""
+def fetch_json_from_url(url, headers=None, timeout=10, cache=None):
+    """
+    Fetch and parse JSON from URL. Returns (json_obj, response_obj) or (None, None).
+    With a CacheHTTP the GET is conditional: on 304 the JSON comes from the
+    cached body (needed for pagination) and response_obj.status_code is 304.
+    """
     try:
+        if cache:
+            headers = dict(headers or {}, **cache.cabecalhos(url))
         r = requests.get(url, headers=headers, timeout=timeout)
+        if cache and cache.resposta(url, r.status_code, r.headers):
+            corpo = cache.corpo(url)
+            return (json.loads(corpo) if corpo else None), r
         if r.status_code == 200:
             try:
                 obj = r.json()
+                if cache:
+                    cache.guardar(url, r.headers, r.content, corpo=True)
                 return obj, r
             except Exception:
                 return None, r
@@ -182,6 +194,7 @@ def main():
     parser.add_argument('--max-pages', type=int, default=5, help='Max pages for pagination')
     parser.add_argument('--preview', type=int, default=10, help='Preview first N URLs')
     parser.add_argument('--delay', type=float, default=1.0, help='Delay between requests (seconds)')
+    parser.add_argument('--no-cache', action='store_true', help='Always download full pages (no conditional GET)')
     args = parser.parse_args()
 
     if not args.capture and not args.api:
@@ -189,6 +202,7 @@ def main():
         return
 
     db = ImovelDB()
+    cache = None if args.no_cache else CacheHTTP()
     discovered = []
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
 
@@ -237,11 +251,15 @@ def main():
         
         while pages < args.max_pages:
             pages += 1
-            obj, resp = fetch_json_from_url(current_url, headers=headers)
+            obj, resp = fetch_json_from_url(current_url, headers=headers, cache=cache)
             if obj is None:
                 break
             
-            urls = extract_ad_urls_from_obj(obj)
+            # 304: page unchanged since the last run, its ads are already in the DB
+            unchanged = resp.status_code == NAO_MODIFICADO
+            if unchanged:
+                print(f'  = Page {pages} unchanged (304)')
+            urls = [] if unchanged else extract_ad_urls_from_obj(obj)
             new_count = sum(1 for ad in urls if ad not in discovered)
             
             for ad in urls:
@@ -253,7 +271,7 @@ def main():
                         except Exception:
                             pass
             
-            if new_count == 0:
+            if new_count == 0 and not unchanged:
                 break
             
             token = find_pagination_token(obj, resp)
@@ -269,6 +287,9 @@ def main():
             time.sleep(args.delay)
 
     print(f'\n✅ Total discovered: {len(discovered)} unique ad URLs')
+    if cache:
+        for line in cache.stats.resumo():
+            print(f'♻️  {line}')
     
     if args.preview and discovered:
         preview_count = min(args.preview, len(discovered))
@@ -277,6 +298,7 @@ def main():
             print(f'  - {url}')
     
     if args.insert_db:
+        db.close()
         print(f'\n✓ Inserted {len(discovered)} links into DB (imoveis.db)')
         print('Next: run extract_from_capture.py to extract full property details to DB')
 
@@ -26,15 +26,21 @@ import json as _json
 import re as _re
 
 # Import ImovelDB from existing module
-from scraper_escalavel import ImovelDB
-from net_utils import load_proxies, load_user_agents, pick_random, configure_chrome_options
+from scraper_escalavel import ImovelDB, gravar_imovel
+from net_utils import load_proxies, load_user_agents, pick_random, configure_chrome_options, read_network_events
+from prontidao import Prontidao
+from bloqueio_recursos import BloqueioRecursos
+from captura_api import CapturaAPI
 
 
-def scroll_page(driver, pause=1.0, scrolls=6):
-    """Scroll page to load lazy content."""
+def scroll_page(driver, pause=1.0, scrolls=6, prontidao=None):
+    """Scroll page to load lazy content (waits up to `pause` for the network to go idle)."""
     for _ in range(scrolls):
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(pause)
+        if prontidao:
+            prontidao.aguardar_rede(driver, driver.current_url, espera_fixa=pause)
+        else:
+            time.sleep(pause)
 
 
 def extract_links_from_listing(html, base_url):
@@ -193,12 +199,15 @@ def parse_ad_page(html, url):
 
 def run_scraper(start_url, max_pages=5, headless=True, delay=1.0, max_ads=None, proxy_file=None, ua_file=None):
     db = ImovelDB()
+    prontidao = Prontidao()
+    bloqueio = BloqueioRecursos()
+    captura = CapturaAPI()
     options = uc.ChromeOptions()
     proxies = load_proxies(proxy_file)
     uas = load_user_agents(ua_file)
     proxy = pick_random(proxies)
     ua = pick_random(uas)
-    configure_chrome_options(options, proxy=proxy, user_agent=ua, headless=headless)
+    configure_chrome_options(options, proxy=proxy, user_agent=ua, headless=headless, log_rede=True)
     try:
         driver = uc.Chrome(options=options)
     except TypeError:
@@ -220,10 +229,20 @@ def run_scraper(start_url, max_pages=5, headless=True, delay=1.0, max_ads=None,
 
         print(f"[listing] Loading page {page}: {page_url}")
         try:
+            captura.preparar(driver)
+            bloqueio.aplicar(driver, page_url)
             driver.get(page_url)
-            time.sleep(delay)
-            scroll_page(driver, pause=0.8, scrolls=4)
+            prontidao.aguardar(driver, page_url, espera_fixa=delay)
+            scroll_page(driver, pause=0.8, scrolls=4, prontidao=prontidao)
             html = driver.page_source
+            eventos = read_network_events(driver)
+            bloqueio.contabilizar(page_url, eventos)
+            # Anúncios que vieram estruturados na API da listagem entram direto no banco
+            anuncios = captura.anuncios(page_url, captura.respostas(driver, page_url, eventos))
+            for dados in anuncios:
+                gravar_imovel(db, dados['link'], dados)
+            if anuncios:
+                print(f"  {len(anuncios)} ads captured from listing API")
         except Exception as e:
             print(f"Error loading listing page {page_url}: {e}")
             continue
@@ -264,6 +283,12 @@ def run_scraper(start_url, max_pages=5, headless=True, delay=1.0, max_ads=None,
 
     # Optionally process immediately: we'll leave processing to the ScraperEscalavel (external orchestration)
     driver.quit()
+    for linha in prontidao.stats.resumo():
+        print(f"  readiness: {linha}")
+    for linha in bloqueio.stats.resumo():
+        print(f"  blocked: {linha}")
+    for linha in captura.resumo():
+        print(f"  api: {linha}")
     print(f"Done. Inserted {inserted} links into DB (imoveis.links). Use ScraperEscalavel to process them.")
     return len(all_ad_links), inserted
 
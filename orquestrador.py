@@ -3,12 +3,12 @@
 """
 Orquestrador para rodar múltiplas buscas e processar tudo mantendo tudo no DB.
 1. Recebe um arquivo com palavras-chave (uma por linha) ou lista pela CLI
-2. Para cada keyword, usa BroadSearcher (busca_ampla) para coletar links (headful)
-3. Insere links na tabela `links` do DB
-4. Depois de todas as buscas, executa ScraperEscalavel.processar_tudo() para extrair os dados
+2. Espalha a matriz keyword × domínio por N navegadores de busca (AgendadorDescoberta)
+3. Cada SERP concluída já insere os links na tabela `links` do DB
+4. Ao mesmo tempo, ScraperEscalavel.processar_tudo() vai extraindo os links que chegam
 
 Uso:
-    python orquestrador.py --keywords-file keywords.txt --workers 5
+    python orquestrador.py --keywords-file keywords.txt --workers 5 --search-browsers 3
 
 Observação: as buscas são feitas em modo "headful" por padrão (para permitir resolver CAPTCHAs).
 """
@@ -16,8 +16,9 @@ Observação: as buscas são feitas em modo "headful" por padrão (para permitir
 import argparse
 from pathlib import Path
 import sys
-from scraper_escalavel import ImovelDB, ScraperEscalavel
-from busca_ampla import BroadSearcher
+from scraper_escalavel import ScraperEscalavel
+from busca_ampla import TARGET_DOMAINS
+from descoberta import AgendadorDescoberta, SEARCH_BROWSERS, MAX_PENDING_LINKS
 
 
 def load_keywords(file_path):
@@ -31,6 +32,9 @@ def main():
     parser = argparse.ArgumentParser(description='Orquestrador de buscas + processamento')
     parser.add_argument('--keywords-file', '-f', type=str, required=True, help='Arquivo com keywords (uma por linha)')
     parser.add_argument('--workers', '-w', type=int, default=3, help='Workers para processamento')
+    parser.add_argument('--search-browsers', '-s', type=int, default=SEARCH_BROWSERS, help='Navegadores de busca em paralelo')
+    parser.add_argument('--max-pendentes', type=int, default=MAX_PENDING_LINKS,
+                        help='Pausar a busca quando houver mais que isso de links pendentes')
     parser.add_argument('--headless-search', action='store_true', help='Rodar busca em headless (não recomendado)')
     parser.add_argument('--proxy-file', type=str, default=None, help='Arquivo de proxies (opcional)')
     parser.add_argument('--ua-file', type=str, default=None, help='Arquivo de user agents (opcional)')
@@ -41,31 +45,17 @@ def main():
         print('Nenhuma keyword encontrada no arquivo')
         sys.exit(1)
 
-    db = ImovelDB()
-
-    print(f'Iniciando buscas para {len(keywords)} keywords...')
-    buscador = BroadSearcher(headless=not args.headless_search, slow_wait=1)
-    if not buscador.start_driver():
-        print('Erro ao iniciar driver do BroadSearcher')
-        sys.exit(1)
+    scraper = ScraperEscalavel(headless=True, max_workers=args.workers, proxy_file=args.proxy_file, ua_file=args.ua_file)
 
-    try:
-        for kw in keywords:
-            print(f'\n🔍 Buscando: {kw}')
-            for domain in buscador.TARGET_DOMAINS if hasattr(buscador, 'TARGET_DOMAINS') else ['imovelweb.com.br','vivareal.com.br','olx.com.br','zapimoveis.com.br','mercadolivre.com.br']:
-                links = buscador.bing_site_search_browser(kw, domain, limit=20)
-                for link in links:
-                    db.add_link(link, domain, kw)
-                print(f'  ✓ {len(links)} links adicionados de {domain} para {kw}')
-    finally:
-        try:
-            buscador.driver.quit()
-        except:
-            pass
+    print(f'Iniciando buscas para {len(keywords)} keywords em {args.search_browsers} navegador(es)...')
+    agendador = AgendadorDescoberta(scraper.db, keywords, TARGET_DOMAINS, navegadores=args.search_browsers,
+                                    headless=args.headless_search, links_per_domain=20,
+                                    max_pendentes=args.max_pendentes, desafios=scraper.desafios).iniciar()
 
-    print('\n✓ Busca concluída. Iniciando processamento de todos os links no DB...')
-    scraper = ScraperEscalavel(headless=True, max_workers=args.workers, proxy_file=args.proxy_file, ua_file=args.ua_file)
-    scraper.processar_tudo()
+    # O processamento começa já; só termina quando a busca acabou e a fila esvaziou
+    scraper.processar_tudo(enquanto=agendador.ativo)
+    agendador.aguardar()
+    print(f'\n✓ {agendador.feitas}/{agendador.total} buscas, {agendador.links} links descobertos.')
     print('\n✓ Orquestração completa. Use scraper.exportar_csv() ou consolidar.py para gerar CSVs.')
 
 if __name__ == '__main__':
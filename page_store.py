@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armazém de páginas brutas para re-extração sem novo crawl.
+
+Cada página baixada (HTML ou JSON capturado) é guardada inteira em
+`paginas.db`: o conteúdo é deduplicado pelo hash SHA-256 e comprimido com
+zstd (se o pacote `zstandard` estiver instalado) ou zlib. A tabela `fetches`
+registra URL + horário de cada download e aponta para o conteúdo.
+
+Uso:
+    python page_store.py stats
+    python page_store.py reprocess --jobs 16
+    python page_store.py reprocess --dominio olx.com.br --desde 2025-11-01
+"""
+
+import argparse
+import atexit
+import hashlib
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PAGES_DB_PATH = Path(__file__).parent / "paginas.db"
+PAGE_COMMIT_EVERY = 50  # páginas por transação
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def comprimir(dados, compressao):
+    if compressao == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(dados)
+    return zlib.compress(dados, ZLIB_LEVEL)
+
+
+def descomprimir(blob, compressao):
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("página comprimida com zstd: instale o pacote zstandard")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class PageStore:
+    """Páginas brutas comprimidas e deduplicadas por conteúdo, indexadas por URL e data."""
+
+    def __init__(self, db_path=PAGES_DB_PATH, compressao=None):
+        self.db_path = db_path
+        self.compressao = compressao or ('zstd' if zstandard is not None else 'zlib')
+        self.lock = threading.Lock()
+        self._conn = None
+        self._pendentes = 0
+        self._init_schema()
+        atexit.register(self.close)
+
+    def _init_schema(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS conteudos (
+                    hash TEXT PRIMARY KEY,
+                    compressao TEXT NOT NULL,
+                    tamanho INTEGER,
+                    dados BLOB NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fetches (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    tipo TEXT DEFAULT 'html',
+                    fetched_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_fetches_url ON fetches (url, fetched_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_fetches_data ON fetches (fetched_at)")
+            conn.commit()
+
+    def _conexao(self):
+        # Conexão única compartilhada entre threads; o acesso é serializado por self.lock
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def salvar(self, url, conteudo, tipo='html'):
+        """Guarda o conteúdo baixado de `url`. Retorna o hash do conteúdo."""
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode('utf-8')
+        digest = hashlib.sha256(conteudo).hexdigest()
+        # Comprime fora do lock: zlib/zstd liberam o GIL
+        blob = comprimir(conteudo, self.compressao)
+        with self.lock:
+            conn = self._conexao()
+            conn.execute("""
+                INSERT OR IGNORE INTO conteudos (hash, compressao, tamanho, dados)
+                VALUES (?, ?, ?, ?)
+            """, (digest, self.compressao, len(conteudo), blob))
+            conn.execute("""
+                INSERT INTO fetches (url, hash, tipo, fetched_at) VALUES (?, ?, ?, ?)
+            """, (url, digest, tipo, datetime.now().isoformat()))
+            self._pendentes += 1
+            if self._pendentes >= PAGE_COMMIT_EVERY:
+                conn.commit()
+                self._pendentes = 0
+        return digest
+
+    def flush(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._pendentes = 0
+
+    def close(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    def carregar(self, url):
+        """Retorna (conteúdo em texto, tipo, fetched_at) do fetch mais recente de `url`."""
+        self.flush()
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT c.dados, c.compressao, f.tipo, f.fetched_at
+                FROM fetches f JOIN conteudos c ON c.hash = f.hash
+                WHERE f.url = ? ORDER BY f.fetched_at DESC LIMIT 1
+            """, (url,)).fetchone()
+        if not row:
+            return None
+        blob, compressao, tipo, fetched_at = row
+        return descomprimir(blob, compressao).decode('utf-8', errors='replace'), tipo, fetched_at
+
+    def _filtro_ultimas(self, tipo, dominio, desde):
+        where = "f.id IN (SELECT MAX(id) FROM fetches GROUP BY url) AND f.tipo = ?"
+        params = [tipo]
+        if dominio:
+            where += " AND f.url LIKE ?"
+            params.append(f"%{dominio}%")
+        if desde:
+            where += " AND f.fetched_at >= ?"
+            params.append(desde)
+        return where, params
+
+    def contar_ultimas(self, tipo='html', dominio=None, desde=None):
+        """Quantas URLs iter_ultimas vai devolver com os mesmos filtros."""
+        self.flush()
+        where, params = self._filtro_ultimas(tipo, dominio, desde)
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM fetches f WHERE {where}", params).fetchone()[0]
+
+    def iter_ultimas(self, tipo='html', dominio=None, desde=None):
+        """
+        Itera (url, compressao, blob) do fetch mais recente de cada URL.
+        O blob vem comprimido, para ser descomprimido por quem for processar.
+        """
+        self.flush()
+        where, params = self._filtro_ultimas(tipo, dominio, desde)
+        query = f"""
+            SELECT f.url, c.compressao, c.dados
+            FROM fetches f JOIN conteudos c ON c.hash = f.hash
+            WHERE {where}
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield from conn.execute(query, params)
+        finally:
+            conn.close()
+
+    def stats(self):
+        self.flush()
+        with sqlite3.connect(self.db_path) as conn:
+            fetches, urls = conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM fetches").fetchone()
+            conteudos, bruto, comprimido = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(SUM(LENGTH(dados)), 0) FROM conteudos"
+            ).fetchone()
+        return {
+            'fetches': fetches,
+            'urls': urls,
+            'conteudos': conteudos,
+            'bytes_brutos': bruto,
+            'bytes_comprimidos': comprimido,
+        }
+
+
+# ============================================================================
+# REPROCESSAMENTO
+# ============================================================================
+
+def reprocessar(store, jobs=None, extrator='padrao', dominio=None, desde=None):
+    """
+    Roda o extrator sobre a última versão de cada página guardada, em
+    processos separados, e grava os imóveis no imoveis.db.
+    """
+    # Imports tardios: os processos filhos só precisam de descomprimir()
+    from tqdm import tqdm
+    from extracao_paralela import EstagioExtracao
+    from scraper_escalavel import ImovelDB, gravar_imovel
+
+    estagio = EstagioExtracao(jobs=jobs, extrator=extrator)
+    db = ImovelDB()
+    paginas = extraidos = 0
+    barra = tqdm(total=store.contar_ultimas(dominio=dominio, desde=desde), desc="Re-extraindo", unit="pág")
+    try:
+        for n, resultados in estagio.mapear(store.iter_ultimas(dominio=dominio, desde=desde)):
+            # O escritor do ImovelDB agrupa essas inserções em transações de WRITE_BATCH_SIZE
+            for url, dados, raw_text in resultados:
+                gravar_imovel(db, url, dados, raw_text=raw_text)
+            paginas += n
+            extraidos += len(resultados)
+            barra.update(n)
+            barra.set_postfix(imoveis=extraidos)
+    finally:
+        barra.close()
+        estagio.close()
+        db.close()
+    return paginas, extraidos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Armazém de páginas brutas (paginas.db)')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('stats', help='Mostrar tamanho do armazém')
+    rep = sub.add_parser('reprocess', help='Re-extrair imóveis das páginas guardadas')
+    rep.add_argument('-j', '--jobs', type=int, default=None, help='Processos de extração (padrão: nº de CPUs; 0 = sem pool)')
+    rep.add_argument('--extrator', choices=['padrao', 'olx'], default='padrao',
+                     help='padrao = extracao.extrair_dados; olx = olx_deep_scraper.parse_ad_page')
+    rep.add_argument('--dominio', type=str, default=None, help='Só URLs deste domínio')
+    rep.add_argument('--desde', type=str, default=None, help='Só páginas baixadas a partir desta data (ISO)')
+    args = parser.parse_args()
+
+    store = PageStore()
+    if args.comando == 'stats':
+        s = store.stats()
+        print(f"URLs: {s['urls']} ({s['fetches']} fetches)")
+        print(f"Conteúdos únicos: {s['conteudos']}")
+        if s['bytes_comprimidos']:
+            print(f"Tamanho: {s['bytes_brutos'] / 1e6:.1f} MB → {s['bytes_comprimidos'] / 1e6:.1f} MB "
+                  f"({s['bytes_brutos'] / s['bytes_comprimidos']:.1f}x, {store.compressao})")
+    else:
+        inicio = datetime.now()
+        paginas, extraidos = reprocessar(store, jobs=args.jobs, extrator=args.extrator,
+                                         dominio=args.dominio, desde=args.desde)
+        print(f"✅ {extraidos}/{paginas} página(s) com imóvel extraído em {datetime.now() - inicio}")
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfis persistentes do Chrome (user-data-dir) reutilizados entre execuções.
+
+Antes, cada _get_driver / BroadSearcher.start_driver / run_inspector abria o
+Chrome com perfil novo: cache de disco frio, nenhum cookie e todo o
+aquecimento anti-bot de novo. GerenciadorPerfis mantém um pool de pastas em
+PROFILES_DIR/<pool>/<nome>, cada uma presa a um par proxy/UA (sorteado de
+net_utils.load_proxies / load_user_agents quando o perfil nasce), para o
+site ver sempre a mesma "pessoa" naquele perfil.
+
+- adquirir() empresta um perfil livre (ou cria um, até MAX_PROFILES
+  utilizáveis: perfis queimados são apagados e os de um proxy fora da
+  lista atual não contam); o mesmo perfil nunca fica em dois navegadores
+  ao mesmo tempo.
+- vincular(driver, perfil) restaura os cookies de sessão salvos (os
+  persistentes o próprio Chrome guarda na pasta) e liberar(driver) os salva.
+- registrar(driver, desafio) conta páginas e desafios por perfil; um perfil
+  com taxa de desafio acima de PROFILE_MAX_CHALLENGE_RATE (ou
+  PROFILE_MAX_CONSECUTIVE desafios seguidos) é "queimado": ao ser liberado,
+  sua pasta é apagada e ele sai do pool.
+
+O estado (proxy, UA, contadores) fica em perfis.json dentro do pool. Vários
+processos podem dividir o pool: cada gravação trava perfis.json.lock, relê o
+arquivo e só substitui os perfis que este processo usou ou aposentou.
+
+Uso:
+    python perfis.py listar
+    python perfis.py aposentar escalavel p003
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from net_utils import pick_random
+
+PROFILES_DIR = Path(__file__).parent / "perfis_navegador"
+MAX_PROFILES = 12  # perfis por pool
+PROFILE_MIN_PAGES = 10  # páginas antes de julgar a taxa de desafio
+PROFILE_MAX_CHALLENGE_RATE = 0.2  # acima disso o perfil é aposentado
+PROFILE_MAX_CONSECUTIVE = 3  # desafios seguidos que aposentam o perfil
+COOKIES_FILE = "cookies_sessao.json"
+MANIFEST_FILE = "perfis.json"
+MANIFEST_LOCK_STALE = 10  # segundos: trava de perfis.json mais velha que isso é de processo que morreu
+
+# Campos aceitos por Network.setCookies (Network.getAllCookies devolve mais)
+_CAMPOS_COOKIE = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+
+def _chrome_em_uso(pasta):
+    """True se um Chrome (vivo) está com o perfil aberto (SingletonLock aponta para host-pid)."""
+    trava = pasta / 'SingletonLock'
+    if not os.path.lexists(trava):
+        return False
+    try:
+        pid = int(os.readlink(trava).rsplit('-', 1)[1])
+        os.kill(pid, 0)
+    except (OSError, ValueError, IndexError):
+        # Trava velha de um Chrome que morreu: o próximo Chrome a descarta
+        return False
+    return True
+
+
+class Perfil:
+    def __init__(self, nome, pasta, proxy=None, user_agent=None, paginas=0, desafios=0,
+                 seguidos=0, criado=None, ultimo_uso=None):
+        self.nome = nome
+        self.pasta = pasta
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.paginas = paginas
+        self.desafios = desafios
+        self.seguidos = seguidos
+        self.criado = criado or time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.ultimo_uso = ultimo_uso
+
+    def taxa_desafio(self):
+        return self.desafios / self.paginas if self.paginas else 0.0
+
+    def queimado(self):
+        if self.seguidos >= PROFILE_MAX_CONSECUTIVE:
+            return True
+        return self.paginas >= PROFILE_MIN_PAGES and self.taxa_desafio() > PROFILE_MAX_CHALLENGE_RATE
+
+    def para_json(self):
+        return {
+            'proxy': self.proxy, 'user_agent': self.user_agent,
+            'paginas': self.paginas, 'desafios': self.desafios, 'seguidos': self.seguidos,
+            'criado': self.criado, 'ultimo_uso': self.ultimo_uso,
+        }
+
+
+class GerenciadorPerfis:
+    """Pool de perfis de um tipo de navegador (ex.: 'escalavel', 'busca'). Thread-safe."""
+
+    def __init__(self, pool, proxies=None, user_agents=None, max_perfis=MAX_PROFILES, diretorio=PROFILES_DIR):
+        self.pool = pool
+        self.pasta = Path(diretorio) / pool
+        self.proxies = list(proxies or [])
+        self.user_agents = list(user_agents or [])
+        self.max_perfis = max_perfis
+        self.lock = threading.Lock()
+        self.perfis = {}  # nome -> Perfil
+        self._em_uso = set()
+        self._alterados = set()  # perfis que este processo emprestou ou aposentou desde a última gravação
+        self._por_driver = {}  # id(driver) -> Perfil
+        self.quentes = 0  # empréstimos de perfil já existente
+        self.novos = 0
+        self.aposentados = 0
+        self._carregar()
+
+    def configurar(self, proxies=None, user_agents=None):
+        """Atualiza as listas usadas para perfis novos (perfis existentes mantêm seu par)."""
+        with self.lock:
+            if proxies:
+                self.proxies = list(proxies)
+            if user_agents:
+                self.user_agents = list(user_agents)
+
+    # ------------------------------------------------------------------
+    # Manifesto
+    # ------------------------------------------------------------------
+
+    def _ler_manifesto(self):
+        """Perfis de perfis.json cuja pasta ainda existe: {nome: dados}."""
+        manifesto = self.pasta / MANIFEST_FILE
+        if not manifesto.exists():
+            return {}
+        try:
+            dados = json.loads(manifesto.read_text(encoding='utf-8'))
+        except ValueError:
+            print(f"⚠️  {manifesto} ilegível; perfis do pool {self.pool} recomeçam do zero")
+            return {}
+        return {nome: d for nome, d in dados.items() if (self.pasta / nome).is_dir()}
+
+    def _carregar(self):
+        for nome, d in self._ler_manifesto().items():
+            self.perfis[nome] = Perfil(nome, self.pasta / nome, **d)
+        # Queimados de execuções anteriores saem já (a menos que outro processo esteja com o Chrome aberto)
+        with self.lock:
+            queimados = [p for p in self.perfis.values() if p.queimado() and not _chrome_em_uso(p.pasta)]
+            for perfil in queimados:
+                self._aposentar(perfil)
+            if queimados:
+                self._salvar_manifesto()
+
+    def _travar_manifesto(self):
+        """Trava entre processos (arquivo criado com O_EXCL). Retorna o caminho para liberar."""
+        trava = self.pasta / (MANIFEST_FILE + '.lock')
+        while True:
+            try:
+                os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return trava
+            except FileExistsError:
+                try:
+                    if time.time() - trava.stat().st_mtime > MANIFEST_LOCK_STALE:
+                        trava.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(0.05)
+
+    def _salvar_manifesto(self):
+        # Chamar com self.lock. Mescla com o que outros processos gravaram no mesmo pool.
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        trava = self._travar_manifesto()
+        try:
+            dados = self._ler_manifesto()
+            for nome in self._alterados:
+                if nome in self.perfis:
+                    dados[nome] = self.perfis[nome].para_json()
+                else:
+                    dados.pop(nome, None)
+            tmp = self.pasta / (MANIFEST_FILE + f'.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps(dict(sorted(dados.items())), ensure_ascii=False, indent=2), encoding='utf-8')
+            os.replace(tmp, self.pasta / MANIFEST_FILE)
+        finally:
+            trava.unlink()
+        # Perfis fora de uso passam a refletir o arquivo (criados, usados ou aposentados por outros)
+        self._alterados &= self._em_uso
+        for nome in [n for n in self.perfis if n not in dados and n not in self._em_uso]:
+            del self.perfis[nome]
+        for nome, d in dados.items():
+            if nome not in self._em_uso:
+                self.perfis[nome] = Perfil(nome, self.pasta / nome, **d)
+
+    # ------------------------------------------------------------------
+    # Empréstimo
+    # ------------------------------------------------------------------
+
+    def _serve(self, perfil):
+        # O perfil só serve com o proxy dele: fora da lista atual (ou rodando sem proxy), fica parado
+        return perfil.proxy in self.proxies if self.proxies else perfil.proxy is None
+
+    def adquirir(self):
+        """Empresta um perfil livre (o menos desafiado) ou cria um novo. None se o pool está cheio."""
+        with self.lock:
+            # Queimado que ninguém está usando sai do pool em vez de ocupar vaga para sempre
+            queimados = [p for n, p in self.perfis.items()
+                         if n not in self._em_uso and p.queimado() and not _chrome_em_uso(p.pasta)]
+            for perfil in queimados:
+                self._aposentar(perfil)
+            # Perfis de outro proxy continuam no disco, mas não contam para max_perfis
+            utilizaveis = [p for p in self.perfis.values() if not p.queimado() and self._serve(p)]
+            livres = [p for p in utilizaveis if p.nome not in self._em_uso and not _chrome_em_uso(p.pasta)]
+            if livres:
+                perfil = min(livres, key=lambda p: (p.taxa_desafio(), p.ultimo_uso or ''))
+                self.quentes += 1
+            elif len(utilizaveis) < self.max_perfis:
+                perfil = self._novo_perfil()
+                self.novos += 1
+            else:
+                if queimados:
+                    self._salvar_manifesto()
+                return None
+            self._em_uso.add(perfil.nome)
+            self._alterados.add(perfil.nome)
+            perfil.ultimo_uso = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self._salvar_manifesto()
+            return perfil
+
+    def _novo_perfil(self):
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        i = 1
+        while True:
+            nome = f"p{i:03d}"
+            pasta = self.pasta / nome
+            if nome not in self.perfis:
+                try:
+                    # Sem exist_ok: outro processo criando o mesmo nome faz este tentar o próximo
+                    pasta.mkdir()
+                    break
+                except FileExistsError:
+                    pass
+            i += 1
+        perfil = Perfil(nome, pasta, proxy=pick_random(self.proxies), user_agent=pick_random(self.user_agents))
+        self.perfis[nome] = perfil
+        return perfil
+
+    def devolver(self, perfil):
+        """Devolve um perfil emprestado cujo navegador nem chegou a abrir."""
+        if perfil is None:
+            return
+        with self.lock:
+            self._em_uso.discard(perfil.nome)
+
+    def vincular(self, driver, perfil):
+        """Associa o driver ao perfil e restaura os cookies de sessão salvos."""
+        if perfil is None:
+            return
+        with self.lock:
+            self._por_driver[id(driver)] = perfil
+        arquivo = perfil.pasta / COOKIES_FILE
+        if not arquivo.exists():
+            return
+        try:
+            cookies = json.loads(arquivo.read_text(encoding='utf-8'))
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        except Exception as e:
+            print(f"⚠️  Cookies do perfil {perfil.nome} não restaurados: {e}")
+
+    def perfil_de(self, driver):
+        with self.lock:
+            return self._por_driver.get(id(driver))
+
+    def registrar(self, driver, desafio):
+        """Conta uma página carregada pelo driver (desafio=True se caiu em CAPTCHA)."""
+        with self.lock:
+            perfil = self._por_driver.get(id(driver))
+            if perfil is None:
+                return
+            perfil.paginas += 1
+            if desafio:
+                perfil.desafios += 1
+                perfil.seguidos += 1
+            else:
+                perfil.seguidos = 0
+
+    def queimado(self, driver):
+        perfil = self.perfil_de(driver)
+        return perfil is not None and perfil.queimado()
+
+    def liberar(self, driver):
+        """
+        Chamar antes de driver.quit(): salva os cookies de sessão e devolve o
+        perfil ao pool (ou o aposenta, se queimado).
+        """
+        with self.lock:
+            perfil = self._por_driver.pop(id(driver), None)
+        if perfil is None:
+            return
+        if not perfil.queimado():
+            self._salvar_cookies(driver, perfil)
+        with self.lock:
+            self._em_uso.discard(perfil.nome)
+            if perfil.queimado():
+                self._aposentar(perfil)
+            self._salvar_manifesto()
+
+    def _salvar_cookies(self, driver, perfil):
+        # Cookies persistentes já ficam no perfil; os de sessão o Chrome descarta ao fechar
+        try:
+            cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        except Exception:
+            return
+        sessao = [{k: c[k] for k in _CAMPOS_COOKIE if k in c and (k != 'expires' or c[k] > 0)}
+                  for c in cookies if c.get('session')]
+        try:
+            (perfil.pasta / COOKIES_FILE).write_text(json.dumps(sessao, ensure_ascii=False), encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️  Cookies do perfil {perfil.nome} não salvos: {e}")
+
+    def _aposentar(self, perfil):
+        # Chamar com self.lock
+        print(f"🔥 Perfil {self.pool}/{perfil.nome} aposentado: {perfil.desafios}/{perfil.paginas} "
+              f"página(s) com desafio (proxy {perfil.proxy or '-'})")
+        self.perfis.pop(perfil.nome, None)
+        self._alterados.add(perfil.nome)
+        shutil.rmtree(perfil.pasta, ignore_errors=True)
+        self.aposentados += 1
+
+    def aposentar(self, nome):
+        """Apaga um perfil que não está em uso. Retorna True se existia."""
+        with self.lock:
+            perfil = self.perfis.get(nome)
+            if perfil is None or nome in self._em_uso:
+                return False
+            self._aposentar(perfil)
+            self._salvar_manifesto()
+            return True
+
+    def resumo(self):
+        with self.lock:
+            paginas = sum(p.paginas for p in self.perfis.values())
+            desafios = sum(p.desafios for p in self.perfis.values())
+            linhas = [f"{self.pool}: {len(self.perfis)} perfil(is), {self.quentes} reaproveitado(s), "
+                      f"{self.novos} novo(s), {self.aposentados} aposentado(s)"]
+            if paginas:
+                linhas.append(f"{self.pool}: {desafios}/{paginas} página(s) com desafio "
+                              f"({desafios / paginas:.1%}) nos perfis ativos")
+            return linhas
+
+
+_gerenciadores = {}
+_gerenciadores_lock = threading.Lock()
+
+
+def gerenciador(pool, proxies=None, user_agents=None):
+    """GerenciadorPerfis compartilhado do pool (um por processo, para dois navegadores não pegarem o mesmo perfil)."""
+    with _gerenciadores_lock:
+        g = _gerenciadores.get(pool)
+        if g is None:
+            g = _gerenciadores[pool] = GerenciadorPerfis(pool, proxies, user_agents)
+        else:
+            g.configurar(proxies, user_agents)
+        return g
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perfis persistentes do Chrome')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('listar', help='Mostrar perfis e taxa de desafio')
+    apo = sub.add_parser('aposentar', help='Apagar um perfil')
+    apo.add_argument('pool', help='Pool (escalavel, busca, inspector)')
+    apo.add_argument('nome', help='Nome do perfil (ex.: p003)')
+    args = parser.parse_args()
+
+    if args.comando == 'listar':
+        pools = sorted(p.name for p in PROFILES_DIR.iterdir() if p.is_dir()) if PROFILES_DIR.exists() else []
+        if not pools:
+            print("Nenhum perfil salvo")
+        for pool in pools:
+            g = gerenciador(pool)
+            print(f"\n{pool}:")
+            for nome, p in sorted(g.perfis.items()):
+                print(f"  {nome}  {p.paginas:6d} pág  {p.taxa_desafio():6.1%} desafio  "
+                      f"proxy={p.proxy or '-'}  último uso {p.ultimo_uso or '-'}")
+    else:
+        if gerenciador(args.pool).aposentar(args.nome):
+            print(f"✅ Perfil {args.pool}/{args.nome} apagado")
+        else:
+            print(f"❌ Perfil {args.pool}/{args.nome} não encontrado (ou em uso)")
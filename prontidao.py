@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Espera por eventos no lugar de time.sleep fixo nos navegadores.
+
+Depois do driver.get(), em vez de dormir um tempo fixo, Prontidao.aguardar
+consulta a página a cada POLL_INTERVAL e retorna assim que uma das condições
+do domínio vale:
+
+- 'jsonld': já existe um <script type="application/ld+json">;
+- seletores CSS (ex.: o preço do anúncio) já apareceram;
+- 'rede_ociosa': documento carregado e nenhum recurso terminou de baixar
+  nos últimos NETWORK_IDLE_MS desde o início da espera (via Resource
+  Timing, sem CDP).
+
+Toda espera tem timeout. O tempo gasto é comparado com o sleep fixo que a
+espera substituiu, e a economia acumulada por domínio sai em resumo().
+"""
+
+import threading
+import time
+
+from cortesia import host_da_url
+
+READINESS_TIMEOUT = 6.0  # segundos máximos esperando a página
+NETWORK_IDLE_MS = 500  # rede parada por tanto tempo = página pronta
+POLL_INTERVAL = 0.1
+
+# Condições por domínio (basta uma). Domínios fora da lista usam PADRAO.
+CONDICOES_POR_DOMINIO = {
+    'olx.com.br': {'jsonld': True, 'seletores': ['[data-testid="ad-price-wrapper"]', '#price_value'], 'rede_ociosa': True},
+    'vivareal.com.br': {'jsonld': True, 'seletores': ['[data-testid="price-info-value"]'], 'rede_ociosa': True},
+    'zapimoveis.com.br': {'jsonld': True, 'seletores': ['[data-testid="price-info-value"]'], 'rede_ociosa': True},
+    'imovelweb.com.br': {'jsonld': True, 'seletores': ['[data-qa="POSTING_CARD_PRICE"]', '.price-value'], 'rede_ociosa': True},
+    'mercadolivre.com.br': {'jsonld': True, 'seletores': ['.andes-money-amount__fraction'], 'rede_ociosa': True},
+    'bing.com': {'jsonld': False, 'seletores': ['li.b_algo h2 a', '#b_results'], 'rede_ociosa': False},
+}
+PADRAO = {'jsonld': True, 'seletores': [], 'rede_ociosa': True}
+SO_REDE = {'jsonld': False, 'seletores': [], 'rede_ociosa': True}
+
+# Retorna o nome da condição satisfeita, ou null
+_JS_PRONTA = """
+var c = arguments[0], idleMs = arguments[1];
+if (arguments[2]) window.__prontidaoDesde = performance.now();
+if (c.jsonld && document.querySelector('script[type="application/ld+json"]')) return 'jsonld';
+for (var i = 0; i < c.seletores.length; i++) {
+    if (document.querySelector(c.seletores[i])) return 'seletor';
+}
+if (c.rede_ociosa && document.readyState === 'complete') {
+    // Buffer padrão guarda só 250 recursos; aumentado para a página não parecer ociosa à toa
+    if (!window.__prontidaoBuffer) { performance.setResourceTimingBufferSize(5000); window.__prontidaoBuffer = true; }
+    // Conta a partir do início da espera: um scroll pode disparar downloads logo depois
+    var r = performance.getEntriesByType('resource'), fim = window.__prontidaoDesde || 0;
+    for (var j = 0; j < r.length; j++) { if (r[j].responseEnd > fim) fim = r[j].responseEnd; }
+    if (performance.now() - fim >= idleMs) return 'rede_ociosa';
+}
+return null;
+"""
+
+
+def condicoes_para(url):
+    for dominio, condicoes in CONDICOES_POR_DOMINIO.items():
+        if dominio in url:
+            return condicoes
+    return PADRAO
+
+
+class EstatisticasProntidao:
+    """Tempo de espera real x sleep fixo substituído, por domínio."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.por_dominio = {}  # domínio -> [esperas, segundos gastos, segundos economizados, timeouts]
+
+    def registrar(self, dominio, gasto, espera_fixa, pronta):
+        with self.lock:
+            d = self.por_dominio.setdefault(dominio, [0, 0.0, 0.0, 0])
+            d[0] += 1
+            d[1] += gasto
+            d[2] += espera_fixa - gasto
+            if not pronta:
+                d[3] += 1
+
+    def economia_total(self):
+        with self.lock:
+            return sum(d[2] for d in self.por_dominio.values())
+
+    def resumo(self):
+        with self.lock:
+            linhas = []
+            for dominio, (n, gasto, economia, timeouts) in sorted(self.por_dominio.items()):
+                linhas.append(f"{dominio}: {n} espera(s), média {gasto / n:.2f}s, "
+                              f"economia {economia:.1f}s, {timeouts} timeout(s)")
+            return linhas
+
+
+class Prontidao:
+    def __init__(self, timeout=READINESS_TIMEOUT, idle_ms=NETWORK_IDLE_MS):
+        self.timeout = timeout
+        self.idle_ms = idle_ms
+        self.stats = EstatisticasProntidao()
+
+    def aguardar(self, driver, url, espera_fixa, condicoes=None, timeout=None):
+        """
+        Espera até a página em `driver` satisfazer uma condição do domínio de `url`
+        (ou até o timeout). `espera_fixa` é o sleep que esta espera substitui,
+        usado só na contabilidade. Retorna o nome da condição ou None se estourou.
+        """
+        condicoes = condicoes or condicoes_para(url)
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        motivo = None
+        primeira = True
+        while True:
+            motivo = driver.execute_script(_JS_PRONTA, condicoes, self.idle_ms, primeira)
+            primeira = False
+            if motivo or time.monotonic() >= limite:
+                break
+            time.sleep(POLL_INTERVAL)
+        self.stats.registrar(host_da_url(url), time.monotonic() - inicio, espera_fixa, bool(motivo))
+        return motivo
+
+    def aguardar_rede(self, driver, url, espera_fixa, timeout=None):
+        """Espera só a rede ficar ociosa (ex.: conteúdo carregado depois de um scroll)."""
+        return self.aguardar(driver, url, espera_fixa, condicoes=SO_REDE,
+                             timeout=espera_fixa if timeout is None else timeout)
@@ -2,6 +2,8 @@
 import csv
 import glob
 
+from normalizacao import preco_centavos
+
 # Ler CSV - encontrar o mais recente
 csv_files = glob.glob('output/imoveis_olx_extratos*.csv')
 csv_file = max(csv_files) if csv_files else None
@@ -37,11 +39,10 @@ for cidade, count in sorted(cidades.items(), key=lambda x: -x[1])[:5]:
 print(f'\n💰 Preços:')
 precos = []
 for row in dados:
-    try:
-        preco_str = row['preco'].replace('R$ ', '').replace('.', '').replace(',', '.')
-        precos.append(float(preco_str))
-    except:
-        pass
+    # Mesmo parser da coluna imoveis.preco_centavos
+    centavos = preco_centavos(row.get('preco'))
+    if centavos:
+        precos.append(centavos / 100)
 if precos:
     print(f'  Mínimo: R$ {min(precos):,.0f}')
     print(f'  Máximo: R$ {max(precos):,.0f}')
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Revisita de anúncios por frescor.
+
+Um link 'done' na tabela `links` nunca mais era visitado, e o preço em
+`imoveis` envelhecia. Agora cada visita a um anúncio fica registrada na
+tabela `revisitas` do imoveis.db (ImovelDB.registrar_visita) com uma
+impressão digital do que importa acompanhar (preço + situação: ativo ou
+removido, 404/410). Quando a impressão muda, conta como mudança.
+
+A próxima visita sai do histórico do próprio anúncio:
+- nunca mudou: espera o tempo em que já está estável (2, 4, 8... dias);
+- já mudou: taxa de mudança estimada pelo estimador de Cho & Garcia-Molina
+  para visitas periódicas, e o intervalo é o inverso da taxa;
+- sempre entre REVISIT_MIN_DAYS (anúncio "quente": diário) e
+  REVISIT_MAX_DAYS (estável: mensal). Removido vai direto para o máximo.
+
+agendar (ImovelDB.agendar_revisitas) devolve os vencidos para 'pending' com
+prioridade: quanto menor o intervalo, mais cedo o link sai em claim_links.
+No recrawl o cache_http.py resolve os inalterados com 304.
+
+Uso:
+    python revisita.py agendar            # cron diário, antes do scraper
+    python revisita.py agendar --limite 20000
+    python revisita.py status
+"""
+
+import argparse
+import hashlib
+import math
+import re
+
+REVISIT_INITIAL_DAYS = 2.0  # segunda visita de um anúncio novo
+REVISIT_MIN_DAYS = 1.0  # anúncio que muda muito: diário
+REVISIT_MAX_DAYS = 30.0  # anúncio estável (ou removido): mensal
+REVISIT_BATCH = 50000  # links devolvidos para a fila por agendamento
+
+PRIORIDADE_NOVO = 50  # links recém-descobertos; revisitas vão de 1 (mensal) a 100 (diária)
+PRIORIDADE_MAX = 100
+
+ATIVO, REMOVIDO = 'ativo', 'removido'
+STATUS_REMOVIDO = (404, 410)  # resposta HTTP de anúncio que saiu do ar
+
+
+def impressao_digital(dados=None, situacao=ATIVO):
+    """Hash curto do preço (só dígitos) e da situação do anúncio."""
+    preco = re.sub(r'\D', '', str((dados or {}).get('preco') or ''))
+    return hashlib.sha1(f"{preco}|{situacao}".encode()).hexdigest()[:16]
+
+
+def intervalo_revisita(visitas, mudancas, dias_observados, situacao=ATIVO):
+    """
+    Dias até a próxima visita. `visitas` conta a primeira; `mudancas` é
+    quantas visitas encontraram a impressão diferente da anterior;
+    `dias_observados` vai da primeira à última visita.
+    """
+    if situacao == REMOVIDO:
+        return REVISIT_MAX_DAYS
+    n = visitas - 1  # intervalos observados
+    if n <= 0:
+        return REVISIT_INITIAL_DAYS
+    if mudancas <= 0:
+        dias = dias_observados
+    else:
+        # Cho & Garcia-Molina: lambda = -ln((n - X + 0.5) / (n + 0.5)) / intervalo médio
+        x = min(mudancas, n)
+        taxa = -math.log((n - x + 0.5) / (n + 0.5)) / max(dias_observados / n, 1e-6)
+        dias = 1 / taxa
+    return min(REVISIT_MAX_DAYS, max(REVISIT_MIN_DAYS, dias))
+
+
+def prioridade_revisita(dias):
+    """Prioridade na fila para um intervalo de `dias` (diário = 100, mensal = 3)."""
+    return min(PRIORIDADE_MAX, max(1, int(PRIORIDADE_MAX / max(dias, REVISIT_MIN_DAYS))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Revisita de anúncios por frescor (tabela revisitas do imoveis.db)')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    ag = sub.add_parser('agendar', help='Devolver para a fila os anúncios com revisita vencida')
+    ag.add_argument('--limite', type=int, default=REVISIT_BATCH, help=f'Máximo de links (padrão: {REVISIT_BATCH})')
+    sub.add_parser('status', help='Resumo das revisitas')
+    args = parser.parse_args()
+
+    # Import tardio: ImovelDB usa intervalo_revisita deste módulo
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB()
+    if args.comando == 'agendar':
+        n = db.agendar_revisitas(limite=args.limite)
+        print(f"🔁 {n} anúncio(s) com revisita vencida de volta para a fila")
+    else:
+        s = db.stats_revisitas()
+        print(f"Anúncios acompanhados: {s['anuncios']} ({s['removidos']} removidos)")
+        print(f"Vencidos agora: {s['vencidos']}")
+        print(f"Mudanças de preço/situação vistas: {s['mudancas']} em {s['visitas']} visitas")
+        for faixa, n in s['faixas']:
+            print(f"   intervalo {faixa:>10}: {n}")
+    db.close()
@@ -8,6 +8,7 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
 from scraper_escalavel import ImovelDB
+from cache_http import CacheHTTP
 
 BASE_DIR = Path(__file__).parent
 OUTPUT_DIR = BASE_DIR / "output"
@@ -25,18 +26,26 @@ class WebScraperImovelWeb:
         })
         # Banco centralizado (imoveis.db na raiz do projeto)
         self.db = ImovelDB()
+        # ETag / Last-Modified da última coleta de cada página (GET condicional)
+        self.cache = CacheHTTP()
+        # Validadores de páginas já extraídas, guardados só depois que salvar() grava os imóveis
+        self._validadores = {}
 
     def coletar_imoveis(self, url):
-        """Coleta imóveis do site ImóvelWeb"""
+        """Coleta imóveis do site ImóvelWeb (lista vazia se a página não mudou desde a última coleta)"""
         try:
             print(f"  ➜ Acessando: {url}")
-            response = self.session.get(url, timeout=15)
+            response = self.session.get(url, timeout=15, headers=self.cache.cabecalhos(url))
+            if self.cache.resposta(url, response.status_code, response.headers):
+                print(f"  = Página inalterada desde a última coleta (304)")
+                return []
             response.raise_for_status()
 
             soup = BeautifulSoup(response.text, "html.parser")
             imoveis = self._extrair_imoveis(soup, url)
 
             if imoveis:
+                self._validadores[url] = (response.headers, response.content)
                 print(f"  ✓ {len(imoveis)} imóvel(is) encontrado(s)")
             else:
                 print(f"  ? Nenhum imóvel encontrado")
@@ -197,12 +206,22 @@ class WebScraperImovelWeb:
                 print(f"  ? Erro ao inserir no DB: {e}")
 
         print(f"✓ {inseridos} imóvel(is) inserido(s)/atualizado(s) em imoveis.db")
+
+        # Só agora, com os imóveis gravados, a página pode responder 304 na próxima coleta
+        self.db.flush()
+        for url, (headers, conteudo) in self._validadores.items():
+            self.cache.guardar(url, headers, conteudo)
+        self._validadores.clear()
+        self.cache.flush()
         return str(caminho)
 
     def close(self):
         """Fecha a sessão"""
         if self.session:
             self.session.close()
+        for linha in self.cache.stats.resumo():
+            print(f"  ♻ {linha}")
+        self.cache.close()
 
 
 def main():
@@ -9,22 +9,41 @@ Sistema escalável para scraping de 100k+ imóveis usando:
 - Checkpoint automático
 """
 
+import os
 import sys
+import atexit
+import socket
+import uuid
 import sqlite3
-import json
-import re
 import time
 import hashlib
 import threading
-import csv
+import queue
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import wraps
+from urllib.parse import urlparse
 from tqdm import tqdm
 import undetected_chromedriver as uc
 import random
-from net_utils import load_proxies, load_user_agents, pick_random, configure_chrome_options
+from net_utils import (load_proxies, load_user_agents, pick_random, configure_chrome_options, read_network_events,
+                       is_challenge_page)
+from http_fetcher import HttpFetcher, STATUS_BLOQUEIO
+from cache_http import CacheHTTP, NAO_MODIFICADO
+from revisita import (impressao_digital, intervalo_revisita, prioridade_revisita, PRIORIDADE_NOVO,
+                      REVISIT_BATCH, ATIVO, REMOVIDO, STATUS_REMOVIDO)
+from historico import id_anuncio, UPSERT_ANUNCIO
+from normalizacao import normalizar, preco_centavos, NORMALIZACAO_VERSAO
+from busca_texto import criar_indice
+from exportacao import exportar, iterar_imoveis, nome_arquivo, COLUNAS_EXPORT
+from page_store import PageStore
+from extracao_paralela import EstagioExtracao
+from prontidao import Prontidao
+from bloqueio_recursos import BloqueioRecursos
+from captura_api import CapturaAPI
+from desafios import FilaDesafios
+import perfis
+from concorrencia import ControleConcorrencia, OK, FALHA, BLOQUEIO, eh_timeout
+from cortesia import AgendadorCortesia
 
 # ============================================================================
 # CONFIGURAÇÃO
@@ -48,6 +67,22 @@ MAX_WORKERS = 3  # número de navegadores paralelos
 BATCH_SIZE = 100  # processar em lotes
 RETRY_MAX = 3
 RETRY_BACKOFF_FACTOR = 2  # 1s, 2s, 4s
+PAGES_PER_DRIVER = 200  # reciclar cada navegador após N páginas
+WRITE_BATCH_SIZE = 500  # escritas por transação no banco
+WRITE_FLUSH_INTERVAL = 1.0  # segundos máximos antes de gravar um lote
+LEASE_SECONDS = 900  # validade da reserva de um link por um processo
+# Mesmo formato de datetime.now().isoformat() (hora local), para comparar com data_coleta
+AGORA_SQL = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+LEASE_RENEW_INTERVAL = LEASE_SECONDS / 3  # processo vivo renova as reservas antes de vencerem
+BACKLOG_PER_DOMAIN = 50  # links reservados esperando na agenda, por domínio
+NAVEGADOR = 'navegador'  # marca, na agenda, dos links que o HTTP devolveu para o navegador
+HTTP_WORKERS = 8  # threads do nível HTTP (0 = só navegador)
+EXTRACTION_JOBS = os.cpu_count() or 1  # processos de extração (0 = na thread do navegador)
+BLOCK_RESOURCES = True  # bloquear imagens/fontes/mídia/rastreadores nos navegadores
+CAPTURE_API = True  # ler anúncios das respostas JSON das APIs de listagem (captura_api.py)
+PRODUCER_POLL_INTERVAL = 2.0  # espera por links novos enquanto a descoberta ainda roda
+USE_PROFILES = True  # navegadores com perfil persistente (perfis.py) em vez de perfil temporário
+USE_HTTP_CACHE = True  # GET condicional (ETag / Last-Modified, cache_http.py) no nível HTTP
 
 
 # ============================================================================
@@ -55,16 +90,27 @@ RETRY_BACKOFF_FACTOR = 2  # 1s, 2s, 4s
 # ============================================================================
 
 class ImovelDB:
-    """Gerencia banco SQLite para armazenar imóveis e metadados."""
+    """
+    Gerencia banco SQLite para armazenar imóveis e metadados.
+
+    Escritas são write-behind: os métodos add_*/mark_*/increment_* apenas
+    enfileiram a operação, e uma thread escritora dona de uma única conexão
+    (WAL) grava em transações agrupadas por tamanho ou tempo. Leituras
+    chamam flush() antes, então sempre enxergam o que já foi enfileirado.
+    """
     
     def __init__(self, db_path=DB_PATH):
         self.db_path = db_path
         self.lock = threading.Lock()
+        self._fila = queue.Queue()
+        self._writer = None
         self._init_schema()
+        atexit.register(self.close)
     
     def _init_schema(self):
         """Cria tabelas se não existirem."""
         with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS imoveis (
                     id TEXT PRIMARY KEY,
@@ -82,10 +128,59 @@ class ImovelDB:
                     link TEXT,
                     fonte TEXT,
                     data_coleta TEXT,
-                    raw_text TEXT
+                    raw_text TEXT,
+                    preco_centavos INTEGER,
+                    area_m2 INTEGER,
+                    n_quartos INTEGER,
+                    n_banheiros INTEGER,
+                    uf TEXT,
+                    cep8 TEXT,
+                    norm_versao INTEGER,
+                    atualizado_em TEXT
                 )
             """)
+            # Bancos antigos: colunas tipadas (normalizacao.py); o backfill preenche as linhas existentes
+            colunas = {row[1] for row in conn.execute("PRAGMA table_info(imoveis)")}
+            for coluna, tipo in (('preco_centavos', 'INTEGER'), ('area_m2', 'INTEGER'), ('n_quartos', 'INTEGER'),
+                                 ('n_banheiros', 'INTEGER'), ('uf', 'TEXT'), ('cep8', 'TEXT'),
+                                 ('norm_versao', 'INTEGER')):
+                if coluna not in colunas:
+                    conn.execute(f"ALTER TABLE imoveis ADD COLUMN {coluna} {tipo}")
+            if 'atualizado_em' not in colunas:
+                # Marca d'água da exportação incremental: começa igual a data_coleta
+                conn.execute("ALTER TABLE imoveis ADD COLUMN atualizado_em TEXT")
+                conn.execute("UPDATE imoveis SET atualizado_em = data_coleta")
+            # Qualquer escrita que não informa atualizado_em (backfill de normalizacao.py,
+            # historico.migrar, scripts com SQL próprio) o recebe dos triggers
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_imoveis_atualizado_insere AFTER INSERT ON imoveis
+                WHEN NEW.atualizado_em IS NULL
+                BEGIN
+                    UPDATE imoveis SET atualizado_em = {AGORA_SQL} WHERE rowid = NEW.rowid;
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_imoveis_atualizado AFTER UPDATE ON imoveis
+                WHEN NEW.atualizado_em IS OLD.atualizado_em
+                BEGIN
+                    UPDATE imoveis SET atualizado_em = {AGORA_SQL} WHERE rowid = NEW.rowid;
+                END
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_atualizado ON imoveis (atualizado_em)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_preco ON imoveis (preco_centavos)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_uf_preco ON imoveis (uf, preco_centavos)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_area ON imoveis (area_m2)")
+            # Filtros de consultar_imoveis.py: igualdades primeiro, a coluna de ordenação por último
             conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_imoveis_cidade_quartos_preco
+                ON imoveis (cidade COLLATE NOCASE, n_quartos, preco_centavos)
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_fonte_data ON imoveis (fonte COLLATE NOCASE, data_coleta)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_fonte_preco ON imoveis (fonte COLLATE NOCASE, preco_centavos)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_data ON imoveis (data_coleta)")
+            # Busca de texto em titulo/descricao/endereco (busca_texto.py), mantida por triggers
+            criar_indice(conn)
+            conn.execute(f"""
                 CREATE TABLE IF NOT EXISTS links (
                     id TEXT PRIMARY KEY,
                     url TEXT NOT NULL UNIQUE,
@@ -93,9 +188,114 @@ class ImovelDB:
                     keyword TEXT,
                     status TEXT DEFAULT 'pending',
                     tentativas INTEGER DEFAULT 0,
-                    data_add TEXT
+                    data_add TEXT,
+                    lease_owner TEXT,
+                    lease_expira REAL,
+                    prioridade INTEGER DEFAULT {PRIORIDADE_NOVO}
+                )
+            """)
+            # Bancos antigos: adiciona colunas de lease/prioridade que faltarem
+            colunas = {row[1] for row in conn.execute("PRAGMA table_info(links)")}
+            for coluna, tipo in (('lease_owner', 'TEXT'), ('lease_expira', 'REAL'),
+                                 ('prioridade', f'INTEGER DEFAULT {PRIORIDADE_NOVO}')):
+                if coluna not in colunas:
+                    conn.execute(f"ALTER TABLE links ADD COLUMN {coluna} {tipo}")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_links_fila
+                ON links (status, domain, tentativas)
+            """)
+            # Um índice por forma de claim_links, na mesma ordem do ORDER BY (sem sort por reserva)
+            conn.execute("DROP INDEX IF EXISTS idx_links_prioridade")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_links_claim
+                ON links (status, prioridade DESC, domain, tentativas)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_links_claim_dominio
+                ON links (status, domain, prioridade DESC, tentativas)
+            """)
+            # Uma linha por anúncio visitado: impressão (preço + situação) e agenda de revisita (revisita.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS revisitas (
+                    link_id TEXT PRIMARY KEY,
+                    impressao TEXT,
+                    situacao TEXT,
+                    visitas INTEGER DEFAULT 0,
+                    mudancas INTEGER DEFAULT 0,
+                    primeira_visita REAL,
+                    ultima_visita REAL,
+                    ultima_mudanca REAL,
+                    proxima_visita REAL
                 )
             """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_revisitas_proxima
+                ON revisitas (proxima_visita)
+            """)
+            # Histórico de preços (historico.py): último estado por anúncio + observações só acrescentadas
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS anuncios (
+                    anuncio_id TEXT PRIMARY KEY,
+                    url TEXT,
+                    fonte TEXT,
+                    preco_centavos INTEGER,
+                    situacao TEXT,
+                    primeira_observacao TEXT,
+                    ultima_observacao TEXT,
+                    preco_anterior_centavos INTEGER,
+                    preco_mudou_em TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_anuncios_quedas
+                ON anuncios (preco_mudou_em)
+                WHERE preco_centavos < preco_anterior_centavos
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS observacoes (
+                    id INTEGER PRIMARY KEY,
+                    anuncio_id TEXT NOT NULL,
+                    observado_em TEXT NOT NULL,
+                    preco_centavos INTEGER,
+                    situacao TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_observacoes_anuncio
+                ON observacoes (anuncio_id, observado_em)
+            """)
+            # Observação nova só quando o preço ou a situação mudam, na mesma instrução do UPSERT
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_anuncios_novo AFTER INSERT ON anuncios
+                BEGIN
+                    INSERT INTO observacoes (anuncio_id, observado_em, preco_centavos, situacao)
+                    VALUES (NEW.anuncio_id, NEW.ultima_observacao, NEW.preco_centavos, NEW.situacao);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_anuncios_mudou AFTER UPDATE OF preco_centavos, situacao ON anuncios
+                WHEN NEW.preco_centavos IS NOT OLD.preco_centavos OR NEW.situacao IS NOT OLD.situacao
+                BEGIN
+                    INSERT INTO observacoes (anuncio_id, observado_em, preco_centavos, situacao)
+                    VALUES (NEW.anuncio_id, NEW.ultima_observacao, NEW.preco_centavos, NEW.situacao);
+                END
+            """)
+            # Exportação incremental (exportacao.py): um registro por arquivo delta, por destino
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS exportacoes (
+                    id INTEGER PRIMARY KEY,
+                    alvo TEXT NOT NULL,
+                    arquivo TEXT NOT NULL,
+                    desde TEXT,
+                    ate TEXT NOT NULL,
+                    linhas INTEGER,
+                    formato TEXT,
+                    compressao TEXT,
+                    colunas TEXT,
+                    criado_em TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_exportacoes_alvo ON exportacoes (alvo, ate)")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS checkpoint (
                     id INTEGER PRIMARY KEY,
@@ -109,63 +309,265 @@ class ImovelDB:
             """)
             conn.commit()
     
-    def add_link(self, url, domain, keyword):
-        """Adiciona link para processar (se não existir)."""
+    # ------------------------------------------------------------------
+    # Escritor (write-behind)
+    # ------------------------------------------------------------------
+    
+    def _garantir_writer(self):
+        """Inicia a thread escritora se ela não estiver rodando (chamar com self.lock)."""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writer_loop, name="ImovelDB-writer", daemon=True)
+            self._writer.start()
+        return self._writer
+    
+    def _enfileirar(self, nome, sql, params):
+        """Enfileira uma escrita para a thread escritora."""
+        with self.lock:
+            self._garantir_writer()
+            self._fila.put((nome, sql, params))
+    
+    def _writer_loop(self):
+        """Consome a fila e grava em lotes de WRITE_BATCH_SIZE ou a cada WRITE_FLUSH_INTERVAL."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Usada por registrar_visita para calcular a próxima visita dentro do UPSERT
+        conn.create_function('intervalo_revisita', 4, intervalo_revisita, deterministic=True)
+        parar = False
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                link_id = hashlib.md5(url.encode()).hexdigest()
-                conn.execute("""
-                    INSERT OR IGNORE INTO links (id, url, domain, keyword, data_add)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (link_id, url, domain, keyword, datetime.now().isoformat()))
-                conn.commit()
+            while not parar:
+                item = self._fila.get()
+                lote, avisos, depois = [], [], []
+                limite = time.monotonic() + WRITE_FLUSH_INTERVAL
+                while True:
+                    nome = item[0]
+                    if nome in ('flush', 'close'):
+                        avisos.append(item[1])
+                        parar = nome == 'close'
+                        break
+                    if nome == 'depois':
+                        depois.append(item[1])
+                    else:
+                        lote.append(item)
+                    if len(lote) >= WRITE_BATCH_SIZE:
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    try:
+                        item = self._fila.get(timeout=restante)
+                    except queue.Empty:
+                        break
+                self._gravar_lote(conn, lote)
+                for funcao in depois:
+                    try:
+                        funcao(conn)
+                    except Exception as e:
+                        print(f"Erro depois de gravar lote: {e}")
+                for evento in avisos:
+                    evento.set()
+        finally:
+            conn.close()
+    
+    def _gravar_lote(self, conn, lote):
+        """Grava um lote de operações numa única transação."""
+        if not lote:
+            return
+        try:
+            with conn:
+                for nome, sql, params in lote:
+                    try:
+                        conn.execute(sql, params)
+                    except Exception as e:
+                        print(f"Erro ao {nome}: {e}")
         except Exception as e:
-            print(f"Erro ao add_link: {e}")
+            print(f"Erro ao gravar lote de {len(lote)} operações: {e}")
+    
+    def _sinalizar(self, comando):
+        """Envia flush/close para o escritor e espera a confirmação."""
+        with self.lock:
+            ocioso = self._writer is None or not self._writer.is_alive()
+            if ocioso and self._fila.empty():
+                return
+            writer = self._garantir_writer()
+            evento = threading.Event()
+            self._fila.put((comando, evento))
+        evento.wait()
+        if comando == 'close':
+            writer.join()
+    
+    def flush(self):
+        """Bloqueia até todas as escritas enfileiradas estarem gravadas."""
+        self._sinalizar('flush')
+    
+    def close(self):
+        """Grava o que estiver pendente e encerra a thread escritora."""
+        self._sinalizar('close')
+    
+    def depois_de_gravar(self, funcao):
+        """
+        Chama `funcao(conn)` na thread escritora logo depois do commit de
+        tudo o que foi enfileirado antes (conn é a conexão do escritor).
+        """
+        self._enfileirar('depois', funcao, None)
+    
+    def guardar_validador(self, cache, url, validador, link=None):
+        """
+        Guarda no CacheHTTP o ETag/Last-Modified de `url` só quando o imóvel
+        (`link`, padrão a própria url) já está gravado: se o processo cair
+        antes, o próximo GET baixa a página inteira em vez de receber 304.
+        `validador` é o (headers, conteudo) devolvido pelo fetcher.
+        """
+        if cache is None or validador is None:
+            return
+        imovel_id = id_anuncio(link or url)
+        
+        def guardar(conn):
+            if conn.execute("SELECT 1 FROM imoveis WHERE id = ?", (imovel_id,)).fetchone():
+                cache.guardar(url, *validador)
+        
+        self.depois_de_gravar(guardar)
+    
+    def add_link(self, url, domain, keyword):
+        """Adiciona link para processar (se não existir)."""
+        link_id = hashlib.md5(url.encode()).hexdigest()
+        self._enfileirar('add_link', """
+            INSERT OR IGNORE INTO links (id, url, domain, keyword, data_add)
+            VALUES (?, ?, ?, ?, ?)
+        """, (link_id, url, domain, keyword, datetime.now().isoformat()))
     
     def add_imovel(self, titulo, preco=None, metragem=None, quartos=None, 
                    banheiros=None, descricao=None, endereco=None, cidade=None, estado=None, cep=None, contato=None, link=None, fonte=None, raw_text=None):
-        """Adiciona imóvel ao banco (deduplicado por ID)."""
-        try:
+        """
+        Adiciona imóvel ao banco. Com link, o id é o do anúncio (historico.id_anuncio):
+        a linha guarda o estado atual e a mudança de preço vira observação.
+        """
+        if link:
+            imovel_id = id_anuncio(link)
+            self.registrar_observacao(link, preco, ATIVO, fonte)
+        else:
             imovel_id = hashlib.md5(f"{titulo}{preco}{link}".encode()).hexdigest()
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO imoveis 
-                    (id, titulo, preco, metragem, quartos, banheiros, descricao, endereco, cidade, estado, cep, contato, link, fonte, data_coleta, raw_text)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (imovel_id, titulo, preco, metragem, quartos, banheiros, descricao, endereco, cidade, estado, cep, contato, link, fonte,
-                      datetime.now().isoformat(), raw_text[:500] if raw_text else None))
-                conn.commit()
-            return imovel_id
-        except Exception as e:
-            print(f"Erro ao add_imovel: {e}")
-            return None
+        # Colunas tipadas para filtro/agregação por índice (normalizacao.py)
+        tipadas = normalizar(preco, metragem, quartos, banheiros, estado, cep)
+        agora = datetime.now().isoformat()
+        self._enfileirar('add_imovel', """
+            INSERT OR REPLACE INTO imoveis 
+            (id, titulo, preco, metragem, quartos, banheiros, descricao, endereco, cidade, estado, cep, contato, link, fonte, data_coleta, raw_text,
+             preco_centavos, area_m2, n_quartos, n_banheiros, uf, cep8, norm_versao, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (imovel_id, titulo, preco, metragem, quartos, banheiros, descricao, endereco, cidade, estado, cep, contato, link, fonte,
+              agora, raw_text[:500] if raw_text else None, *tipadas, NORMALIZACAO_VERSAO, agora))
+        return imovel_id
     
     def mark_link_processed(self, url, status='done'):
         """Marca link como processado."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                link_id = hashlib.md5(url.encode()).hexdigest()
-                conn.execute("""
-                    UPDATE links SET status = ? WHERE id = ?
-                """, (status, link_id))
-                conn.commit()
-        except Exception as e:
-            print(f"Erro ao mark_link_processed: {e}")
+        link_id = hashlib.md5(url.encode()).hexdigest()
+        self._enfileirar('mark_link_processed', """
+            UPDATE links SET status = ?, lease_owner = NULL, lease_expira = NULL WHERE id = ?
+        """, (status, link_id))
     
     def increment_tentativas(self, url):
         """Incrementa contador de tentativas."""
+        link_id = hashlib.md5(url.encode()).hexdigest()
+        self._enfileirar('increment_tentativas', """
+            UPDATE links SET tentativas = tentativas + 1 WHERE id = ?
+        """, (link_id,))
+    
+    def registrar_observacao(self, url, preco, situacao=ATIVO, fonte=None):
+        """Atualiza o último estado do anúncio; os triggers de `anuncios` acrescentam a observação se mudou."""
+        anuncio_id = id_anuncio(url)
+        centavos = preco_centavos(preco)
+        self._enfileirar('registrar_observacao', UPSERT_ANUNCIO,
+                         (anuncio_id, url, fonte, centavos, situacao, datetime.now().isoformat()))
+    
+    def registrar_visita(self, url, impressao=None, situacao=ATIVO):
+        """
+        Registra uma visita ao anúncio e agenda a próxima (revisita.py).
+        `impressao` None quer dizer "não mudou" (ex.: resposta 304).
+        """
+        link_id = hashlib.md5(url.encode()).hexdigest()
+        if situacao == REMOVIDO:
+            impressao = impressao_digital(situacao=REMOVIDO)
+            self.registrar_observacao(url, None, REMOVIDO)
+        mudou = "(COALESCE(excluded.impressao, impressao) IS NOT impressao)"
+        self._enfileirar('registrar_visita', f"""
+            INSERT INTO revisitas (link_id, impressao, situacao, visitas, mudancas,
+                                   primeira_visita, ultima_visita, ultima_mudanca, proxima_visita)
+            VALUES (?1, ?2, ?3, 1, 0, ?4, ?4, ?4, ?4 + 86400 * intervalo_revisita(1, 0, 0, ?3))
+            ON CONFLICT(link_id) DO UPDATE SET
+                impressao = COALESCE(excluded.impressao, impressao),
+                situacao = excluded.situacao,
+                visitas = visitas + 1,
+                mudancas = mudancas + {mudou},
+                ultima_visita = excluded.ultima_visita,
+                ultima_mudanca = CASE WHEN {mudou} THEN excluded.ultima_visita ELSE ultima_mudanca END,
+                proxima_visita = excluded.ultima_visita + 86400 * intervalo_revisita(
+                    visitas + 1, mudancas + {mudou},
+                    (excluded.ultima_visita - primeira_visita) / 86400.0, excluded.situacao)
+        """, (link_id, impressao, situacao, time.time()))
+    
+    def agendar_revisitas(self, limite=REVISIT_BATCH, agora=None):
+        """
+        Devolve para 'pending' os links com revisita vencida, com prioridade
+        pelo intervalo (anúncio que muda muito sai antes). Retorna quantos.
+        """
+        self.flush()
+        agora = time.time() if agora is None else agora
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.create_function('prioridade_revisita', 1, prioridade_revisita, deterministic=True)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                link_id = hashlib.md5(url.encode()).hexdigest()
-                conn.execute("""
-                    UPDATE links SET tentativas = tentativas + 1 WHERE id = ?
-                """, (link_id,))
-                conn.commit()
-        except Exception as e:
-            print(f"Erro ao increment_tentativas: {e}")
+            conn.execute("BEGIN IMMEDIATE")
+            n = conn.execute("""
+                UPDATE links
+                SET status = 'pending', tentativas = 0, lease_owner = NULL, lease_expira = NULL,
+                    prioridade = (SELECT prioridade_revisita((r.proxima_visita - r.ultima_visita) / 86400.0)
+                                  FROM revisitas r WHERE r.link_id = links.id)
+                WHERE status IN ('done', 'error') AND id IN (
+                    SELECT link_id FROM revisitas WHERE proxima_visita <= ?
+                    ORDER BY proxima_visita LIMIT ?
+                )
+            """, (agora, limite)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return n
+    
+    def stats_revisitas(self, agora=None):
+        """Resumo da tabela revisitas (para `python revisita.py status`)."""
+        self.flush()
+        agora = time.time() if agora is None else agora
+        with sqlite3.connect(self.db_path) as conn:
+            anuncios, removidos, vencidos, visitas, mudancas = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(situacao = ?), 0), COALESCE(SUM(proxima_visita <= ?), 0),
+                       COALESCE(SUM(visitas), 0), COALESCE(SUM(mudancas), 0)
+                FROM revisitas
+            """, (REMOVIDO, agora)).fetchone()
+            faixas = conn.execute("""
+                SELECT CASE
+                           WHEN d <= 1.5 THEN '1 dia'
+                           WHEN d <= 7 THEN '2-7 dias'
+                           WHEN d <= 20 THEN '8-20 dias'
+                           ELSE '21-30 dias'
+                       END AS faixa, COUNT(*)
+                FROM (SELECT (proxima_visita - ultima_visita) / 86400.0 AS d FROM revisitas)
+                GROUP BY faixa ORDER BY MIN(d)
+            """).fetchall()
+        return {
+            'anuncios': anuncios,
+            'removidos': removidos,
+            'vencidos': vencidos,
+            'visitas': visitas,
+            'mudancas': mudancas,
+            'faixas': faixas,
+        }
     
     def get_pending_links(self, domain=None, limit=BATCH_SIZE):
         """Retorna links ainda não processados."""
+        self.flush()
         with sqlite3.connect(self.db_path) as conn:
             query = "SELECT url FROM links WHERE status = 'pending' AND tentativas < ?"
             params = [RETRY_MAX]
@@ -176,8 +578,94 @@ class ImovelDB:
             cursor = conn.execute(query, params)
             return [row[0] for row in cursor.fetchall()]
     
+    def claim_links(self, owner, domain=None, limit=BATCH_SIZE, lease_seconds=LEASE_SECONDS, ignorar=None):
+        """
+        Reserva atomicamente até `limit` links pendentes para `owner`.
+
+        Os links passam para 'in_progress' com um lease que expira em
+        `lease_seconds`. Leases vencidos (processo que morreu no meio) voltam
+        para 'pending' com uma tentativa a mais antes da nova reserva, então
+        vários processos podem dividir o mesmo imoveis.db sem trabalho
+        duplicado. `ignorar` pula os links devolvidos com essa marca
+        (release_link).
+        """
+        self.flush()
+        agora = time.time()
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            # IMMEDIATE pega o lock de escrita já no SELECT: ninguém reserva os mesmos ids
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                UPDATE links
+                SET status = 'pending', lease_owner = NULL, lease_expira = NULL,
+                    tentativas = tentativas + 1
+                WHERE status = 'in_progress' AND lease_expira < ?
+            """, (agora,))
+            query = "SELECT id, url FROM links WHERE status = 'pending' AND tentativas < ?"
+            params = [RETRY_MAX]
+            if ignorar:
+                query += " AND lease_owner IS NOT ?"
+                params.append(ignorar)
+            # Revisitas de anúncios "quentes" primeiro (prioridade, revisita.py)
+            if domain:
+                query += " AND domain = ? ORDER BY prioridade DESC, tentativas"
+                params.append(domain)
+            else:
+                query += " ORDER BY prioridade DESC, domain, tentativas"
+            query += " LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(query, params).fetchall()
+            conn.executemany("""
+                UPDATE links SET status = 'in_progress', lease_owner = ?, lease_expira = ?
+                WHERE id = ?
+            """, [(owner, agora + lease_seconds, link_id) for link_id, _ in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            # Se o próprio BEGIN falhou (lock ocupado), não há transação: o erro original sobe intacto
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return [url for _, url in rows]
+    
+    def renovar_leases(self, owner, lease_seconds=LEASE_SECONDS):
+        """Estende os leases de `owner` (links que ainda esperam na agenda ou num desafio)."""
+        self._enfileirar('renovar_leases', """
+            UPDATE links SET lease_expira = ?
+            WHERE status = 'in_progress' AND lease_owner = ?
+        """, (time.time() + lease_seconds, owner))
+    
+    def dominios_pendentes(self):
+        """Domínios com links esperando reserva (pelo índice idx_links_claim_dominio)."""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT domain FROM links WHERE status = 'pending' AND tentativas < ?", (RETRY_MAX,)
+            )]
+    
+    def release_link(self, url, marca=None):
+        """
+        Devolve um link reservado para a fila na hora, sem contar tentativa.
+        `marca` fica em lease_owner do link pendente: claim_links(ignorar=marca)
+        não o reserva de novo, outro processo sim.
+        """
+        link_id = hashlib.md5(url.encode()).hexdigest()
+        self._enfileirar('release_link', """
+            UPDATE links SET status = 'pending', lease_owner = ?, lease_expira = NULL
+            WHERE id = ? AND status = 'in_progress'
+        """, (marca, link_id))
+    
+    def release_links(self, owner):
+        """Devolve para a fila os links ainda reservados por `owner`."""
+        self._enfileirar('release_links', """
+            UPDATE links SET status = 'pending', lease_owner = NULL, lease_expira = NULL
+            WHERE status = 'in_progress' AND lease_owner = ?
+        """, (owner,))
+        self.flush()
+    
     def get_stats(self):
         """Retorna estatísticas do banco."""
+        self.flush()
         with sqlite3.connect(self.db_path) as conn:
             total_imoveis = conn.execute("SELECT COUNT(*) FROM imoveis").fetchone()[0]
             total_links = conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
@@ -191,298 +679,156 @@ class ImovelDB:
             'links_error': links_error,
         }
     
+    def count_pending(self):
+        """
+        Links esperando processamento, sem esperar o escritor (pode ficar
+        alguns ms atrás). Barato: resolvido pelo índice idx_links_fila.
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM links WHERE status = 'pending' AND tentativas < ?", (RETRY_MAX,)
+            ).fetchone()[0]
+    
     def export_json(self, limite=None):
-        """Exporta imóveis para JSON."""
+        """Exporta imóveis para JSON (lista em memória; para a tabela inteira use exportacao.py)."""
+        self.flush()
         with sqlite3.connect(self.db_path) as conn:
-            query = "SELECT id, titulo, preco, metragem, quartos, banheiros, descricao, endereco, cidade, estado, cep, contato, link, fonte, data_coleta FROM imoveis"
-            if limite:
-                query += f" LIMIT {limite}"
-            cursor = conn.execute(query)
-            imoveis = []
-            for row in cursor.fetchall():
-                imoveis.append({
-                    'id': row[0],
-                    'titulo': row[1],
-                    'preco': row[2],
-                    'metragem': row[3],
-                    'quartos': row[4],
-                    'banheiros': row[5],
-                    'descricao': row[6],
-                    'endereco': row[7],
-                    'cidade': row[8],
-                    'estado': row[9],
-                    'cep': row[10],
-                    'contato': row[11],
-                    'link': row[12],
-                    'fonte': row[13],
-                    'data_coleta': row[14],
-                })
-            return imoveis
-
-
-# ============================================================================
-# RETRY DECORATOR
-# ============================================================================
-
-def retry_exponential(max_attempts=RETRY_MAX, backoff_factor=RETRY_BACKOFF_FACTOR):
-    """Retry com exponential backoff."""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            attempt = 0
-            while attempt < max_attempts:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    attempt += 1
-                    if attempt >= max_attempts:
-                        raise
-                    wait_time = backoff_factor ** (attempt - 1)
-                    print(f"  ⏳ Tentativa {attempt}: aguardando {wait_time}s...")
-                    time.sleep(wait_time)
-            return None
-        return wrapper
-    return decorator
+            return list(iterar_imoveis(conn, COLUNAS_EXPORT, limite))
 
 
 # ============================================================================
 # EXTRAÇÃO DE DADOS
 # ============================================================================
 
-price_re = re.compile(r"R\$\s*[\d\.\,]+")
-area_re = re.compile(r"(\d{2,4})\s*m[²2]", re.IGNORECASE)
-rooms_re = re.compile(r"(\d+)\s*(?:quarto|quartos|q|qt)\b", re.IGNORECASE)
-baths_re = re.compile(r"(\d+)\s*(?:banheiro|banheiros|b\.)\b", re.IGNORECASE)
-cep_re = re.compile(r"\b\d{5}-\d{3}\b")
-phone_re = re.compile(r"\(?\d{2,3}\)?\s*\d{4,5}-\d{4}")
+# extrair_dados vem de extracao.py: motor de passada única, sem dependência
+# de navegador (veja bench_extracao.py para o comparativo com a cascata antiga).
 
+def fonte_da_url(url):
+    """Nome curto da fonte (ex.: OLX) a partir do domínio da URL."""
+    for domain in TARGET_DOMAINS:
+        if domain in url:
+            return domain.split('.')[0].upper()
+    return None
 
-def _extract_jsonld(html):
-    """Parse JSON-LD blocks and return list of dicts."""
-    objs = []
-    for m in re.finditer(r"<script[^>]*type=\"application/ld\+json\"[^>]*>(.*?)</script>", html, re.I | re.S):
-        try:
-            txt = m.group(1).strip()
-            # Some pages include multiple JSON objects concatenated
-            if txt.startswith('['):
-                data = json.loads(txt)
-                if isinstance(data, list):
-                    objs.extend(data)
-            else:
-                data = json.loads(txt)
-                objs.append(data)
-        except Exception:
-            continue
-    return objs
-
-
-def extrair_dados(html, url=None):
-    """Extrai dados de imóvel da página HTML."""
-    if not html or len(html) < 100:
-        return None
-    
-    text = re.sub(r"\s+", " ", html)
-
-    # Try JSON-LD first
-    try:
-        jsonlds = _extract_jsonld(html)
-        for obj in jsonlds:
-            # Look for real estate listing structures
-            if isinstance(obj, dict):
-                # common fields: name, description, offers, address, telephone
-                titulo = obj.get('name') or obj.get('headline')
-                descricao = obj.get('description')
-                price = None
-                metragem = None
-                quartos = None
-                banheiros = None
-                endereco = None
-                cidade = None
-                estado = None
-                cep = None
-                contato = None
-
-                # offers may contain price
-                offers = obj.get('offers')
-                if isinstance(offers, dict):
-                    price = offers.get('price') or offers.get('priceSpecification', {}).get('price')
-                # address
-                address = obj.get('address') or {}
-                if isinstance(address, dict):
-                    endereco = address.get('streetAddress')
-                    cidade = address.get('addressLocality')
-                    estado = address.get('addressRegion')
-                    cep = address.get('postalCode')
-                # contact
-                contato = obj.get('telephone') or (obj.get('contactPoint', {}) or {}).get('telephone')
-
-                if titulo or price or endereco:
-                    return {
-                        'titulo': titulo or (text[:150] if text else None),
-                        'preco': f"R$ {price}" if price and not isinstance(price, str) and price else (price if isinstance(price, str) else None),
-                        'metragem': metragem,
-                        'quartos': quartos,
-                        'banheiros': banheiros,
-                        'descricao': descricao,
-                        'endereco': endereco,
-                        'cidade': cidade,
-                        'estado': estado,
-                        'cep': cep,
-                        'contato': contato,
-                        'link': url,
-                    }
-    except Exception:
-        pass
-
-    # Try to find embedded JSON-like keys (addressLocality, postalCode) anywhere in the HTML
-    try:
-        m_city = re.search(r'"addressLocality"\s*:\s*"([^"]{2,100})"', html)
-        m_region = re.search(r'"addressRegion"\s*:\s*"([A-Z]{2})"', html)
-        m_postal = re.search(r'"postalCode"\s*:\s*"(\d{5}-\d{3})"', html)
-        if m_city and not cidade:
-            cidade = m_city.group(1)
-        if m_region and not estado:
-            estado = m_region.group(1)
-        if m_postal and not cep:
-            cep = m_postal.group(1)
-    except Exception:
-        pass
-
-    # Fallback heuristics from raw text
-    preco = None
-    m = price_re.search(text)
-    if m:
-        preco = m.group(0)
-
-    metragem = None
-    m = area_re.search(text)
-    if m:
-        metragem = f"{m.group(1)} m²"
-
-    quartos = None
-    m = rooms_re.search(text)
-    if m:
-        quartos = f"{m.group(1)} Q"
-
-    banheiros = None
-    m = baths_re.search(text)
-    if m:
-        banheiros = f"{m.group(1)} B"
-
-    descricao = None
-    # meta description
-    m = re.search(r"<meta\s+name=[\"']description[\"']\s+content=[\"']([^\"']+)[\"']", html, re.I)
-    if m:
-        descricao = m.group(1)
-    else:
-        # try og:description
-        m = re.search(r"<meta\s+property=[\"']og:description[\"']\s+content=[\"']([^\"']+)[\"']", html, re.I)
-        if m:
-            descricao = m.group(1)
-
-    endereco = None
-    cidade = None
-    estado = None
-    cep = None
-    contato = None
-
-    # cep
-    m = cep_re.search(text)
-    if m:
-        cep = m.group(0)
-
-    # phone
-    m = phone_re.search(text)
-    if m:
-        contato = m.group(0)
-
-    # try tel: links
-    if not contato:
-        m = re.search(r"href=['\"]tel:(\+?[0-9\-\(\)\s]+)['\"]", html, re.I)
-        if m:
-            contato = m.group(1)
-
-    # data attributes (some sites store phone in data-phone)
-    if not contato:
-        m = re.search(r"data-phone=['\"]([^'\"]+)['\"]", html, re.I)
-        if m:
-            contato = m.group(1)
-
-    # try to extract an address line
-    m = re.search(r'([A-Za-z0-9\s\.,\-]+\b)(?:,\s*)([A-Za-z\s]+)\s*-\s*([A-Z]{2})', text)
-    if m:
-        endereco = m.group(1).strip()
-        cidade = m.group(2).strip()
-        estado = m.group(3).strip()
-
-    # title from <title> tag or first heading
-    titulo = None
-    m = re.search(r'<title>(.*?)</title>', html, re.I)
-    if m:
-        titulo = m.group(1).strip()
-    else:
-        m = re.search(r'<h1[^>]*>(.*?)</h1>', html, re.I | re.S)
-        if m:
-            titulo = re.sub(r'<[^>]+>', '', m.group(1)).strip()
-
-    if not (titulo or preco or metragem):
-        return None
-
-    return {
-        'titulo': titulo,
-        'preco': preco,
-        'metragem': metragem,
-        'quartos': quartos,
-        'banheiros': banheiros,
-        'descricao': descricao,
-        'endereco': endereco,
-        'cidade': cidade,
-        'estado': estado,
-        'cep': cep,
-        'contato': contato,
-        'link': url,
-    }
+
+def gravar_imovel(db, url, dados, raw_text=None):
+    """Grava no banco o dicionário retornado por extrair_dados."""
+    return db.add_imovel(
+        titulo=dados['titulo'],
+        preco=dados['preco'],
+        metragem=dados.get('metragem'),
+        quartos=dados.get('quartos'),
+        banheiros=dados.get('banheiros'),
+        descricao=dados.get('descricao'),
+        endereco=dados.get('endereco'),
+        cidade=dados.get('cidade'),
+        estado=dados.get('estado'),
+        cep=dados.get('cep'),
+        contato=dados.get('contato'),
+        link=url,
+        fonte=fonte_da_url(url),
+        raw_text=raw_text
+    )
 
 
 # ============================================================================
 # SCRAPER COM WORKERS
 # ============================================================================
 
+def dominio_alvo(url):
+    """Retorna o domínio de TARGET_DOMAINS presente na URL (ou o host)."""
+    for domain in TARGET_DOMAINS:
+        if domain in url:
+            return domain
+    return urlparse(url).netloc
+
+
 class ScraperEscalavel:
-    def __init__(self, headless=True, max_workers=MAX_WORKERS, proxy_file=None, ua_file=None):
+    def __init__(self, headless=True, max_workers=MAX_WORKERS, proxy_file=None, ua_file=None,
+                 pages_per_driver=PAGES_PER_DRIVER, http_workers=HTTP_WORKERS, jobs=EXTRACTION_JOBS,
+                 bloquear_recursos=BLOCK_RESOURCES, capturar_api=CAPTURE_API, usar_perfis=USE_PROFILES,
+                 taxas=None, usar_cache=USE_HTTP_CACHE):
         self.headless = headless
         self.max_workers = max_workers
+        self.pages_per_driver = pages_per_driver
+        self.http_workers = http_workers
         self.db = ImovelDB()
+        self.paginas = PageStore()
+        self.extracao = EstagioExtracao(jobs=jobs)
+        self.prontidao = Prontidao()
+        self.bloqueio = BloqueioRecursos(ativo=bloquear_recursos)
+        self.captura = CapturaAPI(ativo=capturar_api)
+        # Quantos workers do pool cada domínio ocupa (AIMD: sobe com sucesso, cai com 429/403/desafio)
+        self.controle = ControleConcorrencia()
+        # Ritmo por host (cortesia.TAXAS_POR_HOST, ou `taxas`) e fila de atraso dos retries
+        self.taxas = taxas
+        self._agenda = None
+        self._tentativas = {}  # link -> falhas nesta execução
         self.drivers = []
+        self._drivers_lock = threading.Lock()
+        self._processados = 0
+        # Dono dos leases deste processo na tabela links
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
         self.proxy_list = load_proxies(proxy_file)
         self.ua_list = load_user_agents(ua_file)
+        # Um par proxy/UA para o nível HTTP e o navegador de resolução: o cookie de
+        # liberação de um desafio só vale para o mesmo IP e User-Agent
+        self.proxy = pick_random(self.proxy_list)
+        self.user_agent = pick_random(self.ua_list)
+        self.desafios = FilaDesafios(proxy=self.proxy, user_agent=self.user_agent)
+        self._pares = {}  # id(driver) -> (proxy, user_agent) do navegador
+        # Recrawl: página que responde 304 não passa de novo pela extração nem pelo banco
+        self.http = HttpFetcher(user_agent=self.user_agent, proxy=self.proxy,
+                                cache=CacheHTTP() if usar_cache else None)
+        # Cada perfil fica preso ao seu par proxy/UA entre execuções
+        self.perfis = perfis.gerenciador('escalavel', self.proxy_list, self.ua_list) if usar_perfis else None
     
     def _get_driver(self):
         """Cria um navegador undetected com suporte a proxy/UA rotation."""
+        # Perfil persistente: cache e cookies de desafio já resolvido (None = pool cheio, perfil temporário)
+        perfil = self.perfis.adquirir() if self.perfis else None
         try:
             options = uc.ChromeOptions()
-            # pick proxy and ua
-            proxy = pick_random(self.proxy_list)
-            ua = pick_random(self.ua_list)
-            configure_chrome_options(options, proxy=proxy, user_agent=ua, headless=self.headless)
+            if perfil:
+                proxy, ua = perfil.proxy, perfil.user_agent
+            else:
+                # pick proxy and ua
+                proxy = pick_random(self.proxy_list)
+                ua = pick_random(self.ua_list)
+            configure_chrome_options(options, proxy=proxy, user_agent=ua, headless=self.headless,
+                                     log_rede=self.bloqueio.ativo or self.captura.ativo,
+                                     user_data_dir=perfil.pasta if perfil else None)
             try:
                 driver = uc.Chrome(options=options, version_main=None)
             except TypeError:
                 # fallback
                 driver = uc.Chrome(options=options)
-            return driver
         except Exception as e:
             print(f"Erro ao criar driver: {e}")
+            if self.perfis:
+                self.perfis.devolver(perfil)
             return None
+        if self.perfis:
+            self.perfis.vincular(driver, perfil)
+        with self._drivers_lock:
+            self._pares[id(driver)] = (proxy, ua)
+        return driver
     
-    @retry_exponential(max_attempts=RETRY_MAX)
     def processar_link(self, url, driver):
-        """Processa um único link (extrai dados)."""
+        """
+        Processa um único link (extrai dados). Retorna True/False, ou None se
+        a página pediu verificação humana e foi encaminhada para self.desafios
+        (o resultado é registrado depois, por _concluir_desafio).
+        """
         if not driver:
             driver = self._get_driver()
         
+        self.captura.preparar(driver)
+        self.bloqueio.aplicar(driver, url)
+        self.desafios.aplicar_cookies(driver, url, par=self._pares.get(id(driver)))
         driver.get(url)
-        time.sleep(1.5)
+        # Segue assim que o anúncio estiver na página (antes: sleep fixo de 1.5s)
+        self.prontidao.aguardar(driver, url, espera_fixa=1.5)
         
         # Scroll
         try:
@@ -491,119 +837,436 @@ class ScraperEscalavel:
             pass
         
         html = driver.page_source
-        dados = extrair_dados(html, url)
+        eventos = read_network_events(driver)
+        desafio = is_challenge_page(html)
+        if self.perfis:
+            self.perfis.registrar(driver, desafio)
+        if desafio:
+            # O navegador segue para o próximo link; alguém resolve no navegador visível
+            self.desafios.encaminhar(url, concluir=self._concluir_desafio)
+            return None
+        self.bloqueio.contabilizar(url, eventos)
+        capturados = self._salvar_api(url, self.captura.respostas(driver, url, eventos))
+        return self._salvar_pagina(url, html) or capturados > 0
+    
+    def _salvar_pagina(self, url, html):
+        """Extrai dados do HTML e grava o imóvel. Retorna True se extraiu algo."""
+        # Guarda a página inteira para poder re-extrair sem baixar de novo (page_store.py)
+        self.paginas.salvar(url, html)
+        dados = self.extracao.extrair(url, html)
         
         if dados:
-            fonte = None
-            for domain in TARGET_DOMAINS:
-                if domain in url:
-                    fonte = domain.split('.')[0].upper()
-                    break
-            
-            self.db.add_imovel(
-                titulo=dados['titulo'],
-                preco=dados['preco'],
-                metragem=dados['metragem'],
-                quartos=dados['quartos'],
-                banheiros=dados['banheiros'],
-                link=url,
-                fonte=fonte,
-                raw_text=html[:500]
-            )
+            gravar_imovel(self.db, url, dados, raw_text=html[:500])
+            self.db.registrar_visita(url, impressao_digital(dados))
             return True
         return False
     
-    def processar_batch_paralelo(self, links):
-        """Processa um lote de links em paralelo com múltiplos drivers."""
-        drivers = [self._get_driver() for _ in range(min(self.max_workers, len(links)))]
-        drivers = [d for d in drivers if d]
-        
-        if not drivers:
-            print("Erro: não foi possível criar drivers")
-            return 0
-        
-        processed = 0
-        with ThreadPoolExecutor(max_workers=len(drivers)) as executor:
-            futures = {}
-            for link, driver in zip(links, drivers):
-                future = executor.submit(self.processar_link, link, driver)
-                futures[future] = (link, driver)
-            
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Processando links"):
-                link, driver = futures[future]
-                try:
-                    if future.result():
-                        self.db.mark_link_processed(link, 'done')
-                        processed += 1
-                    else:
-                        self.db.mark_link_processed(link, 'retry')
-                        self.db.increment_tentativas(link)
-                except Exception as e:
-                    print(f"Erro ao processar {link}: {e}")
-                    self.db.mark_link_processed(link, 'error')
-                    self.db.increment_tentativas(link)
-        
-        # Fechar drivers
-        for driver in drivers:
+    def _salvar_api(self, url, corpos):
+        """Grava os anúncios das respostas JSON capturadas na página. Retorna quantos."""
+        for url_resposta, corpo in corpos:
+            self.paginas.salvar(url_resposta, corpo, tipo='json')
+        anuncios = self.captura.anuncios(url, corpos)
+        for dados in anuncios:
+            gravar_imovel(self.db, dados['link'], dados)
+        return len(anuncios)
+    
+    def _concluir_desafio(self, url, html, cookies):
+        """Callback de FilaDesafios: grava a página liberada e repassa os cookies ao nível HTTP."""
+        if html is None:
+            self._registrar_resultado(url, False)
+            return
+        self._registrar_resultado(url, self._salvar_pagina(url, html))
+        for c in cookies or []:
+            self.http.session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
+    
+    def _registrar_resultado(self, link, ok):
+        """Atualiza o status do link após uma tentativa de extração."""
+        if ok:
+            self.db.mark_link_processed(link, 'done')
+            with self._drivers_lock:
+                self._processados += 1
+        else:
+            self.db.mark_link_processed(link, 'retry')
+            self.db.increment_tentativas(link)
+    
+    def _worker_http(self, fila, barra):
+        """
+        Primeiro nível do fetch: tenta cada URL com GET simples. Se a resposta
+        não serve (desafio, sem JSON-LD/preço) ou a extração falha, a URL
+        volta para a agenda marcada para o navegador (_para_navegador).
+        """
+        while True:
+            link = fila.get()
+            if link is None:
+                fila.task_done()
+                break
+            domain = dominio_alvo(link)
             try:
-                driver.quit()
-            except:
-                pass
-        
-        return processed
+                ok = False
+                if self.http.stats.usar_http(domain):
+                    inicio = time.monotonic()
+                    status, html, validador = self.http.obter(link)
+                    latencia = time.monotonic() - inicio
+                    if status in STATUS_BLOQUEIO:
+                        self.controle.registrar(domain, BLOQUEIO)
+                    if status == NAO_MODIFICADO:
+                        # Nada mudou desde a última coleta: sem extração nem escrita no banco
+                        self.db.registrar_visita(link)
+                        ok = True
+                    elif status in STATUS_REMOVIDO:
+                        # Anúncio saiu do ar: o navegador não vai achar nada também
+                        self.db.registrar_visita(link, situacao=REMOVIDO)
+                        ok = True
+                    else:
+                        ok = bool(html) and self._salvar_pagina(link, html)
+                        if ok:
+                            self.db.guardar_validador(self.http.cache, link, validador)
+                        elif html and self.http.cache:
+                            self.http.cache.esquecer(link)
+                    self.http.stats.registrar(domain, 'http', ok)
+                    if ok:
+                        self.controle.registrar(domain, OK, latencia, 'http')
+                if ok:
+                    self._registrar_resultado(link, True)
+                    self.controle.liberar(domain)
+                    barra.update(1)
+                else:
+                    self._para_navegador(link, domain)
+            except Exception as e:
+                print(f"Erro no fetch HTTP de {link}: {e}")
+                self._para_navegador(link, domain)
+            finally:
+                fila.task_done()
     
-    def processar_tudo(self, domain=None):
-        """Processa todos os links pendentes em batches."""
+    def _para_navegador(self, link, domain):
+        """
+        Devolve à agenda um link que o HTTP não resolveu, agora para o
+        navegador: ele pede o mesmo host de novo, então precisa de outro token
+        do balde e de outra vaga do domínio (a do GET é liberada aqui).
+        """
+        self.controle.liberar(domain)
+        self._agenda.adicionar((NAVEGADOR, link), domain)
+    
+    def _fechar_driver(self, driver):
+        """Fecha um navegador e o remove da lista de drivers ativos."""
+        if driver is None:
+            return
+        with self._drivers_lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            self._pares.pop(id(driver), None)
+        self.bloqueio.esquecer(driver)
+        self.captura.esquecer(driver)
+        self.desafios.esquecer(driver)
+        if self.perfis:
+            # Salva os cookies de sessão no perfil (ou o aposenta, se queimado) antes de fechar
+            self.perfis.liberar(driver)
+        try:
+            driver.quit()
+        except:
+            pass
+
+    def _driver_vivo(self, driver):
+        """Verifica se o navegador ainda responde (detecta crash do Chrome)."""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _worker_navegador(self, fila, barra):
+        """
+        Worker persistente: mantém um navegador aberto e consome URLs da fila
+        compartilhada até receber o sentinela None. O navegador só é recriado
+        após `pages_per_driver` páginas ou quando trava.
+        """
+        driver = None
+        paginas = 0
+        while True:
+            link = fila.get()
+            if link is None:
+                fila.task_done()
+                break
+            domain = dominio_alvo(link)
+            try:
+                if driver is None:
+                    driver = self._get_driver()
+                    paginas = 0
+                    if driver is None:
+                        print(f"Erro: sem navegador para processar {link}")
+                        self.db.increment_tentativas(link)
+                        barra.update(1)
+                        continue
+                    with self._drivers_lock:
+                        self.drivers.append(driver)
+
+                inicio = time.monotonic()
+                ok = self.processar_link(link, driver)
+                paginas += 1
+                if ok is None:
+                    # Desafio: o link foi para o navegador de resolução
+                    self.controle.registrar(domain, BLOQUEIO)
+                else:
+                    self.controle.registrar(domain, OK if ok else FALHA, time.monotonic() - inicio, 'browser')
+                    self.http.stats.registrar(domain, 'browser', ok)
+                    self._registrar_resultado(link, ok)
+            except Exception as e:
+                self.controle.registrar(domain, BLOQUEIO if eh_timeout(e) else FALHA)
+                if driver is not None and not self._driver_vivo(driver):
+                    self._fechar_driver(driver)
+                    driver = None
+                tentativa = self._tentativas.get(link, 0) + 1
+                if tentativa < RETRY_MAX:
+                    # Retry pela fila de atraso: o navegador segue com outro link em vez de dormir
+                    self._tentativas[link] = tentativa
+                    espera = RETRY_BACKOFF_FACTOR ** (tentativa - 1)
+                    print(f"  ⏳ Tentativa {tentativa} de {link}: nova tentativa em {espera}s ({e})")
+                    self._agenda.adiar(link, domain, espera)
+                    continue
+                print(f"Erro ao processar {link}: {e}")
+                self._tentativas.pop(link, None)
+                self.http.stats.registrar(domain, 'browser', False)
+                self.db.mark_link_processed(link, 'error')
+                self.db.increment_tentativas(link)
+                barra.update(1)
+            else:
+                self._tentativas.pop(link, None)
+                barra.update(1)
+            finally:
+                self.controle.liberar(domain)
+                # Perfil com desafios demais: fecha já, o próximo navegador pega outro perfil
+                if driver is not None and (paginas >= self.pages_per_driver
+                                           or (self.perfis and self.perfis.queimado(driver))):
+                    self._fechar_driver(driver)
+                    driver = None
+                fila.task_done()
+        self._fechar_driver(driver)
+
+    def _executar_pool(self, proximos_links):
+        """
+        Roda o pool de fetch até esgotar os links.
+
+        `proximos_links(esperar, na_fila)` é chamado sempre que o alimentador
+        precisa de mais trabalho e deve retornar uma lista (vazia quando não
+        houver mais links; com esperar=False, vazia também quando ainda não há
+        links novos). `na_fila` ({host: links esperando na agenda}) permite
+        reservar só para os domínios abaixo de BACKLOG_PER_DOMAIN: um domínio
+        lento não enche a agenda enquanto os outros ficam parados.
+        Com `http_workers` > 0 os links passam primeiro pelos workers HTTP e só
+        os que falham chegam aos navegadores.
+
+        Cada link só é despachado quando o domínio tem vaga em self.controle e
+        token no balde do host (cortesia.py); os demais esperam na agenda sem
+        segurar os outros domínios. O link que o HTTP recusa passa de novo pela
+        agenda antes do navegador (outro pedido ao host, outro token). Retries
+        voltam pela fila de atraso da agenda.
+        """
+        n_workers = max(1, self.max_workers)
+        fila_browser = queue.Queue(maxsize=n_workers * 2)
+        if self.http_workers > 0:
+            fila = queue.Queue(maxsize=self.http_workers * 2)
+        else:
+            fila = fila_browser
+        barra = tqdm(total=0, desc="Processando links")
+        self._processados = 0
+
+        niveis = []
+        if fila is not fila_browser:
+            niveis.append((fila, [
+                threading.Thread(target=self._worker_http, args=(fila, barra), daemon=True)
+                for _ in range(self.http_workers)
+            ]))
+        niveis.append((fila_browser, [
+            threading.Thread(target=self._worker_navegador, args=(fila_browser, barra), daemon=True)
+            for _ in range(n_workers)
+        ]))
+        for _, threads in niveis:
+            for t in threads:
+                t.start()
+
+        agenda = self._agenda = AgendadorCortesia(self.taxas)
+        ultima_vazia = 0.0
+
+        def receber(links):
+            for link in links:
+                agenda.adicionar(link, dominio_alvo(link))
+            barra.total += len(links)
+            barra.refresh()
+
+        try:
+            while True:
+                versao = self.controle.versao()
+                self._despachar(agenda, fila, fila_browser)
+                na_fila = agenda.por_host()
+                restantes = sum(na_fila.values())
+                # Sem nada na mão, espera links; senão completa a cada PRODUCER_POLL_INTERVAL os domínios com folga
+                if restantes == 0 or time.monotonic() - ultima_vazia >= PRODUCER_POLL_INTERVAL:
+                    links = proximos_links(esperar=restantes == 0, na_fila=na_fila)
+                    if links:
+                        receber(links)
+                        continue
+                    ultima_vazia = time.monotonic()
+                    if restantes == 0:
+                        # Espera o que já está em andamento e confere se surgiu algo novo
+                        fila.join()
+                        fila_browser.join()
+                        if agenda.pendentes():
+                            # Algum link falhou no fim e voltou para retry
+                            continue
+                        links = proximos_links()
+                        if not links:
+                            break
+                        receber(links)
+                        continue
+                # Domínios no limite de vagas ou sem token: espera uma vaga ou o próximo token
+                espera = agenda.espera()
+                espera = PRODUCER_POLL_INTERVAL if espera is None else min(max(espera, 0.01), PRODUCER_POLL_INTERVAL)
+                self.controle.aguardar(versao, espera)
+        finally:
+            # Encerra o nível HTTP (que ainda pode repassar links) antes dos navegadores
+            for q, threads in niveis:
+                for _ in threads:
+                    q.put(None)
+                for t in threads:
+                    t.join()
+            barra.close()
+            # Garante que nenhum Chrome fique órfão (ex.: Ctrl+C)
+            for driver in list(self.drivers):
+                self._fechar_driver(driver)
+
+        return self._processados
+
+    def _despachar(self, agenda, fila, fila_browser):
+        """
+        Põe na fila os links dos domínios que têm vaga e token, alternando entre
+        domínios. Os marcados com NAVEGADOR (recusados pelo HTTP) vão direto
+        para os navegadores.
+        """
+        while True:
+            pronto = agenda.retirar(pode=self.controle.tentar)
+            if pronto is None:
+                return
+            item = pronto[1]
+            if isinstance(item, tuple) and item[0] == NAVEGADOR:
+                fila_browser.put(item[1])
+            else:
+                fila.put(item)
+
+    def processar_batch_paralelo(self, links):
+        """Processa uma lista fixa de links com o pool de navegadores."""
+        pendentes = [list(links)]
+        try:
+            return self._executar_pool(lambda esperar=True, na_fila=None: pendentes.pop() if pendentes else [])
+        finally:
+            # Processos de extração não ficam vivos depois do lote (o próximo uso sobe outro pool)
+            self.extracao.close()
+
+    def processar_tudo(self, domain=None, enquanto=None):
+        """
+        Processa todos os links pendentes com um pool persistente de navegadores.
+
+        `enquanto` (opcional) é chamado quando a fila esvazia: se retornar True
+        ainda há quem esteja gravando links (ex.: AgendadorDescoberta.ativo) e o
+        pool espera por eles em vez de terminar.
+        """
         print(f"\n{'='*70}")
         print("SCRAPER ESCALÁVEL - INICIANDO PROCESSAMENTO")
         print(f"{'='*70}")
-        
-        while True:
-            links = self.db.get_pending_links(domain=domain, limit=BATCH_SIZE)
-            if not links:
-                break
-            
-            print(f"\n📦 Processando batch com {len(links)} links...")
-            self.processar_batch_paralelo(links)
-            
-            stats = self.db.get_stats()
-            print(f"\n📊 Status: {stats['imoveis']} imóveis, {stats['links_done']}/{stats['links_total']} links processados")
-        
+
+        def esperando(dominio, na_fila):
+            # A agenda conta por host (dominio_alvo); 'outro' e afins somam os hosts fora de TARGET_DOMAINS
+            if dominio in TARGET_DOMAINS:
+                return na_fila.get(dominio, 0)
+            return sum(n for host, n in na_fila.items() if host not in TARGET_DOMAINS)
+
+        def proximos_links(esperar=True, na_fila=None):
+            na_fila = na_fila or {}
+            while True:
+                # Um claim por domínio com folga: a agenda nunca fica só com o domínio mais lento
+                links = []
+                for dominio in ([domain] if domain else self.db.dominios_pendentes()):
+                    folga = BACKLOG_PER_DOMAIN - esperando(dominio, na_fila)
+                    if folga > 0:
+                        links += self.db.claim_links(self.worker_id, domain=dominio, limit=folga)
+                # Espera também os links que estão no navegador de resolução de desafios
+                if links or not esperar or not (self.desafios.pendentes() or (enquanto is not None and enquanto())):
+                    return links
+                time.sleep(PRODUCER_POLL_INTERVAL)
+
+        parar = threading.Event()
+
+        def renovar():
+            # Links na agenda, no navegador ou num desafio seguem reservados enquanto o processo vive
+            while not parar.wait(LEASE_RENEW_INTERVAL):
+                self.db.renovar_leases(self.worker_id)
+
+        threading.Thread(target=renovar, name="renovar-leases", daemon=True).start()
+        try:
+            self._executar_pool(proximos_links)
+        finally:
+            parar.set()
+            # Links reservados e não processados (ex.: Ctrl+C) voltam para a fila
+            self.db.release_links(self.worker_id)
+            self.extracao.close()
+
+        stats = self.db.get_stats()
+        print(f"\n📊 Status: {stats['imoveis']} imóveis, {stats['links_done']}/{stats['links_total']} links processados")
+        resumo = self.http.stats.resumo()
+        if resumo:
+            print("\n📶 Sucesso por nível de fetch:")
+            for linha in resumo:
+                print(f"   {linha}")
+        resumo = self.http.cache.stats.resumo() if self.http.cache else []
+        if resumo:
+            print("\n♻️  GET condicional (304 = página inalterada):")
+            for linha in resumo:
+                print(f"   {linha}")
+        resumo = self.captura.resumo()
+        if resumo:
+            print("\n🧾 Anúncios lidos das APIs de listagem:")
+            for linha in resumo:
+                print(f"   {linha}")
+        resumo = self.bloqueio.stats.resumo()
+        if resumo:
+            print("\n🚫 Recursos bloqueados:")
+            for linha in resumo:
+                print(f"   {linha}")
+        resumo = self.prontidao.stats.resumo()
+        if resumo:
+            print("\n⏱️  Espera por página (x sleep fixo):")
+            for linha in resumo:
+                print(f"   {linha}")
+        resumo = self._agenda.resumo() if self._agenda else []
+        if resumo:
+            print("\n🚦 Ritmo por host:")
+            for linha in resumo:
+                print(f"   {linha}")
+        resumo = self.controle.resumo()
+        if resumo:
+            print("\n🎚️  Concorrência por domínio (AIMD):")
+            for linha in resumo:
+                print(f"   {linha}")
+        if self.perfis:
+            print("\n🗂️  Perfis de navegador:")
+            for linha in self.perfis.resumo():
+                print(f"   {linha}")
         print("\n✅ Processamento concluído!")
     
-    def exportar_resultados(self):
-        """Exporta resultados para JSON."""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        imoveis = self.db.export_json()
-        
-        if not imoveis:
+    def exportar_resultados(self, formato='json', compressao=None, colunas=COLUNAS_EXPORT, limite=None):
+        """Exporta resultados para JSON (ou ndjson/csv, exportacao.py), em streaming."""
+        self.db.flush()
+        arquivo = nome_arquivo('imoveis_scraper_escalavel', formato, compressao)
+        n = exportar(self.db.db_path, arquivo, formato, compressao, colunas, limite)
+        if not n:
+            arquivo.unlink()
             print("Nenhum imóvel para exportar")
             return
-        
-        arquivo = OUTPUT_DIR / f"imoveis_scraper_escalavel_{timestamp}.json"
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            json.dump(imoveis, f, ensure_ascii=False, indent=2)
-        
-        print(f"\n✅ {len(imoveis)} imóvel(is) exportado(s) para: {arquivo.name}")
+        print(f"\n✅ {n} imóvel(is) exportado(s) para: {arquivo.name}")
         return arquivo
 
-    def exportar_csv(self, limite=None):
+    def exportar_csv(self, limite=None, compressao=None, colunas=COLUNAS_EXPORT):
         """Exporta resultados para CSV (planilha simples)."""
-        import csv
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        imoveis = self.db.export_json(limite)
-        if not imoveis:
-            print("Nenhum imóvel para exportar")
-            return
-        arquivo = OUTPUT_DIR / f"imoveis_scraper_escalavel_{timestamp}.csv"
-        keys = ['id','titulo','preco','metragem','quartos','banheiros','descricao','endereco','cidade','estado','cep','contato','link','fonte','data_coleta']
-        with open(arquivo, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            for row in imoveis:
-                writer.writerow({k: row.get(k) for k in keys})
-        print(f"\n✅ {len(imoveis)} imóvel(is) exportado(s) para CSV: {arquivo.name}")
-        return arquivo
+        return self.exportar_resultados('csv', compressao, colunas, limite)
 
 
 # ============================================================================
@@ -612,6 +1275,8 @@ class ScraperEscalavel:
 
 if __name__ == '__main__':
     import argparse
+    from descoberta import AgendadorDescoberta, SEARCH_BROWSERS
+    from cortesia import ler_taxas
     
     parser = argparse.ArgumentParser(
         description="Scraper escalável para 100k+ imóveis"
@@ -632,6 +1297,57 @@ if __name__ == '__main__':
         action="store_true",
         help="Rodar em headless mode"
     )
+    parser.add_argument(
+        "--pages-per-driver",
+        type=int,
+        default=PAGES_PER_DRIVER,
+        help=f"Reciclar cada navegador após N páginas (padrão: {PAGES_PER_DRIVER})"
+    )
+    parser.add_argument(
+        "--http-workers",
+        type=int,
+        default=HTTP_WORKERS,
+        help=f"Threads que tentam GET simples antes do navegador; 0 = só navegador (padrão: {HTTP_WORKERS})"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=EXTRACTION_JOBS,
+        help=f"Processos de extração; 0 = extrair na thread do navegador (padrão: {EXTRACTION_JOBS})"
+    )
+    parser.add_argument(
+        "--sem-bloqueio",
+        action="store_true",
+        help="Não bloquear imagens, fontes, mídia e rastreadores nos navegadores"
+    )
+    parser.add_argument(
+        "--sem-captura-api",
+        action="store_true",
+        help="Não ler anúncios das respostas JSON das APIs de listagem"
+    )
+    parser.add_argument(
+        "--taxa",
+        action="append",
+        default=[],
+        metavar="HOST=TAXA[:RAJADA]",
+        help="Pedidos/s (e rajada) por host, ex.: --taxa olx.com.br=3:5; repetível (padrão: cortesia.TAXAS_POR_HOST)"
+    )
+    parser.add_argument(
+        "--sem-perfis",
+        action="store_true",
+        help="Abrir navegadores com perfil temporário em vez dos perfis persistentes (perfis.py)"
+    )
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help="Baixar as páginas inteiras sempre, sem GET condicional (cache_http.py)"
+    )
+    parser.add_argument(
+        "--search-browsers",
+        type=int,
+        default=SEARCH_BROWSERS,
+        help=f"Navegadores de busca em paralelo com --keywords (padrão: {SEARCH_BROWSERS})"
+    )
     parser.add_argument(
         "--links-per-domain",
         type=int,
@@ -665,11 +1381,22 @@ if __name__ == '__main__':
         action="store_true",
         help="Exportar resultados para CSV"
     )
+    parser.add_argument(
+        "--revisitar",
+        action="store_true",
+        help="Antes de processar, devolver para a fila os anúncios com revisita vencida (revisita.py)"
+    )
     
     args = parser.parse_args()
     
-    scraper = ScraperEscalavel(headless=args.headless, max_workers=args.workers, proxy_file=args.proxy_file, ua_file=args.ua_file)
+    scraper = ScraperEscalavel(headless=args.headless, max_workers=args.workers, proxy_file=args.proxy_file, ua_file=args.ua_file,
+                               pages_per_driver=args.pages_per_driver, http_workers=args.http_workers, jobs=args.jobs,
+                               bloquear_recursos=not args.sem_bloqueio, capturar_api=not args.sem_captura_api,
+                               usar_perfis=not args.sem_perfis, taxas=ler_taxas(args.taxa),
+                               usar_cache=not args.sem_cache)
     db = scraper.db
+    if args.revisitar and not (args.stats or args.export):
+        print(f"🔁 {db.agendar_revisitas()} anúncio(s) com revisita vencida de volta para a fila")
     
     if args.stats:
         stats = db.get_stats()
@@ -683,28 +1410,13 @@ if __name__ == '__main__':
     elif args.export:
         scraper.exportar_resultados()
     elif args.keywords:
-        from busca_ampla import BroadSearcher
         print(f"Iniciando busca por: {args.keywords}")
-        buscador = BroadSearcher(headless=args.headless, slow_wait=1)
-        if not buscador.start_driver():
-            print("❌ Não foi possível iniciar o driver do navegador. Abortando.")
-            sys.exit(1)
-        
-        try:
-            for keyword in args.keywords:
-                print(f"\n🔍 Buscando: {keyword}")
-                for domain in TARGET_DOMAINS:
-                    links = buscador.bing_site_search_browser(keyword, domain, limit=args.links_per_domain)
-                    for link in links:
-                        db.add_link(link, domain, keyword)
-                    print(f"  ✓ {len(links)} links adicionados de {domain}")
-        finally:
-            try:
-                buscador.driver.quit()
-            except:
-                pass
-        
-        scraper.processar_tudo()
+        # Busca e extração rodam juntas: os links entram no banco conforme cada SERP termina
+        agendador = AgendadorDescoberta(db, args.keywords, TARGET_DOMAINS, navegadores=args.search_browsers,
+                                        headless=args.headless, links_per_domain=args.links_per_domain,
+                                        desafios=scraper.desafios).iniciar()
+        scraper.processar_tudo(enquanto=agendador.ativo)
+        agendador.aguardar()
         if args.export_csv:
             scraper.exportar_csv()
         elif args.export:
@@ -13,31 +13,47 @@ import time
 import csv
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import requests
 from bs4 import BeautifulSoup
 import logging
+from cortesia import AgendadorCortesia, host_da_url
+from cache_http import CacheHTTP, INALTERADO
+from historico import id_anuncio
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger()
 
 DB_PATH = Path(__file__).parent / "imoveis.db"
 OUTPUT_DIR = Path(__file__).parent / "output"
+WORKERS = 4
+FETCH_RETRIES = 2  # novas tentativas por URL, pela fila de atraso do agendador
+RETRY_BACKOFF = 2  # 1s, 2s entre tentativas
 
 # Headers para simular navegador
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
-def fetch_olx_listing(url, session=None):
-    """Fetch página de anúncio do OLX"""
+def fetch_olx_listing(url, session=None, cache=None, validadores=None):
+    """
+    Fetch página de anúncio do OLX. Com cache (CacheHTTP) o GET é condicional
+    e retorna INALTERADO quando o anúncio não mudou desde a última coleta.
+    O validador da resposta não é guardado aqui: vai para `validadores[url]`
+    e quem chama faz cache.guardar depois de gravar o anúncio no banco.
+    """
     if session is None:
         session = requests.Session()
     
     try:
         logger.info(f"Fetching: {url}")
-        response = session.get(url, headers=HEADERS, timeout=10)
+        headers = dict(HEADERS, **cache.cabecalhos(url)) if cache else HEADERS
+        response = session.get(url, headers=headers, timeout=10)
+        if cache and cache.resposta(url, response.status_code, response.headers):
+            return INALTERADO
         response.raise_for_status()
+        if validadores is not None:
+            validadores[url] = (response.headers, response.content)
         return response.text
     except Exception as e:
         logger.warning(f"Erro ao buscar {url}: {e}")
@@ -150,18 +166,40 @@ def extract_olx_data(html, url):
     
     return None
 
-def process_worker(url_batch, session):
-    """Worker que processa URLs"""
-    results = []
-    for url in url_batch:
-        html = fetch_olx_listing(url, session)
-        data = extract_olx_data(html, url)
-        if data:
-            results.append((url, data))
-        time.sleep(2)  # Delay para não sobrecarregar OLX
-    return results
+def process_worker(agenda, session, results, lock, ocupado, cache=None, validadores=None):
+    """
+    Worker que processa URLs no ritmo do agendador (cortesia.py): o limite por
+    host substitui o sleep de 2s depois de cada URL, e quem falha volta pela
+    fila de atraso em vez de dormir na thread. Anúncio inalterado (304) entra
+    em `results` com dados None: só o link é marcado como feito.
+    """
+    while True:
+        pronto = agenda.proximo()
+        if pronto is None:
+            return
+        host, (url, tentativa) = pronto
+        inicio = time.monotonic()
+        html = fetch_olx_listing(url, session, cache, validadores)
+        if html is INALTERADO:
+            with lock:
+                results.append((url, None))
+        elif html is None and tentativa < FETCH_RETRIES:
+            agenda.adiar((url, tentativa + 1), host, RETRY_BACKOFF ** tentativa)
+        else:
+            data = extract_olx_data(html, url)
+            if data:
+                with lock:
+                    results.append((url, data))
+            elif html and cache:
+                cache.esquecer(url)
+        with lock:
+            ocupado[0] += time.monotonic() - inicio
 
 def main():
+    # Import tardio: scraper_escalavel carrega o Selenium, que este script não usa
+    from scraper_escalavel import ImovelDB
+
+    db = ImovelDB(DB_PATH)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
@@ -172,59 +210,58 @@ def main():
     
     if not urls:
         logger.info("❌ Nenhum link pendente")
+        db.close()
         return
     
     # Processa URLs
     all_results = []
     session = requests.Session()
-    batch_size = 6
+    cache = CacheHTTP()
+    agenda = AgendadorCortesia()
+    for url in urls:
+        agenda.adicionar((url, 0), host_da_url(url))
+    agenda.fechar()
     
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = []
-        for i in range(0, len(urls), batch_size):
-            batch = urls[i:i+batch_size]
-            futures.append(executor.submit(process_worker, batch, session))
-        
-        for future in as_completed(futures):
-            try:
-                results = future.result()
-                all_results.extend(results)
-            except Exception as e:
-                logger.warning(f"Erro em worker: {e}")
+    lock = threading.Lock()
+    ocupado = [0.0]
+    validadores = {}
+    inicio = time.monotonic()
+    workers = [threading.Thread(target=process_worker, args=(agenda, session, all_results, lock, ocupado, cache,
+                                                                  validadores))
+               for _ in range(WORKERS)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    duracao = time.monotonic() - inicio
+    for linha in agenda.resumo():
+        logger.info(f"🚦 {linha}")
+    if duracao > 0:
+        logger.info(f"⚙️  Utilização dos workers: {ocupado[0] / (WORKERS * duracao):.0%} em {duracao:.1f}s")
+    for linha in cache.stats.resumo():
+        logger.info(f"♻️  {linha}")
     
-    # Salva no banco
-    logger.info(f"💾 Salvando {len(all_results)} registros...")
+    # Salva no banco pelo ImovelDB: id estável (olx:<id>), colunas tipadas e histórico de preço
+    inalterados = [url for url, data in all_results if data is None]
+    logger.info(f"💾 Salvando {len(all_results) - len(inalterados)} registros ({len(inalterados)} inalterados)...")
+    for url in inalterados:
+        db.mark_link_processed(url)
     for url, data in all_results:
+        if data is None:
+            continue
         try:
-            imovel_id = re.search(r'/vi/(\d+)', url).group(1)
-            c.execute("""
-                INSERT OR REPLACE INTO imoveis 
-                (id, link, titulo, preco, metragem, quartos, banheiros, 
-                 descricao, endereco, cidade, estado, cep, contato, fonte, data_coleta)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'OLX', ?)
-            """, (
-                imovel_id,
-                url,
-                data.get('titulo'),
-                data.get('preco'),
-                data.get('metragem'),
-                data.get('quartos'),
-                data.get('banheiros'),
-                data.get('descricao'),
-                data.get('endereco'),
-                data.get('cidade'),
-                data.get('estado'),
-                data.get('cep'),
-                data.get('contato'),
-                datetime.now().isoformat(),
-            ))
-            
-            # Mark link as done
-            c.execute("UPDATE links SET status = 'done' WHERE url = ?", (url,))
+            db.add_imovel(link=url, fonte='OLX', **data)
+            db.mark_link_processed(url)
         except Exception as e:
             logger.warning(f"Erro ao salvar {url}: {e}")
-    
-    conn.commit()
+    db.flush()
+    # Validador só para anúncio que está no banco: um 304 na próxima coleta não pode esconder dado perdido
+    for url, data in all_results:
+        if data is not None and url in validadores:
+            gravado = conn.execute("SELECT 1 FROM imoveis WHERE id = ?", (id_anuncio(url),)).fetchone()
+            if gravado:
+                cache.guardar(url, *validadores[url])
+    cache.flush()
     
     # Export CSV
     logger.info("📄 Exportando CSV...")
@@ -252,6 +289,7 @@ def main():
     logger.info(f"📊 Total: {len(all_results)}, Com preço: {com_preco}")
     
     conn.close()
+    db.close()
 
 if __name__ == '__main__':
     main()